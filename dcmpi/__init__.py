@@ -13,6 +13,8 @@ from __future__ import (
 
 # ======================================================================
 # :: Python Standard Library Imports
+import sys  # System-specific parameters and functions
+import importlib.util  # The implementation of import: utilities
 
 # ======================================================================
 # :: External Imports
@@ -53,12 +55,65 @@ MY_GREETINGS = r"""
 |____/ \____|_|  |_|_|  |___|
 """
 # generated with: figlet 'DCMPI' -f standard
+# note: the greetings are only printed by the interactive entry points.
 
-# :: Causes the greetings to be printed any time the library is loaded.
-print(MY_GREETINGS)
 
 # ======================================================================
-PATH = pkg_paths(__file__, INFO['name'], INFO['author'], INFO['version'])
+def lazy_import(name):
+    """
+    Import a module, deferring its execution to the first attribute access.
+
+    This is used for the heavy dependencies, so that the command-line tools
+    only pay for what they actually use.
+
+    Args:
+        name (str): The absolute name of the module.
+
+    Returns:
+        module (module): The module (possibly not yet executed).
+
+    Raises:
+        ImportError: If the module cannot be found.
+
+    Examples:
+        >>> fractions = lazy_import('fractions')
+        >>> fractions.Fraction(3, 6)
+        Fraction(1, 2)
+        >>> lazy_import('fractions') is fractions
+        True
+        >>> lazy_import('a_module_that_does_not_exist')
+        Traceback (most recent call last):
+            ...
+        ImportError: No module named `a_module_that_does_not_exist`
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named `{}`'.format(name))
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# ======================================================================
+def __getattr__(name):
+    """
+    Compute the package attributes with side effects on first access.
+
+    `PATH` (from `pkg_paths()`) creates the user directories, and it is
+    only needed by the graphical interfaces.
+    """
+    if name == 'PATH':
+        global PATH
+        PATH = pkg_paths(
+            __file__, INFO['name'], INFO['author'], INFO['version'])
+        return PATH
+    raise AttributeError(
+        'module `{}` has no attribute `{}`'.format(__name__, name))
 
 # ======================================================================
 if __name__ == '__main__':
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: benchmarks.
+
+Note: synthetic DICOM sessions are generated offline (see `synthetic`) and
+the processing stages are timed on them (see `suite`), producing JSON
+results that can be compared across runs.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
@@ -0,0 +1,584 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: benchmark the processing stages on synthetic sessions.
+
+Note: a synthetic session is generated, then the processing stages are run
+in order on a fresh copy of it for each repetition, measuring the resources
+used (see `dcmpi.profiling`). The results are saved as JSON, and can be
+compared with the results of a previous run.
+The import time of the command-line modules is also checked against a
+budget, in fresh interpreters, together with their import side effects
+(output and heavy dependencies loaded) and the use of the lazily imported
+dependencies (e.g. catching their exceptions).
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import sys  # System-specific parameters and functions
+import shutil  # High-level file operations
+import platform  # Access to underlying platform’s identifying data
+import datetime  # Basic date and time types
+import collections  # High-performance container datatypes
+import argparse  # Parser for command-line options, arguments and sub-commands
+import subprocess  # Subprocess management
+import multiprocessing  # Process-based parallelism
+import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import tempfile  # Generate temporary files and directories
+
+# :: External Imports
+import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+
+# :: External Imports Submodules
+
+# :: Local Imports
+import dcmpi.util as utl
+from dcmpi import profiling
+from dcmpi.benchmark import synthetic
+from dcmpi import INFO
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+
+# ======================================================================
+D_OUT_FILENAME = 'dcmpi_benchmark.json'
+NIFTI_METHODS = ('dicom2nifti', 'dcm2niix')
+
+# the modules spawned by the command-line tools
+IMPORT_MODULES = (
+    'dcmpi', 'dcmpi.do_acquire_sources', 'dcmpi.do_sorting',
+    'dcmpi.get_nifti', 'dcmpi.get_meta', 'dcmpi.get_prot', 'dcmpi.get_info',
+    'dcmpi.do_report', 'dcmpi.do_backup', 'dcmpi.dcmpi_update',
+    'dcmpi.dcmpi_run', 'dcmpi.dcmpi_run_cli', 'dcmpi.get_info_table',
+    'dcmpi.dcmpi_monitor_folder', 'dcmpi.dcmpi_analyze_dir',
+    'dcmpi.dcmpi_daemon', 'dcmpi.dcmpi_run_async')
+# the heavy dependencies that must not be loaded on import
+HEAVY_MODULES = ('pydicom', 'dicom2nifti', 'pytk', 'blessed', 'tkinter')
+D_IMPORT_BUDGET = 0.25  # s
+
+_IMPORT_SCRIPT = '''
+import sys, time, types, json, importlib
+begin, cpu_begin = time.time(), time.process_time()
+importlib.import_module(sys.argv[1])
+wall, cpu = time.time() - begin, time.process_time() - cpu_begin
+loaded = [
+    name for name in sys.argv[2:]
+    if type(sys.modules.get(name)) is types.ModuleType]
+sys.stdout.write('\\n' + json.dumps(dict(wall=wall, cpu=cpu, loaded=loaded)))
+'''
+
+# the invalid sources must be rejected (not raise) with lazy `pydicom`
+_LAZY_USAGE_SCRIPT = '''
+import os, sys, gzip, json, shutil, tempfile
+import dcmpi.util as utl
+dirpath = tempfile.mkdtemp()
+try:
+    results = {}
+    for name, opener in (('README.txt', open), ('README.txt.gz', gzip.open)):
+        filepath = os.path.join(dirpath, name)
+        with opener(filepath, 'wb') as file_obj:
+            file_obj.write(b'Not a DICOM file.')
+        results[name] = utl.is_dicom(filepath)
+finally:
+    shutil.rmtree(dirpath)
+sys.stdout.write('\\n' + json.dumps(results))
+'''
+
+
+# ======================================================================
+def _stage_acquire(paths, force, verbose):
+    from dcmpi.do_acquire_sources import do_acquire_sources
+
+    dcm_dirpaths = do_acquire_sources(
+        paths['raw'], paths['out'], method='copy',
+        subpath=utl.TPL['acquire'], extra_subpath=utl.ID['dicom'],
+        force=force, verbose=verbose)
+    paths['dcm'] = sorted(dcm_dirpaths)[0]
+    paths['base'] = os.path.dirname(paths['dcm'])
+
+
+def _stage_sort(paths, force, verbose):
+    from dcmpi.do_sorting import sorting
+
+    sorting(paths['dcm'], None, force, verbose)
+
+
+def _stage_group(paths, force, verbose):
+    from dcmpi.do_sorting import grouping
+
+    grouping(
+        paths['dcm'], utl.D_SUMMARY + '.' + utl.EXT['json'], force, verbose)
+
+
+def _stage_meta(paths, force, verbose):
+    from dcmpi.get_meta import get_meta
+
+    get_meta(
+        paths['dcm'], os.path.join(paths['base'], utl.ID['meta']),
+        force=force, verbose=verbose)
+
+
+def _stage_prot(paths, force, verbose):
+    from dcmpi.get_prot import get_prot
+
+    get_prot(
+        paths['dcm'], os.path.join(paths['base'], utl.ID['prot']),
+        force=force, verbose=verbose)
+
+
+def _stage_info(paths, force, verbose):
+    from dcmpi.get_info import get_info
+
+    get_info(
+        paths['dcm'], os.path.join(paths['base'], utl.ID['info']),
+        force=force, verbose=verbose)
+
+
+def _stage_nifti(paths, force, verbose, method):
+    from dcmpi.get_nifti import get_nifti
+
+    if method != 'dicom2nifti' and not utl.which(method)[0]:
+        raise OSError('`{}` is not in available in $PATH.'.format(method))
+    get_nifti(
+        paths['dcm'],
+        os.path.join(paths['base'], utl.ID['niz'] + utl.INFO_SEP + method),
+        method, force=force, verbose=verbose)
+
+
+def _stage_report(paths, force, verbose):
+    from dcmpi.do_report import do_report
+
+    do_report(
+        paths['dcm'], paths['base'], file_format='html', incremental=False,
+        render_pdf=False, force=force, verbose=verbose)
+
+
+# ======================================================================
+def get_stages(nifti_methods=NIFTI_METHODS):
+    """
+    Get the benchmark stages, in order of execution.
+
+    Each stage is a callable accepting the paths (updated in-place by the
+    `acquire` stage), `force` and `verbose`.
+
+    Args:
+        nifti_methods (Iterable[str]): The NIfTI conversion methods.
+            See `dcmpi.get_nifti.get_nifti()` for the accepted values.
+
+    Returns:
+        stages (collections.OrderedDict): The stage name -> callable.
+    """
+    stages = collections.OrderedDict((
+        ('acquire', _stage_acquire),
+        ('sort', _stage_sort),
+        ('group', _stage_group),
+        ('meta', _stage_meta),
+        ('prot', _stage_prot),
+        ('info', _stage_info),
+    ))
+    for method in nifti_methods:
+        stages['niz' + utl.INFO_SEP + method] = \
+            lambda paths, force, verbose, method=method: \
+            _stage_nifti(paths, force, verbose, method)
+    stages['report'] = _stage_report
+    return stages
+
+
+# ======================================================================
+def _aggregate(runs):
+    """
+    Aggregate the measurements of the repetitions of a stage.
+
+    Args:
+        runs (list[dict]): The stats of each repetition.
+
+    Returns:
+        result (dict): The aggregated stats.
+            Times (`wall`, `cpu`) are reported as `min`, `median` and all
+            the values; the other values are from the fastest repetition.
+    """
+    fastest = min(runs, key=lambda x: x['wall'])
+    result = {
+        key: val for key, val in fastest.items()
+        if key not in ('begin', 'pid', 'wall', 'cpu')}
+    for key in ('wall', 'cpu'):
+        vals = sorted(run[key] for run in runs)
+        result[key] = {
+            'min': vals[0],
+            'median': vals[len(vals) // 2] if len(vals) % 2 else
+            (vals[len(vals) // 2 - 1] + vals[len(vals) // 2]) / 2,
+            'all': [run[key] for run in runs]}
+    return result
+
+
+# ======================================================================
+def run_suite(
+        work_dirpath=None,
+        num_series=4,
+        num_slices=16,
+        rows=64,
+        multiframe=False,
+        compression=None,
+        repeats=3,
+        nifti_methods=NIFTI_METHODS,
+        verbose=D_VERB_LVL):
+    """
+    Run the benchmark suite.
+
+    Args:
+        work_dirpath (str|None): Path to the working directory.
+            If None, a temporary directory is used (and removed).
+        num_series (int): The number of series of the synthetic session.
+        num_slices (int): The number of slices per series.
+        rows (int): The number of rows (and columns) of the images.
+        multiframe (bool): Store each series in a multi-frame file.
+        compression (str|None): The compression of the files.
+            See `synthetic.make_session()` for more details.
+        repeats (int): The number of repetitions of each stage.
+        nifti_methods (Iterable[str]): The NIfTI conversion methods.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        results (dict): The benchmark results.
+            Contains the `config`, the `environment` and the `stages`
+            results (aggregated measurements, or the `error`).
+    """
+    config = dict(
+        num_series=num_series, num_slices=num_slices, rows=rows,
+        multiframe=multiframe, compression=compression, repeats=repeats,
+        nifti_methods=list(nifti_methods))
+    environment = dict(
+        dcmpi=INFO['version'], pydicom=pydcm.__version__,
+        python=platform.python_version(), platform=platform.platform(),
+        cpu_count=multiprocessing.cpu_count(),
+        date=datetime.datetime.now().isoformat())
+    msg(':: Benchmarking ({})...'.format(', '.join(
+        '{}={}'.format(key, val) for key, val in sorted(config.items()))))
+    is_tmp = work_dirpath is None
+    if is_tmp:
+        work_dirpath = tempfile.mkdtemp(prefix='dcmpi_benchmark_')
+    raw_dirpath = os.path.join(work_dirpath, 'raw')
+    try:
+        synthetic.make_session(
+            raw_dirpath, num_series, num_slices, rows, multiframe,
+            compression, verbose=verbose)
+        stages = get_stages(nifti_methods)
+        runs = collections.OrderedDict((name, []) for name in stages)
+        errors = {}
+        for i in range(repeats):
+            out_dirpath = os.path.join(work_dirpath, 'run{}'.format(i))
+            if os.path.isdir(out_dirpath):
+                shutil.rmtree(out_dirpath)
+            paths = {'raw': raw_dirpath, 'out': out_dirpath}
+            for name, stage in stages.items():
+                if name in errors:
+                    continue
+                with profiling.Probe() as probe:
+                    try:
+                        stage(paths, True, VERB_LVL['none'])
+                    except Exception as e:
+                        errors[name] = '{}: {}'.format(type(e).__name__, e)
+                if name not in errors:
+                    runs[name].append(probe.stats)
+                    msg('Stage: {} #{}: {:.3f} s'.format(
+                        name, i, probe.stats['wall']),
+                        verbose, VERB_LVL['low'])
+                else:
+                    msg('W: Stage `{}` failed: {}'.format(name, errors[name]),
+                        verbose, VERB_LVL['low'])
+                    if name == 'acquire':
+                        errors.update({key: errors[name] for key in stages})
+    finally:
+        if is_tmp:
+            shutil.rmtree(work_dirpath, ignore_errors=True)
+    results = {
+        'config': config,
+        'environment': environment,
+        'stages': collections.OrderedDict(
+            (name, {'error': errors[name]} if name in errors
+            else _aggregate(runs[name]))
+            for name in stages)}
+    return results
+
+
+# ======================================================================
+def check_imports(
+        modules=IMPORT_MODULES,
+        budget=D_IMPORT_BUDGET,
+        repeats=3,
+        heavy_modules=HEAVY_MODULES,
+        verbose=D_VERB_LVL):
+    """
+    Check the import time and the import side effects of the modules.
+
+    Each module is imported in a fresh interpreter, so that the measured
+    time is the start-up cost paid by each spawned command-line tool.
+    Modules imported lazily (see `dcmpi.lazy_import()`) but not yet used
+    do not count as loaded.
+
+    Args:
+        modules (Iterable[str]): The names of the modules to import.
+        budget (int|float): The maximum import time in s.
+            The fastest repetition is compared against the budget.
+        repeats (int): The number of repetitions of each import.
+        heavy_modules (Iterable[str]): The modules that must not be loaded.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        results (dict): The module name -> result.
+            Each result contains the aggregated `wall` time, the `loaded`
+            heavy modules, the import-time `output`, and whether the
+            module is within budget and without side effects (`ok`),
+            or the `error`.
+    """
+    env = dict(os.environ)
+    base_dirpath = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.realpath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [base_dirpath] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else []))
+    results = collections.OrderedDict()
+    for module in modules:
+        runs = []
+        for i in range(max(repeats, 1)):
+            proc = subprocess.Popen(
+                [sys.executable, '-c', _IMPORT_SCRIPT, module]
+                + list(heavy_modules),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+            p_stdout, p_stderr = proc.communicate()
+            if proc.returncode:
+                results[module] = {
+                    'error': p_stderr.decode().strip().splitlines()[-1],
+                    'ok': False}
+                break
+            output, _, result = p_stdout.decode().rpartition('\n')
+            runs.append(dict(json.loads(result), output=output))
+        if module in results:
+            msg('W: Import of `{}` failed: {}'.format(
+                module, results[module]['error']), verbose, VERB_LVL['low'])
+            continue
+        result = _aggregate(runs)
+        result['ok'] = \
+            result['wall']['min'] <= budget \
+            and not result['loaded'] and not result['output']
+        results[module] = result
+        msg('Import: {:32s} {:6.3f} s  {}{}'.format(
+            module, result['wall']['min'],
+            'OK' if result['ok'] else 'FAILED',
+            ' (loaded: {})'.format(', '.join(result['loaded']))
+            if result['loaded'] else ''), verbose, VERB_LVL['low'])
+    return results
+
+
+# ======================================================================
+def check_lazy_usage(
+        verbose=D_VERB_LVL):
+    """
+    Check the use of the lazily imported dependencies.
+
+    Invalid sources (a text file and a compressed file) are checked with
+    `dcmpi.util.is_dicom()` in a fresh interpreter, where `pydicom` is only
+    loaded on first use (see `dcmpi.lazy_import()`): they must be rejected,
+    without raising.
+
+    Args:
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        result (dict): The result.
+            Contains whether all sources are rejected (`ok`), and either
+            the `results` of each source or the `error`.
+    """
+    env = dict(os.environ)
+    base_dirpath = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.realpath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [base_dirpath] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else []))
+    proc = subprocess.Popen(
+        [sys.executable, '-c', _LAZY_USAGE_SCRIPT],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    p_stdout, p_stderr = proc.communicate()
+    if proc.returncode:
+        result = {
+            'error': p_stderr.decode().strip().splitlines()[-1], 'ok': False}
+    else:
+        results = json.loads(p_stdout.decode().rpartition('\n')[2])
+        result = {
+            'results': results, 'ok': not any(results.values())}
+    msg('Lazy usage: {}{}'.format(
+        'OK' if result['ok'] else 'FAILED',
+        ' ({})'.format(result['error']) if 'error' in result else ''),
+        verbose, VERB_LVL['low'])
+    return result
+
+
+# ======================================================================
+def compare(
+        old_results,
+        new_results,
+        verbose=D_VERB_LVL):
+    """
+    Compare the results of two benchmark runs.
+
+    Args:
+        old_results (dict): The results of the reference run.
+        new_results (dict): The results of the new run.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        speedups (dict): The stage name -> speed-up (old / new min wall time).
+            Stages failed or missing in either run are skipped.
+
+    Examples:
+        >>> old = {'stages': {'sort': {'wall': {'min': 2.0}}}}
+        >>> new = {'stages': {'sort': {'wall': {'min': 0.5}},
+        ...        'group': {'error': 'Error'}}}
+        >>> compare(old, new, VERB_LVL['none'])
+        {'sort': 4.0}
+    """
+    if old_results.get('config') != new_results.get('config'):
+        msg('W: Comparing runs with different configurations.',
+            verbose, VERB_LVL['low'])
+    speedups = {}
+    for name, new_stage in new_results['stages'].items():
+        old_stage = old_results['stages'].get(name, {})
+        if 'wall' in new_stage and 'wall' in old_stage:
+            speedups[name] = \
+                old_stage['wall']['min'] / max(new_stage['wall']['min'], 1e-9)
+            msg('{:24s} {:9.3f} s -> {:9.3f} s  (x{:.2f})'.format(
+                name, old_stage['wall']['min'], new_stage['wall']['min'],
+                speedups[name]), verbose, VERB_LVL['lowest'])
+    return speedups
+
+
+# ======================================================================
+def handle_arg():
+    """
+    Handle command-line application arguments.
+    """
+    # :: Create Argument Parser
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog=fmtm('v.{version} - {author}\n{license}', INFO),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    # :: Add POSIX standard arguments
+    arg_parser.add_argument(
+        '--ver', '--version',
+        version=fmt(
+            '%(prog)s - ver. {version}\n{}\n{copyright} {author}\n{notice}',
+            next(line for line in __doc__.splitlines() if line), **INFO),
+        action='version')
+    arg_parser.add_argument(
+        '-v', '--verbose',
+        action='count', default=D_VERB_LVL,
+        help='increase the level of verbosity [%(default)s]')
+    # :: Add additional arguments
+    arg_parser.add_argument(
+        '-o', '--out_filepath', metavar='FILE',
+        default=D_OUT_FILENAME,
+        help='set output JSON results file [%(default)s]')
+    arg_parser.add_argument(
+        '-d', '--work_dirpath', metavar='DIR',
+        default=None,
+        help='set working directory (temporary if not set) [%(default)s]')
+    arg_parser.add_argument(
+        '-s', '--num_series', metavar='NUM',
+        type=int, default=4,
+        help='set number of series [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--num_slices', metavar='NUM',
+        type=int, default=16,
+        help='set number of slices per series [%(default)s]')
+    arg_parser.add_argument(
+        '-r', '--rows', metavar='NUM',
+        type=int, default=64,
+        help='set number of rows (and columns) [%(default)s]')
+    arg_parser.add_argument(
+        '-m', '--multiframe',
+        action='store_true',
+        help='store each series in a multi-frame file [%(default)s]')
+    arg_parser.add_argument(
+        '-z', '--compression',
+        metavar='|'.join(sorted(synthetic.COMPRESSORS)),
+        default=None,
+        help='set compression of the files [%(default)s]')
+    arg_parser.add_argument(
+        '-k', '--repeats', metavar='NUM',
+        type=int, default=3,
+        help='set number of repetitions [%(default)s]')
+    arg_parser.add_argument(
+        '-t', '--nifti_methods', metavar='METHOD',
+        nargs='*', default=list(NIFTI_METHODS),
+        help='set NIfTI conversion methods to benchmark [%(default)s]')
+    arg_parser.add_argument(
+        '-c', '--compare', metavar='FILE',
+        default=None,
+        help='compare with previous JSON results [%(default)s]')
+    arg_parser.add_argument(
+        '-b', '--import_budget', metavar='SECONDS',
+        type=float, default=D_IMPORT_BUDGET,
+        help='set import time budget per module (0 to skip) [%(default)s]')
+    arg_parser.add_argument(
+        '-i', '--imports_only',
+        action='store_true',
+        help='only check the import time budget [%(default)s]')
+    return arg_parser
+
+
+# ======================================================================
+def main():
+    """
+    Main entry point for the script.
+    """
+    # :: handle program parameters
+    arg_parser = handle_arg()
+    args = arg_parser.parse_args()
+    # :: print debug info
+    if args.verbose >= VERB_LVL['debug']:
+        arg_parser.print_help()
+        msg('\nARGS: ' + str(vars(args)), args.verbose, VERB_LVL['debug'])
+    msg(__doc__.strip())
+    begin_time = datetime.datetime.now()
+
+    if args.imports_only:
+        results = {}
+    else:
+        results = run_suite(
+            args.work_dirpath, args.num_series, args.num_slices, args.rows,
+            args.multiframe, args.compression, args.repeats,
+            args.nifti_methods, args.verbose)
+    exit_code = 0
+    if args.import_budget > 0:
+        results['imports'] = check_imports(
+            budget=args.import_budget, repeats=args.repeats,
+            verbose=args.verbose)
+        failed = [
+            name for name, result in results['imports'].items()
+            if not result['ok']]
+        if failed:
+            msg('E: Import budget ({} s) or side effects check failed: '
+                '{}'.format(args.import_budget, ', '.join(failed)))
+            exit_code = 1
+        results['lazy_usage'] = check_lazy_usage(args.verbose)
+        if not results['lazy_usage']['ok']:
+            msg('E: Lazy usage check failed.')
+            exit_code = 1
+    with open(args.out_filepath, 'w') as out_file:
+        json.dump(results, out_file, indent=4)
+    msg('Results: {}'.format(args.out_filepath))
+    if args.compare and 'stages' in results:
+        with open(args.compare, 'r') as in_file:
+            compare(json.load(in_file), results, args.verbose)
+
+    exec_time = datetime.datetime.now() - begin_time
+    msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return exit_code
+
+
+# ======================================================================
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: generate synthetic DICOM sessions.
+
+Note: the sessions mimic the layout of a MRI scanner export: several series
+(each with its own acquisition and protocol), single-frame or multi-frame
+images, CSA-like protocol headers, and optionally compressed files.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import datetime  # Basic date and time types
+import argparse  # Parser for command-line options, arguments and sub-commands
+import gzip  # Support for gzip files
+import bz2  # Support for bzip2 compression
+import random  # Generate pseudo-random numbers
+
+try:
+    import lzma  # Compression using the LZMA algorithm
+except ImportError:
+    lzma = None
+
+# :: External Imports
+import numpy as np  # NumPy (multidimensional numerical arrays library)
+import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+
+# :: External Imports Submodules
+import pydicom.dataset  # PyDicom: DICOM datasets
+import pydicom.uid  # PyDicom: DICOM unique identifiers
+
+# :: Local Imports
+import dcmpi.util as utl
+from dcmpi import INFO
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+
+# ======================================================================
+SOP_CLASS_UID = {
+    'single': '1.2.840.10008.5.1.4.1.1.4',  # MR Image Storage
+    'multi': '1.2.840.10008.5.1.4.1.1.4.1',  # Enhanced MR Image Storage
+}
+
+COMPRESSORS = {
+    'gz': gzip.open,
+    'bz2': bz2.BZ2File,
+}
+if lzma:
+    COMPRESSORS['xz'] = lzma.open
+
+PROTOCOL_ASCCONV = '\n'.join((
+    '### ASCCONV BEGIN ###',
+    'tSequenceFileName = "%CustomerSeq%\\\\{sequence}"',
+    'tProtocolName = "{protocol}"',
+    'sKSpace.lBaseResolution = {rows}',
+    'sKSpace.lPhaseEncodingLines = {rows}',
+    'sKSpace.lImagesPerSlab = {num_slices}',
+    'sKSpace.lPartitions = {num_slices}',
+    'sSliceArray.asSlice[0].dReadoutFOV = 200',
+    'sSliceArray.asSlice[0].dPhaseFOV = 200',
+    'sSliceArray.asSlice[0].dThickness = {num_slices}',
+    'sSliceArray.asSlice[0].sPosition.dSag = 1.0',
+    'sSliceArray.asSlice[0].sPosition.dCor = 2.0',
+    'sSliceArray.asSlice[0].sPosition.dTra = 3.0',
+    'sSliceArray.asSlice[0].sNormal.dSag = 0.0',
+    'sSliceArray.asSlice[0].sNormal.dCor = 0.0',
+    'sSliceArray.asSlice[0].sNormal.dTra = 1.0',
+    'lContrasts = 1',
+    'lAverages = 1',
+    'sKSpace.ucPhasePartialFourier = 0x10',
+    'sKSpace.ucSlicePartialFourier = 0x10',
+    'sPat.ucPATMode = 0x2',
+    'sPat.lAccelFactPE = 2',
+    'sPat.lAccelFact3D = 1',
+    'alTE[0] = {te}',
+    'alTR[0] = {tr}',
+    'sRXSPEC.alDwellTime[0] = 5000',
+)) + '\n'
+
+
+# ======================================================================
+def make_protocol(
+        series,
+        num_slices,
+        rows,
+        size=16384):
+    """
+    Generate a CSA-like protocol header.
+
+    The protocol (in the ASCCONV format) is embedded within padding,
+    so that the header has a realistic size.
+
+    Args:
+        series (int): The series number.
+        num_slices (int): The number of slices.
+        rows (int): The number of rows (and columns) of the images.
+        size (int): The approximate size of the header in bytes.
+
+    Returns:
+        protocol (bytes): The protocol header.
+    """
+    ascconv = PROTOCOL_ASCCONV.format(
+        sequence='gre' if series % 2 else 'mp2rage',
+        protocol='prot{}'.format(series), rows=rows, num_slices=num_slices,
+        te=1000 * series, tr=10000 * series)
+    header = 'SV10\4\3\2\1' + utl.PROT_BEGIN + ' <ParamLong."Size"> { 1 } '
+    padding = max(0, size - len(header) - len(ascconv) - len(utl.PROT_END))
+    return (
+        header + ' ' * padding + ascconv + utl.PROT_END).encode('ascii')
+
+
+# ======================================================================
+def make_dicom(
+        series,
+        num_slices,
+        rows,
+        frame,
+        uids,
+        acq_datetime,
+        protocol,
+        multiframe=False):
+    """
+    Generate a synthetic MR DICOM dataset.
+
+    Args:
+        series (int): The series number.
+        num_slices (int): The number of slices.
+        rows (int): The number of rows (and columns) of the images.
+        frame (int): The index of the (first) slice.
+        uids (dict): The `study` and `series` UIDs.
+        acq_datetime (datetime.datetime): The acquisition date and time.
+        protocol (bytes): The CSA-like protocol header.
+        multiframe (bool): Store all the slices in a single multi-frame
+            dataset (if True), or one slice (if False).
+
+    Returns:
+        dcm (pydicom.dataset.FileDataset): The DICOM dataset.
+    """
+    sop_class_uid = SOP_CLASS_UID['multi' if multiframe else 'single']
+    sop_instance_uid = pydcm.uid.generate_uid()
+    file_meta = pydcm.dataset.FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = sop_class_uid
+    file_meta.MediaStorageSOPInstanceUID = sop_instance_uid
+    file_meta.TransferSyntaxUID = pydcm.uid.ExplicitVRLittleEndian
+    dcm = pydcm.dataset.FileDataset(
+        None, {}, file_meta=file_meta, preamble=b'\0' * 128)
+    dcm.is_little_endian = True
+    dcm.is_implicit_VR = False
+    dcm.SpecificCharacterSet = 'ISO_IR 100'
+    dcm.SOPClassUID = sop_class_uid
+    dcm.SOPInstanceUID = sop_instance_uid
+    dcm.StudyInstanceUID = uids['study']
+    dcm.SeriesInstanceUID = uids['series']
+    dcm.Modality = 'MR'
+    dcm.ImageType = ['ORIGINAL', 'PRIMARY', 'M', 'ND']
+    dcm.PatientName = 'SYNTH^PATIENT'
+    dcm.PatientID = 'PID0001'
+    dcm.PatientBirthDate = '19800101'
+    dcm.PatientSex = 'O'
+    dcm.PatientAge = '038Y'
+    dcm.PatientWeight = 70
+    dcm.PatientSize = 1.7
+    dcm.StudyDescription = 'Synthetic^Benchmark'
+    dcm.StudyDate = acq_datetime.strftime('%Y%m%d')
+    dcm.StudyTime = '080000.000000'
+    dcm.AcquisitionDate = acq_datetime.strftime('%Y%m%d')
+    dcm.AcquisitionTime = acq_datetime.strftime('%H%M%S.%f')
+    dcm.ContentDate = dcm.AcquisitionDate
+    dcm.ContentTime = dcm.AcquisitionTime
+    dcm.StationName = 'SYNTHSYS'
+    dcm.InstitutionName = 'Synthetic'
+    dcm.MagneticFieldStrength = 6.98
+    dcm.ProtocolName = 'prot{}'.format(series)
+    dcm.SeriesNumber = series
+    dcm.SeriesDescription = 'series{}'.format(series)
+    dcm.InstanceNumber = frame + 1
+    dcm.ImagesInAcquisition = num_slices
+    dcm.NumberOfTemporalPositions = 1
+    dcm.SliceThickness = 1.0
+    dcm.PixelSpacing = [200.0 / rows, 200.0 / rows]
+    dcm.ImagePositionPatient = [-100.0, -100.0, float(frame)]
+    dcm.ImageOrientationPatient = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+    dcm.add_new(utl.DCM_ID['TA'], 'LO', 'TA 01:02')
+    dcm.add_new(utl.DCM_ID['hdr_nfo'], 'OB', protocol)
+    dcm.Rows = rows
+    dcm.Columns = rows
+    dcm.SamplesPerPixel = 1
+    dcm.PhotometricInterpretation = 'MONOCHROME2'
+    dcm.BitsAllocated = 16
+    dcm.BitsStored = 12
+    dcm.HighBit = 11
+    dcm.PixelRepresentation = 0
+    frames = range(frame, frame + num_slices) if multiframe else (frame,)
+    if multiframe:
+        dcm.NumberOfFrames = num_slices
+    base = np.arange(rows * rows, dtype='<u2').reshape((rows, rows))
+    dcm.PixelData = b''.join(
+        ((base * (i + 1) + series) % 4096).astype('<u2').tobytes()
+        for i in frames)
+    return dcm
+
+
+# ======================================================================
+def make_session(
+        dirpath,
+        num_series=4,
+        num_slices=16,
+        rows=64,
+        multiframe=False,
+        compression=None,
+        protocol_size=16384,
+        seed=0,
+        verbose=D_VERB_LVL):
+    """
+    Generate a synthetic DICOM session.
+
+    Args:
+        dirpath (str): Path to the output directory.
+        num_series (int): The number of series (one per acquisition).
+        num_slices (int): The number of slices per series.
+        rows (int): The number of rows (and columns) of the images.
+        multiframe (bool): Store each series in a multi-frame file.
+        compression (str|None): The compression of the files.
+            Accepted values are the keys of `COMPRESSORS`.
+            If None, the files are not compressed.
+        protocol_size (int): The approximate size of the CSA-like protocol
+            header in bytes.
+        seed (int): The seed for the (randomized) file names.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        filepaths (list[str]): The generated files.
+    """
+    if compression and compression not in COMPRESSORS:
+        raise ValueError('Unknown compression `{}`.'.format(compression))
+    if not os.path.isdir(dirpath):
+        os.makedirs(dirpath)
+    rnd = random.Random(seed)
+    study_uid = pydcm.uid.generate_uid()
+    acq_datetime = datetime.datetime(2018, 1, 2, 8, 0, 0)
+    filepaths = []
+    for series in range(1, num_series + 1):
+        uids = {'study': study_uid, 'series': pydcm.uid.generate_uid()}
+        # : acquisitions far enough not to be grouped together
+        acq_datetime += datetime.timedelta(
+            seconds=10 * utl.GRACE_PERIOD + rnd.randint(0, 60))
+        protocol = make_protocol(series, num_slices, rows, protocol_size)
+        for frame in range(0, num_slices, num_slices if multiframe else 1):
+            dcm = make_dicom(
+                series, num_slices, rows, frame, uids, acq_datetime,
+                protocol, multiframe)
+            # : scanner-like file names, in no particular order
+            filepath = os.path.join(dirpath, '{:08X}.IMA'.format(
+                rnd.getrandbits(32)))
+            if compression:
+                filepath += '.' + compression
+                with COMPRESSORS[compression](filepath, 'wb') as dcm_file:
+                    dcm.save_as(dcm_file, write_like_original=False)
+            else:
+                dcm.save_as(filepath, write_like_original=False)
+            filepaths.append(filepath)
+    msg('Synthetic: {} files in `{}`'.format(len(filepaths), dirpath),
+        verbose, VERB_LVL['low'])
+    return filepaths
+
+
+# ======================================================================
+def handle_arg():
+    """
+    Handle command-line application arguments.
+    """
+    # :: Create Argument Parser
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog=fmtm('v.{version} - {author}\n{license}', INFO),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    # :: Add POSIX standard arguments
+    arg_parser.add_argument(
+        '--ver', '--version',
+        version=fmt(
+            '%(prog)s - ver. {version}\n{}\n{copyright} {author}\n{notice}',
+            next(line for line in __doc__.splitlines() if line), **INFO),
+        action='version')
+    arg_parser.add_argument(
+        '-v', '--verbose',
+        action='count', default=D_VERB_LVL,
+        help='increase the level of verbosity [%(default)s]')
+    # :: Add additional arguments
+    arg_parser.add_argument(
+        '-o', '--dirpath', metavar='DIR',
+        default='.',
+        help='set output directory [%(default)s]')
+    arg_parser.add_argument(
+        '-s', '--num_series', metavar='NUM',
+        type=int, default=4,
+        help='set number of series [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--num_slices', metavar='NUM',
+        type=int, default=16,
+        help='set number of slices per series [%(default)s]')
+    arg_parser.add_argument(
+        '-r', '--rows', metavar='NUM',
+        type=int, default=64,
+        help='set number of rows (and columns) [%(default)s]')
+    arg_parser.add_argument(
+        '-m', '--multiframe',
+        action='store_true',
+        help='store each series in a multi-frame file [%(default)s]')
+    arg_parser.add_argument(
+        '-z', '--compression', metavar='|'.join(sorted(COMPRESSORS)),
+        default=None,
+        help='set compression of the files [%(default)s]')
+    arg_parser.add_argument(
+        '-p', '--protocol_size', metavar='BYTES',
+        type=int, default=16384,
+        help='set size of the protocol header [%(default)s]')
+    return arg_parser
+
+
+# ======================================================================
+def main():
+    """
+    Main entry point for the script.
+    """
+    # :: handle program parameters
+    arg_parser = handle_arg()
+    args = arg_parser.parse_args()
+    # :: print debug info
+    if args.verbose >= VERB_LVL['debug']:
+        arg_parser.print_help()
+        msg('\nARGS: ' + str(vars(args)), args.verbose, VERB_LVL['debug'])
+    msg(__doc__.strip())
+    begin_time = datetime.datetime.now()
+
+    make_session(
+        args.dirpath, args.num_series, args.num_slices, args.rows,
+        args.multiframe, args.compression, args.protocol_size,
+        verbose=args.verbose)
+
+    exec_time = datetime.datetime.now() - begin_time
+    msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
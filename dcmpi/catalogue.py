@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: persistent catalogue of the imported DICOM instances.
+
+Note: the instances are identified by their SOPInstanceUID, and indexed by
+series (SeriesInstanceUID) and study (StudyInstanceUID).
+For each instance, the location of the imported file (updated when it is
+sorted) and the SHA-256 digest of its (decompressed) content are recorded,
+so that the instances pushed again (e.g. by the scanner) are detected with
+a single index lookup, and skipped at import time if their content is the
+same (only the sources of already imported instances are hashed).
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import time  # Time access and conversions
+import hashlib  # Secure hashes and message digests
+import sqlite3  # DB-API 2.0 interface for SQLite databases
+import threading  # Thread-based parallelism
+
+# :: External Imports
+
+# :: External Imports Submodules
+
+# :: Local Imports
+import dcmpi.util as utl
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+
+# ======================================================================
+CATALOGUE_FILENAME = 'dcmpi_catalogue.sqlite'
+
+# the DICOM fields identifying an instance, its series and its study
+UID_TAGS = (
+    'SOPInstanceUID', 'SeriesInstanceUID', 'StudyInstanceUID',
+    'SeriesNumber', 'SeriesDescription')
+
+D_CHUNK_SIZE = 2 ** 20  # 1 MiB
+# the time waited for the other writers (e.g. concurrent imports)
+D_TIMEOUT = 60.0  # s
+
+
+# ======================================================================
+def get_uids(dcm):
+    """
+    Get the UIDs (and the series ID) of a DICOM header.
+
+    Args:
+        dcm (pydicom.Dataset): The DICOM header.
+
+    Returns:
+        uids (dict|None): The UIDs, if the instance UID is available.
+            Contains: `sop_uid`, `series_uid`, `study_uid` and `src_id`
+            (the series ID, see `dcmpi.util.get_series_id()`, None if not
+            available).
+
+    Examples:
+        >>> class Header(dict):
+        ...     __getattr__ = dict.get
+        >>> sorted(get_uids(Header(
+        ...     SOPInstanceUID='1.2.3', SeriesInstanceUID='1.2',
+        ...     StudyInstanceUID='1')).items())
+        [('series_uid', '1.2'), ('sop_uid', '1.2.3'), ('src_id', None), \
+('study_uid', '1')]
+        >>> print(get_uids(Header()))
+        None
+    """
+    sop_uid = getattr(dcm, 'SOPInstanceUID', None)
+    if not sop_uid:
+        return None
+    try:
+        src_id = utl.get_series_id(dcm)
+    except (AttributeError, TypeError, ValueError):
+        src_id = None
+    return dict(
+        sop_uid=str(sop_uid),
+        series_uid=str(getattr(dcm, 'SeriesInstanceUID', None) or ''),
+        study_uid=str(getattr(dcm, 'StudyInstanceUID', None) or ''),
+        src_id=src_id)
+
+
+# ======================================================================
+def read_uids(
+        filepath,
+        compression=None):
+    """
+    Read the UIDs of a DICOM file (parsing only the required fields).
+
+    Args:
+        filepath (str): The path to the (possibly compressed) DICOM file.
+        compression (str|None): The compression, if any.
+
+    Returns:
+        uids (dict|None): The UIDs, if available.
+            See `get_uids()` for more details.
+    """
+    try:
+        with utl.open_compressed(filepath, 'rb', compression) as file_obj:
+            dcm, offset = utl.read_dicom_header(file_obj, UID_TAGS)
+    except Exception:
+        return None
+    return get_uids(dcm)
+
+
+# ======================================================================
+def file_digest(
+        filepath,
+        compression=None,
+        chunk_size=D_CHUNK_SIZE):
+    """
+    Compute the digest of the (decompressed) content of a file.
+
+    Args:
+        filepath (str): The path to the file.
+        compression (str|None): The compression, if any.
+        chunk_size (int): The size of the chunks read.
+
+    Returns:
+        result (tuple): The tuple
+            (digest, size) where:
+             - digest (str): The hexadecimal SHA-256 digest.
+             - size (int): The size of the (decompressed) content in bytes.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with utl.open_compressed(filepath, 'rb', compression) as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+# ======================================================================
+def copy_hashed(
+        filepath,
+        out_filepath,
+        compression=None,
+        chunk_size=D_CHUNK_SIZE):
+    """
+    Copy (and decompress) a file, computing the digest of its content.
+
+    The content is read only once, for both the copy and the digest.
+
+    Args:
+        filepath (str): The path to the source file.
+        out_filepath (str): The path to the destination file.
+        compression (str|None): The compression of the source file.
+            If not None, the destination file is decompressed.
+        chunk_size (int): The size of the chunks read.
+
+    Returns:
+        result (tuple): The tuple
+            (digest, size) where:
+             - digest (str): The hexadecimal SHA-256 digest.
+             - size (int): The size of the (decompressed) content in bytes.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with utl.open_compressed(filepath, 'rb', compression) as src_file, \
+            open(out_filepath, 'wb') as dst_file:
+        for chunk in iter(lambda: src_file.read(chunk_size), b''):
+            digest.update(chunk)
+            dst_file.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+# ======================================================================
+class Catalogue(object):
+    """
+    Persistent catalogue of the imported DICOM instances (SQLite).
+
+    Each instance (identified by its SOPInstanceUID) has its series and
+    study UIDs, the location of its file (all indexed), the digest and the
+    size of its (decompressed) content and the time it was added.
+    Each change is committed immediately, and the catalogue is in WAL mode,
+    so that concurrent imports (e.g. from `dcmpi_monitor_folder` or
+    `dcmpi_daemon`) can share it.
+
+    Examples:
+        >>> catalogue = Catalogue(':memory:')
+        >>> print(catalogue.get('1.2.3'))
+        None
+        >>> catalogue.add(
+        ...     '1.2.3', series_uid='1.2', study_uid='1',
+        ...     filepath=__file__, digest='abc', size=3)
+        True
+        >>> catalogue.get('1.2.3')['filepath'] == __file__
+        True
+        >>> catalogue.is_duplicate('1.2.3')['filepath'] == __file__
+        True
+        >>> print(catalogue.is_duplicate('4.5.6'))
+        None
+        >>> record = catalogue.is_duplicate(
+        ...     '1.2.3', __file__)  # doctest: +ELLIPSIS
+        W: Conflicting instance `1.2.3` (already in `...`)
+        >>> print(record)
+        None
+        >>> [record['sop_uid'] for record in catalogue.find_series('1.2')]
+        ['1.2.3']
+        >>> len(catalogue.find_study('1')), catalogue.count()
+        (1, 1)
+        >>> catalogue.add('4.5.6', filepath='/a/path/that/does/not/exist')
+        True
+        >>> print(catalogue.is_duplicate('4.5.6'))
+        None
+        >>> catalogue.move({'/a/path/that/does/not/exist': __file__})
+        1
+        >>> catalogue.is_duplicate('4.5.6')['filepath'] == __file__
+        True
+        >>> catalogue.close()
+    """
+    COLUMNS = (
+        'series_uid', 'study_uid', 'filepath', 'digest', 'size', 'added')
+    INDEXED = ('series_uid', 'study_uid', 'filepath')
+    TABLE_NAME = 'instances'
+
+    def __init__(self, filepath, timeout=D_TIMEOUT):
+        """
+        Args:
+            filepath (str): Path to the SQLite catalogue.
+            timeout (int|float): The time waited for the other writers in s.
+        """
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            filepath, timeout=timeout, check_same_thread=False)
+        with self.lock, self.conn:
+            # : the readers do not block the writer (and vice versa)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS {} (sop_uid TEXT PRIMARY KEY, {})'
+                .format(self.TABLE_NAME, ', '.join(self.COLUMNS)))
+            for column in self.INDEXED:
+                self.conn.execute(
+                    'CREATE INDEX IF NOT EXISTS {table}_{column} '
+                    'ON {table} ({column})'.format(
+                        table=self.TABLE_NAME, column=column))
+
+    def count(self):
+        """Get the number of instances."""
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM {}'.format(
+                self.TABLE_NAME)).fetchone()[0]
+
+    def _select(self, where, value):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT sop_uid, {} FROM {} WHERE {} = ?'.format(
+                    ', '.join(self.COLUMNS), self.TABLE_NAME, where),
+                (value,)).fetchall()
+        return [
+            dict(zip(('sop_uid',) + self.COLUMNS, row)) for row in rows]
+
+    def get(self, sop_uid):
+        """
+        Get the record of an instance.
+
+        Args:
+            sop_uid (str): The SOPInstanceUID.
+
+        Returns:
+            record (dict|None): The record (dict of `COLUMNS`), if any.
+        """
+        records = self._select('sop_uid', sop_uid)
+        return records[0] if records else None
+
+    def find_series(self, series_uid):
+        """
+        Get the records of the instances of a series.
+
+        Args:
+            series_uid (str): The SeriesInstanceUID.
+
+        Returns:
+            records (list[dict]): The records (including `sop_uid`).
+        """
+        return self._select('series_uid', series_uid)
+
+    def find_study(self, study_uid):
+        """
+        Get the records of the instances of a study.
+
+        Args:
+            study_uid (str): The StudyInstanceUID.
+
+        Returns:
+            records (list[dict]): The records (including `sop_uid`).
+        """
+        return self._select('study_uid', study_uid)
+
+    def is_duplicate(self, sop_uid, filepath=None, compression=None):
+        """
+        Check if an instance was already imported.
+
+        Args:
+            sop_uid (str): The SOPInstanceUID.
+            filepath (str|None): The path to the source file.
+                If not None, and the instance is in the catalogue, the
+                digest of its (decompressed) content is compared.
+                If None, only the SOPInstanceUID is checked.
+            compression (str|None): The compression of the source file.
+
+        Returns:
+            record (dict|None): The record of the instance, if it is a
+                duplicate.
+                Instances whose file is no longer available (e.g. removed
+                after the backup) are not duplicates.
+                Instances with the same UID but a different content are not
+                duplicates (a warning is issued).
+        """
+        try:
+            record = self.get(sop_uid)
+        except sqlite3.Error as e:
+            msg('W: Catalogue lookup failed: {}'.format(e))
+            return None
+        if record and not os.path.isfile(record['filepath'] or ''):
+            record = None
+        elif record and filepath \
+                and record['digest'] != file_digest(filepath, compression)[0]:
+            msg('W: Conflicting instance `{}` (already in `{}`)'.format(
+                sop_uid, record['filepath']))
+            record = None
+        return record
+
+    def add(self, sop_uid, **kws):
+        """
+        Insert or update the record of an instance.
+
+        Args:
+            sop_uid (str): The SOPInstanceUID.
+            **kws: The fields to update (must be in `COLUMNS`).
+                If not specified, `added` is the current time.
+
+        Returns:
+            result (bool): True if the record was saved.
+                Failures (e.g. the catalogue locked for too long by other
+                writers) are reported, but do not stop the import: the
+                instance would only be imported again.
+        """
+        kws.setdefault('added', time.time())
+        keys = [key for key in self.COLUMNS if key in kws]
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    'INSERT OR IGNORE INTO {} (sop_uid) VALUES (?)'.format(
+                        self.TABLE_NAME), (sop_uid,))
+                self.conn.execute(
+                    'UPDATE {} SET {} WHERE sop_uid = ?'.format(
+                        self.TABLE_NAME,
+                        ', '.join(key + ' = ?' for key in keys)),
+                    [kws[key] for key in keys] + [sop_uid])
+        except sqlite3.Error as e:
+            msg('W: Catalogue update of `{}` failed: {}'.format(sop_uid, e))
+            return False
+        else:
+            return True
+
+    def move(self, filepaths):
+        """
+        Update the location of the files (e.g. after sorting).
+
+        Args:
+            filepaths (dict): The old path -> the new path.
+
+        Returns:
+            num_moved (int): The number of records updated.
+        """
+        try:
+            with self.lock, self.conn:
+                return self.conn.executemany(
+                    'UPDATE {} SET filepath = ? WHERE filepath = ?'.format(
+                        self.TABLE_NAME),
+                    [(new, old) for old, new in filepaths.items()]).rowcount
+        except sqlite3.Error as e:
+            msg('W: Catalogue update failed: {}'.format(e))
+            return 0
+
+    def close(self):
+        self.conn.close()
+
+
+# ======================================================================
+if __name__ == '__main__':
+    import doctest  # Test interactive Python examples
+
+    msg(__doc__.strip())
+    doctest.testmod()
@@ -38,12 +38,14 @@ import time  # Time access and conversions
 import datetime  # Basic date and time types
 import re  # Regular expression operations
 # import operator  # Standard operators as functions
-# import collections  # High-performance container datatypes
+import collections  # High-performance container datatypes
 import argparse  # Parser for command-line options, arguments and sub-commands
 # import itertools  # Functions creating iterators for efficient looping
 # import functools  # Higher-order functions and operations on callable objects
 import subprocess  # Subprocess management
-# import multiprocessing  # Process-based parallelism
+import multiprocessing  # Process-based parallelism
+import multiprocessing.pool  # Process-based parallelism: pools
+import glob  # Unix style pathname pattern expansion
 # import csv  # CSV File Reading and Writing [CSV: Comma-Separated Values]
 import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 
@@ -57,7 +59,7 @@ import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 # import nibabel as nib  # NiBabel (NeuroImaging I/O Library)
 # import nipy  # NiPy (NeuroImaging in Python)
 # import nipype  # NiPype (NiPy Pipelines and Interfaces)
-import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+# import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 
 # :: External Imports Submodules
 # import matplotlib.pyplot as plt  # Matplotlib's pyplot: MATLAB-like syntax
@@ -74,9 +76,14 @@ import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 # import mri_tools.modules.geometry as mrg
 # from mri_tools.modules.sequences import mp2rage
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import dcmpi_daemon
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+pydcm = lazy_import('pydicom')  # PyDicom (Read, modify and write DICOM files.)
 
 
 # ======================================================================
@@ -196,6 +203,207 @@ def send_mail_dcm(
             msg(' : (you asked only for recipient <{}>).'.format(email_addrs))
 
 
+# ======================================================================
+# a compiled rule: predicate on the DICOM information and routed action
+Rule = collections.namedtuple('Rule', ('name', 'predicate', 'tags', 'action'))
+
+# compiled match expressions cache: canonical JSON -> (predicate, tags)
+_COMPILED_MATCHES = {}
+
+
+# ======================================================================
+def compile_match(match):
+    """
+    Compile a match expression into a predicate.
+
+    The regular expressions are compiled once, and compiled expressions are
+    cached, so that evaluating the same expression many times is cheap.
+
+    Args:
+        match (str|dict): The (JSON-encoded) match expression.
+            Any key not starting with `_` should specify a DICOM field, while
+            the val should contain a regular expression (or a list of
+            regular expressions, any of which must match).
+            Keys starting with `_` contain special directives:
+             - `_concat` (str): the concatenation method for matching rules.
+               Accepted values are: ['and'|'or']
+             - `_and` (list): sub-expressions that must all match.
+             - `_or` (list): sub-expressions of which any must match.
+             - `_not` (dict): sub-expression that must not match.
+            Sub-expressions can be nested arbitrarily.
+
+    Returns:
+        result (tuple): The tuple
+            (predicate, tags) where:
+             - predicate (callable): The function `info -> bool`, where
+               `info` is a dict of DICOM field -> string value.
+             - tags (frozenset[str]): The DICOM fields required.
+
+    Raises:
+        ValueError: if the expression is not valid.
+
+    Examples:
+        >>> predicate, tags = compile_match(
+        ...     '{"_concat": "or", "StationName": "SEPT", '
+        ...     '"_and": [{"StudyDescription": "^a"}, '
+        ...     '{"_not": {"PatientSex": "F"}}]}')
+        >>> sorted(tags)
+        ['PatientSex', 'StationName', 'StudyDescription']
+        >>> predicate({'StationName': 'SEPTEMSYS'})
+        True
+        >>> predicate({'StudyDescription': 'abc', 'PatientSex': 'F'})
+        False
+        >>> predicate({'StudyDescription': 'abc', 'PatientSex': 'M'})
+        True
+    """
+    if not isinstance(match, dict):
+        match = json.loads(match)
+    key = json.dumps(match, sort_keys=True)
+    if key in _COMPILED_MATCHES:
+        return _COMPILED_MATCHES[key]
+    tags = set()
+
+    def _field(field, patterns):
+        if not isinstance(patterns, (list, tuple)):
+            patterns = [patterns]
+        patterns = [re.compile(pattern) for pattern in patterns]
+        tags.add(field)
+        return lambda info: any(
+            pattern.match(info.get(field, '')) for pattern in patterns)
+
+    def _combine(func, predicates):
+        return lambda info: func(predicate(info) for predicate in predicates)
+
+    def _compile(expr):
+        if isinstance(expr, (list, tuple)):
+            return _combine(all, [_compile(item) for item in expr])
+        concat = expr.get('_concat', 'and').lower()
+        if concat not in ('and', 'or'):
+            raise ValueError('Unknown concatenation method.')
+        predicates = []
+        for field, val in sorted(expr.items()):
+            if field == '_concat':
+                continue
+            elif field == '_and':
+                predicates.append(
+                    _combine(all, [_compile(item) for item in val]))
+            elif field == '_or':
+                predicates.append(
+                    _combine(any, [_compile(item) for item in val]))
+            elif field == '_not':
+                predicates.append(
+                    (lambda predicate: lambda info: not predicate(info))(
+                        _compile(val)))
+            elif field.startswith('_'):
+                raise ValueError('Unknown directive `{}`.'.format(field))
+            else:
+                predicates.append(_field(field, val))
+        return _combine(all if concat == 'and' else any, predicates)
+
+    result = _compile(match), frozenset(tags)
+    _COMPILED_MATCHES[key] = result
+    return result
+
+
+# ======================================================================
+def compile_rules(rules):
+    """
+    Compile a set of routing rules.
+
+    Args:
+        rules (str|list[dict]): The rules (or the path to a JSON file).
+            Each rule is a dict with the following keys:
+             - `name` (str): The rule name (optional).
+             - `match` (str|dict): The match expression.
+               See `compile_match()` for more details.
+             - `action` (str): The action to perform if matched.
+               See `perform_action()` for more details.
+
+    Returns:
+        rules (list[Rule]): The compiled rules.
+    """
+    if not isinstance(rules, (list, tuple)):
+        with open(rules, 'r') as rules_file:
+            rules = json.load(rules_file)
+    compiled = []
+    for i, rule in enumerate(rules):
+        predicate, tags = compile_match(rule.get('match', {}))
+        compiled.append(Rule(
+            rule.get('name', str(i)), predicate, tags, rule.get('action', '')))
+    return compiled
+
+
+# ======================================================================
+def read_info(
+        dcm_filepath,
+        tags,
+        compression=None):
+    """
+    Read the specified fields from a DICOM file.
+
+    Only the header is read, and only the required fields are parsed.
+
+    Args:
+        dcm_filepath (str): Path to the (possibly compressed) DICOM file.
+        tags (Iterable[str]): The DICOM fields (keywords) to read.
+        compression (str|None): The compression, if any.
+            See `dcmpi.util.COMPRESSIONS` for more details.
+
+    Returns:
+        info (dict): The DICOM field -> string value.
+            Missing fields have empty values.
+    """
+    tags = sorted(tags)
+    with utl.open_compressed(dcm_filepath, 'rb', compression) as file_obj:
+        dcm, offset = utl.read_dicom_header(file_obj, tags)
+    info = {}
+    for tag in tags:
+        val = dcm.get(tag)
+        info[tag] = str(val) if val is not None else ''
+    return info
+
+
+# ======================================================================
+def perform_action(
+        action,
+        dirpath,
+        dcm_filepath,
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Perform an action on a DICOM directory.
+
+    Args:
+        action (str): Action to be performed.
+            Accepted values are:
+             - send_email: send an email to the first e-mail found.
+             - dcmpi_cli: run dcmpi_cli pipeline.
+             - email+preprocess: both of the above.
+        dirpath (str): The DICOM directory.
+        dcm_filepath (str): A DICOM file from the directory.
+        force (bool): Force new processing.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        None.
+    """
+    if action.lower() == 'send_mail':
+        send_mail_dcm(dcm_filepath, None, force, verbose)
+    elif action.lower() == 'dcmpi_cli':
+        io_dirs = (dirpath, '/SCR/TEMP')
+        dcmpi_daemon.run_cli(
+            'dcmpi.dcmpi_run_cli', ['-i', io_dirs[0], '-o', io_dirs[1]],
+            verbose=verbose)
+    elif action.lower() == 'email+preprocess':
+        send_mail_dcm(dcm_filepath, None, force, verbose)
+        io_dirs = (dirpath, '/SCR/TEMP')
+        dcmpi_daemon.run_cli(
+            'dcmpi.dcmpi_run_cli', ['-i', io_dirs[0], '-o', io_dirs[1]],
+            verbose=verbose)
+    else:
+        msg('W: Action `{}` not valid.'.format(action))
+
+
 # ======================================================================
 def dcm_analyze_dir(
         dirpath,
@@ -209,70 +417,100 @@ def dcm_analyze_dir(
     Args:
         dirpath (str): Directory where to look for DICOM files.
         match (str): A JSON-encoded dict with matching information.
-            Any key not starting with `_` should specify a DICOM field, while
-            the val should contain a regular expression.
-            Keys starting with `_` contain special directives:
-             - `_concat` (str): the concatenation method for matching rules.
-               Accepted values are: ['and'|'or']
+            See `compile_match()` for more details.
         action (str): Action to be performed.
-            Accepted values are:
-             - send_email: send an email to the first e-mail found.
-             - dcmpi_cli: run dcmpi_cli pipeline.
+            See `perform_action()` for more details.
         force (bool): Force new processing.
         verbose (int): Set level of verbosity.
 
     Returns:
         None.
     """
-    dcm_filepath = utl.find_a_dicom(dirpath)[0]
+    dcm_filepath, compression = utl.find_a_dicom(dirpath)
     try:
-        dcm = pydcm.read_file(dcm_filepath)
-        # check matching
-        conditions = json.loads(match)
-        concat = conditions.pop('_concat').lower() \
-            if '_concat' in conditions else 'and'
-        if concat == 'and':
-            matched = True
-            for key, val in conditions.items():
-                name = getattr(dcm, key) if key in dcm else ''
-                msg('Match `{}`:`{}` (read:`{}`)'.format(key, val, name))
-                if not re.match(val, name):
-                    matched = False
-                    break
-        elif concat == 'or':
-            matched = False
-            for key, val in conditions.items():
-                name = getattr(dcm, key) if key in dcm else ''
-                if re.match(val, name):
-                    matched = True
-                    break
-        else:
-            raise ValueError('Unknown concatenation method.')
+        predicate, tags = compile_match(match)
+        info = read_info(dcm_filepath, tags, compression)
+        msg('Match `{}` (read:`{}`)'.format(match, info))
+        matched = predicate(info)
     except Exception as e:
         print(e)
         msg('E: Could not get information from `{}`.'.format(dcm_filepath))
     else:
         # perform action
         if matched:
-            if action.lower() == 'send_mail':
-                send_mail_dcm(dcm_filepath, None, force, verbose)
-            elif action.lower() == 'dcmpi_cli':
-                io_dirs = (dirpath, '/SCR/TEMP')
-                cmd = os.path.dirname(__file__) + \
-                      '/dcmpi_run_cli.py -i {} -o {}'.format(*io_dirs)
-                subprocess.call(cmd, shell=True)
-            elif action.lower() == 'email+preprocess':
-                send_mail_dcm(dcm_filepath, None, force, verbose)
-                io_dirs = (dirpath, '/SCR/TEMP')
-                cmd = os.path.dirname(__file__) + \
-                      '/dcmpi_run_cli.py -i {} -o {}'.format(*io_dirs)
-                subprocess.call(cmd, shell=True)
-            else:
-                msg('W: Action `{}` not valid.'.format(action))
+            perform_action(action, dirpath, dcm_filepath, force, verbose)
         else:
             msg('I: Match `{}` was not successful.'.format(match))
 
 
+# ======================================================================
+def analyze_dirs(
+        dirpaths,
+        rules,
+        num_threads=None,
+        dry=False,
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Analyze many DICOM directories, routing matches to the rule actions.
+
+    All rules are evaluated in a single pass: for each directory, only one
+    DICOM header is read (in parallel), limited to the fields required by
+    any of the rules. Each matched action is performed once per directory.
+
+    Args:
+        dirpaths (Iterable[str]): The directories to analyze.
+            Glob patterns are expanded.
+        rules (str|list): The routing rules.
+            See `compile_rules()` for more details.
+        num_threads (int|None): The number of threads reading the headers.
+            If None, uses the number of available CPUs.
+        dry (bool): Only report the matches, without performing the actions.
+        force (bool): Force new processing.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        matches (dict): The directory -> the names of the matched rules.
+    """
+    rules = compile_rules(rules)
+    tags = frozenset().union(*(rule.tags for rule in rules))
+    dirpaths = sorted(set(
+        dirpath for pattern in dirpaths for dirpath in glob.glob(pattern)
+        if os.path.isdir(dirpath)))
+    msg('Analyze: {} dirs, {} rules, {} fields'.format(
+        len(dirpaths), len(rules), len(tags)))
+
+    def _read(dirpath):
+        dcm_filepath, compression = utl.probe_dir(dirpath)
+        try:
+            return dcm_filepath, read_info(dcm_filepath, tags, compression)
+        except Exception as e:
+            print(e)
+            msg('E: Could not get information from `{}`.'.format(dirpath))
+            return dcm_filepath, None
+
+    pool = multiprocessing.pool.ThreadPool(
+        num_threads or multiprocessing.cpu_count())
+    matches = {}
+    for dirpath, (dcm_filepath, info) in zip(
+            dirpaths, pool.imap(_read, dirpaths)):
+        if info is None:
+            continue
+        matched = [rule for rule in rules if rule.predicate(info)]
+        matches[dirpath] = [rule.name for rule in matched]
+        msg('Match: {} -> {}'.format(dirpath, matches[dirpath] or '-'),
+            verbose, VERB_LVL['medium'])
+        actions = []
+        for rule in matched:
+            if rule.action not in actions:
+                actions.append(rule.action)
+        for action in actions if not dry else ():
+            perform_action(action, dirpath, dcm_filepath, force, verbose)
+    pool.close()
+    pool.join()
+    return matches
+
+
 # ======================================================================
 def handle_arg():
     """
@@ -300,9 +538,10 @@ def handle_arg():
         action='store_true',
         help='force new processing [%(default)s]')
     arg_parser.add_argument(
-        '-d', '--dirpath', metavar='DIR',
-        default='.',
-        help='set working directory [%(default)s]')
+        '-d', '--dirpaths', metavar='DIR',
+        nargs='+', default=['.'],
+        help='set working directories (glob patterns accepted) '
+             '[%(default)s]')
     arg_parser.add_argument(
         '-m', '--match', metavar='STR',
         default='{"_concat":"and","OperatorsName":"metere@cbs.mpg.de"}',
@@ -311,6 +550,15 @@ def handle_arg():
         '-a', '--action', metavar='STR',
         default='email+preprocess',
         help='set action to perform [%(default)s]')
+    arg_parser.add_argument(
+        '-r', '--rules', metavar='FILE',
+        default=None,
+        help='set routing rules (JSON), overrides match and action '
+             '[%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--dry',
+        action='store_true',
+        help='only report matches, do not perform actions [%(default)s]')
     return arg_parser
 
 
@@ -329,8 +577,9 @@ def main():
     msg(__doc__.strip())
     begin_time = datetime.datetime.now()
 
-    dcm_analyze_dir(
-        args.dirpath, args.match, args.action,
+    rules = args.rules or [{'match': args.match, 'action': args.action}]
+    analyze_dirs(
+        args.dirpaths, rules, None, args.dry,
         args.force, args.verbose)
 
     exec_time = datetime.datetime.now() - begin_time
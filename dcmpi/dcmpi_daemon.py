@@ -0,0 +1,765 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: run the command-line tools on a long-lived (warm) local daemon.
+
+The daemon listens on a Unix socket (in a directory private to the user),
+and only serves (and is only trusted by) the processes of the same user.
+Each job runs the `main()` of a DCMPI module in a process forked from a
+single-threaded fork server, where all the DCMPI modules (and their
+dependencies) are already imported (so that neither the start-up of the
+interpreter nor the imports are paid again), while its output is streamed
+back to the client.
+
+The other tools (e.g. `dcmpi_monitor_folder`, `dcmpi_analyze_dir`) submit
+their DCMPI jobs to the daemon when it is running, and run them as new
+processes otherwise.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import sys  # System-specific parameters and functions
+import time  # Time access and conversions
+import datetime  # Basic date and time types
+import re  # Regular expression operations
+import argparse  # Parser for command-line options, arguments and sub-commands
+import subprocess  # Subprocess management
+import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import shlex  # Simple lexical analysis
+import socket  # Low-level networking interface
+import signal  # Set handlers for asynchronous events
+import threading  # Thread-based parallelism
+import tempfile  # Generate temporary files and directories
+import struct  # Interpret bytes as packed binary data
+import stat  # Interpreting stat() results
+import multiprocessing  # Process-based parallelism
+import multiprocessing.forkserver  # Process-based parallelism: fork server
+import importlib  # The implementation of import
+import importlib.util  # The implementation of import: utilities
+import codecs  # Codec registry and base classes
+import traceback  # Print or retrieve a stack traceback
+import warnings  # Warning control
+
+# :: External Imports
+
+# :: External Imports Submodules
+
+# :: Local Imports
+from dcmpi import INFO
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+
+# ======================================================================
+def _default_socket_filepath():
+    """
+    Get the default path of the Unix socket.
+
+    Returns:
+        socket_filepath (str): The path in the user runtime directory
+            (`$XDG_RUNTIME_DIR`), if available, or in a per-user directory
+            in the temporary directory otherwise.
+    """
+    dirpath = os.getenv('XDG_RUNTIME_DIR') or os.path.join(
+        tempfile.gettempdir(), 'dcmpi-{}'.format(os.getuid()))
+    return os.path.join(dirpath, 'dcmpi.sock')
+
+
+# ======================================================================
+D_SOCKET_FILEPATH = os.getenv('DCMPI_SOCKET') or _default_socket_filepath()
+
+# the modules whose `main()` can be run by the daemon (and are preloaded)
+MODULES = (
+    'dcmpi.dcmpi_run', 'dcmpi.dcmpi_run_cli', 'dcmpi.dcmpi_analyze_dir',
+    'dcmpi.dcmpi_update', 'dcmpi.do_acquire_sources', 'dcmpi.do_sorting',
+    'dcmpi.do_backup', 'dcmpi.do_report', 'dcmpi.get_info',
+    'dcmpi.get_info_table', 'dcmpi.get_meta', 'dcmpi.get_nifti',
+    'dcmpi.get_prot')
+
+# set in the environment of the jobs run by the daemon
+WORKER_ENV = 'DCMPI_DAEMON_WORKER'
+
+# shell features that cannot be run as a module `main()`
+SHELL_CHARS = re.compile(r'[|&;<>()$`\n*?]')
+
+# : when the daemon is run with `-m`, each job (forked by the fork server,
+#   where this module is preloaded) imports it again as `__mp_main__`
+warnings.filterwarnings(
+    'ignore', r"'dcmpi\.dcmpi_daemon' found in sys\.modules", RuntimeWarning)
+
+
+# ======================================================================
+def _exit_code(code):
+    """
+    Convert the value returned by `main()` (or `sys.exit()`) to an exit code.
+
+    Args:
+        code (int|str|None): The returned value.
+
+    Returns:
+        exit_code (int): The exit code.
+
+    Examples:
+        >>> [_exit_code(x) for x in (None, 0, 2, 'Error', True)]
+        [0, 0, 2, 1, 1]
+    """
+    if code is None:
+        return 0
+    elif isinstance(code, bool) or not isinstance(code, int):
+        return 1
+    else:
+        return code
+
+
+# ======================================================================
+def run_module(
+        module_name,
+        argv=()):
+    """
+    Run the `main()` of a module in the current process.
+
+    Args:
+        module_name (str): The name of the module.
+        argv (Iterable[str]): The command-line arguments.
+
+    Returns:
+        exit_code (int): The exit code.
+    """
+    old_argv = sys.argv
+    sys.argv = [module_name] + list(argv)
+    try:
+        exit_code = _exit_code(importlib.import_module(module_name).main())
+    except SystemExit as e:
+        exit_code = _exit_code(e.code)
+    finally:
+        sys.argv = old_argv
+    return exit_code
+
+
+# ======================================================================
+def resolve_cmd(cmd):
+    """
+    Find the DCMPI module (and arguments) run by a shell command.
+
+    Args:
+        cmd (str): The shell command.
+
+    Returns:
+        result (tuple|None): The tuple (module_name, argv) where:
+             - module_name (str): The name of the module.
+             - argv (list[str]): The command-line arguments.
+            None if the command does not (only) run a DCMPI module.
+
+    Examples:
+        >>> resolve_cmd('/opt/dcmpi/dcmpi_analyze_dir.py -d /data/s1')
+        ('dcmpi.dcmpi_analyze_dir', ['-d', '/data/s1'])
+        >>> resolve_cmd('python3 -m dcmpi.get_prot -i dcm -o prot')
+        ('dcmpi.get_prot', ['-i', 'dcm', '-o', 'prot'])
+        >>> resolve_cmd('dcmpi__get_info "a b"')
+        ('dcmpi.get_info', ['a b'])
+        >>> print(resolve_cmd('dcmpi_run_cli -i /data/s1 > log.txt'))
+        None
+        >>> print(resolve_cmd('ls -l'))
+        None
+    """
+    try:
+        tokens = shlex.split(cmd)
+    except ValueError:
+        return None
+    unquoted = re.sub(r'"[^"]*"|\'[^\']*\'', '', cmd)
+    if not tokens or SHELL_CHARS.search(unquoted):
+        return None
+    if os.path.basename(tokens[0]).startswith('python') \
+            and tokens[1:2] == ['-m'] and len(tokens) > 2:
+        module_name, argv = tokens[2], tokens[3:]
+    else:
+        name = os.path.splitext(os.path.basename(tokens[0]))[0]
+        if name.startswith('dcmpi__'):
+            name = name[len('dcmpi__'):]
+        module_name, argv = 'dcmpi.' + name, tokens[1:]
+    return (module_name, argv) if module_name in MODULES else None
+
+
+# ======================================================================
+def _send(conn, message):
+    """
+    Send a message (a JSON line) through a socket.
+
+    Args:
+        conn (socket.socket): The socket.
+        message (dict): The message.
+
+    Returns:
+        None.
+    """
+    conn.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+
+# ======================================================================
+def _receive(conn_file):
+    """
+    Receive the messages (JSON lines) from a socket file.
+
+    Args:
+        conn_file (file): The file object of the socket (binary).
+
+    Yields:
+        message (dict): The message.
+    """
+    for line in conn_file:
+        if line.strip():
+            yield json.loads(line.decode('utf-8'))
+
+
+# ======================================================================
+def _peer_uid(conn):
+    """
+    Get the user ID of the process at the other end of a Unix socket.
+
+    Args:
+        conn (socket.socket): The connected Unix socket.
+
+    Returns:
+        uid (int|None): The user ID, if available (i.e. on Linux).
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = conn.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    pid, uid, gid = struct.unpack('3i', creds)
+    return uid
+
+
+# ======================================================================
+def _check_private_dir(dirpath):
+    """
+    Create a directory private to the user, or check an existing one.
+
+    Args:
+        dirpath (str): The path to the directory.
+
+    Returns:
+        None.
+
+    Raises:
+        PermissionError: If the directory is not owned by the user, or it
+            is accessible by other users.
+    """
+    if not os.path.isdir(dirpath):
+        os.makedirs(dirpath, mode=0o700, exist_ok=True)
+    dir_stat = os.lstat(dirpath)
+    if not stat.S_ISDIR(dir_stat.st_mode) \
+            or dir_stat.st_uid != os.getuid() \
+            or dir_stat.st_mode & 0o077:
+        raise PermissionError(
+            'Directory `{}` must be owned by the user and private '
+            '(mode 0700).'.format(dirpath))
+
+
+# ======================================================================
+class Daemon(object):
+    """
+    Serve the jobs on a Unix socket, each in a process from the fork server.
+
+    The protocol uses JSON lines. The client sends a request:
+     - `{"action": "run", "module": str, "argv": list, "cwd": str,
+       "timeout": float|None}`: run `main()` of the module;
+     - `{"action": "status"}`: get the daemon status;
+     - `{"action": "stop"}`: stop the daemon (after the running jobs).
+
+    For `run`, the daemon replies with `{"state": "queued"|"running"}`,
+    then `{"out": str}` for each chunk of output (stdout and stderr),
+    and finally `{"exit_code": int|null}` (null if the job was killed).
+    Errors are replied as `{"error": str}`.
+    Only the connections from the same user are served.
+    """
+
+    def __init__(
+            self,
+            socket_filepath=D_SOCKET_FILEPATH,
+            num_workers=None,
+            modules=MODULES,
+            verbose=D_VERB_LVL):
+        """
+        Args:
+            socket_filepath (str): The path to the Unix socket.
+                Its directory must be private to the user (it is created
+                if missing).
+            num_workers (int|None): The maximum number of concurrent jobs.
+                If None, uses the number of available CPUs.
+            modules (Iterable[str]): The modules that can be run.
+                These are imported (together with pydicom) by the fork
+                server on start.
+            verbose (int): Set level of verbosity.
+        """
+        self.socket_filepath = socket_filepath
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.modules = tuple(modules)
+        self.verbose = verbose
+        self.slots = threading.BoundedSemaphore(self.num_workers)
+        self.lock = threading.Lock()
+        self.counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        self.begin = None
+        self.sock = None
+        self.is_running = False
+        self.context = multiprocessing.get_context('forkserver')
+
+    def preload(self):
+        """
+        Start the fork server, with the modules imported.
+
+        The jobs are forked from the (single-threaded) fork server, rather
+        than from the daemon, which runs a thread for each connection.
+        The lazily imported dependencies (e.g. pydicom) are imported first,
+        so that they are already executed in the jobs.
+        """
+        for module_name in self.modules:
+            if importlib.util.find_spec(module_name) is None:
+                msg('W: Could not preload `{}`.'.format(module_name))
+        multiprocessing.forkserver.set_forkserver_preload(
+            ['pydicom'] + list(self.modules))
+        multiprocessing.forkserver.ensure_running()
+
+    def serve(self):
+        """
+        Accept the client connections until stopped.
+
+        Returns:
+            None.
+        """
+        _check_private_dir(os.path.dirname(
+            os.path.abspath(self.socket_filepath)))
+        if os.path.exists(self.socket_filepath):
+            if ping(self.socket_filepath):
+                raise OSError('Daemon already running on `{}`.'.format(
+                    self.socket_filepath))
+            os.remove(self.socket_filepath)
+        self.preload()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.socket_filepath)
+        os.chmod(self.socket_filepath, 0o600)
+        self.sock.listen(16)
+        self.sock.settimeout(1.0)
+        self.begin = time.time()
+        self.is_running = True
+        signal.signal(signal.SIGTERM, lambda *_args: self.stop())
+        msg('Daemon: {} (pid: {}, workers: {})'.format(
+            self.socket_filepath, os.getpid(), self.num_workers))
+        try:
+            while self.is_running:
+                try:
+                    conn, _ = self.sock.accept()
+                except socket.timeout:
+                    continue
+                thread = threading.Thread(target=self._handle, args=(conn,))
+                thread.daemon = True
+                thread.start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.sock.close()
+            if os.path.exists(self.socket_filepath):
+                os.remove(self.socket_filepath)
+            # : wait for the running jobs
+            for i in range(self.num_workers):
+                self.slots.acquire()
+        msg('Daemon: stopped.')
+
+    def stop(self):
+        """Stop accepting new jobs."""
+        self.is_running = False
+
+    def status(self):
+        """
+        Get the daemon status.
+
+        Returns:
+            status (dict): The status, containing the `pid`, the `uptime`
+                (in sec), the number of `workers`, and the number of jobs
+                for each state.
+        """
+        with self.lock:
+            status = dict(self.counts)
+        status.update(
+            pid=os.getpid(), uptime=time.time() - self.begin,
+            workers=self.num_workers)
+        return status
+
+    def _handle(self, conn):
+        """Handle a client connection."""
+        try:
+            with conn, conn.makefile('rb') as conn_file:
+                uid = _peer_uid(conn)
+                if uid is not None and uid != os.getuid():
+                    msg('W: Connection from user {} refused.'.format(uid),
+                        self.verbose, VERB_LVL['low'])
+                    _send(conn, {'error': 'Permission denied.'})
+                    return
+                request = next(_receive(conn_file), {})
+                action = request.get('action')
+                if action == 'run':
+                    self._run(conn, request)
+                elif action == 'status':
+                    _send(conn, self.status())
+                elif action == 'stop':
+                    self.stop()
+                    _send(conn, {'state': 'stopping'})
+                else:
+                    _send(conn, {'error': 'Unknown action `{}`.'.format(
+                        action)})
+        except (IOError, OSError, ValueError) as e:
+            msg('W: Connection: {}'.format(e), self.verbose, VERB_LVL['low'])
+
+    def _count(self, state, delta=1):
+        with self.lock:
+            self.counts[state] += delta
+
+    def _run(self, conn, request):
+        """Run a job (forked by the fork server), streaming its output."""
+        module_name = request.get('module')
+        if module_name not in self.modules:
+            _send(conn, {'error': 'Module `{}` not allowed.'.format(
+                module_name)})
+            return
+        _send(conn, {'state': 'queued'})
+        self._count('queued')
+        with self.slots:
+            self._count('queued', -1)
+            self._count('running')
+            msg('Run: {} {}'.format(module_name, request.get('argv', [])),
+                self.verbose, VERB_LVL['medium'])
+            read_conn, write_conn = self.context.Pipe(duplex=False)
+            process = self.context.Process(
+                target=_work, args=(write_conn, request))
+            process.start()
+            write_conn.close()
+            pid = process.pid
+            timer = threading.Timer(
+                request['timeout'], _kill, (pid,)) \
+                if request.get('timeout') else None
+            if timer:
+                timer.start()
+            _send(conn, {'state': 'running', 'pid': pid})
+            decoder = codecs.getincrementaldecoder('utf-8')('replace')
+            is_connected = True
+            with read_conn:
+                for chunk in iter(
+                        lambda: os.read(read_conn.fileno(), 4096), b''):
+                    if not is_connected:
+                        continue
+                    try:
+                        _send(conn, {'out': decoder.decode(chunk)})
+                    except (IOError, OSError):
+                        # : the client is gone, stop the job
+                        is_connected = False
+                        _kill(pid)
+            process.join()
+            if timer:
+                timer.cancel()
+            exit_code = process.exitcode if process.exitcode >= 0 else None
+            self._count('running', -1)
+            self._count('done' if exit_code == 0 else 'failed')
+            msg('Done: {} ({})'.format(module_name, exit_code),
+                self.verbose, VERB_LVL['medium'])
+            if is_connected:
+                _send(conn, {'exit_code': exit_code})
+
+
+
+# ======================================================================
+def _work(write_conn, request):
+    """Run a job in a process forked by the fork server (never returns)."""
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.dup2(write_conn.fileno(), sys.stdout.fileno())
+        os.dup2(write_conn.fileno(), sys.stderr.fileno())
+        write_conn.close()
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+        os.environ[WORKER_ENV] = str(os.getpid())
+        os.chdir(request.get('cwd') or '.')
+        exit_code = run_module(request['module'], request.get('argv', []))
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+
+
+# ======================================================================
+def _kill(pid):
+    """Kill a process, if still running."""
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+# ======================================================================
+def _connect(socket_filepath=D_SOCKET_FILEPATH):
+    """
+    Connect to the daemon.
+
+    The daemon must be run by the same user: the jobs (including their
+    arguments and working directory) are never sent to other users.
+
+    Args:
+        socket_filepath (str): The path to the Unix socket.
+
+    Returns:
+        conn (socket.socket): The connection.
+
+    Raises:
+        OSError: If the daemon is not running.
+        PermissionError: If the socket (or the daemon) is of another user.
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_filepath)
+        uid = _peer_uid(conn)
+        if uid is None:
+            uid = os.stat(socket_filepath).st_uid
+        if uid != os.getuid():
+            msg('W: Daemon socket `{}` of another user (uid: {}).'.format(
+                socket_filepath, uid))
+            raise PermissionError(
+                'Daemon socket `{}` not owned by the user.'.format(
+                    socket_filepath))
+    except (IOError, OSError):
+        conn.close()
+        raise
+    return conn
+
+
+# ======================================================================
+def request(
+        message,
+        socket_filepath=D_SOCKET_FILEPATH):
+    """
+    Send a request to the daemon and get the (single) reply.
+
+    Args:
+        message (dict): The request.
+        socket_filepath (str): The path to the Unix socket.
+
+    Returns:
+        reply (dict): The reply.
+
+    Raises:
+        OSError: If the daemon is not running.
+    """
+    with _connect(socket_filepath) as conn, conn.makefile('rb') as conn_file:
+        _send(conn, message)
+        return next(_receive(conn_file), {})
+
+
+# ======================================================================
+def ping(socket_filepath=D_SOCKET_FILEPATH):
+    """
+    Check if the daemon is running.
+
+    Args:
+        socket_filepath (str): The path to the Unix socket.
+
+    Returns:
+        result (bool): True if the daemon is running, False otherwise.
+    """
+    try:
+        return 'pid' in request({'action': 'status'}, socket_filepath)
+    except (IOError, OSError, ValueError):
+        return False
+
+
+# ======================================================================
+def submit(
+        module_name,
+        argv=(),
+        socket_filepath=D_SOCKET_FILEPATH,
+        timeout=None,
+        out_file=None):
+    """
+    Run a DCMPI module on the daemon, streaming its output.
+
+    Args:
+        module_name (str): The name of the module.
+        argv (Iterable[str]): The command-line arguments.
+        socket_filepath (str): The path to the Unix socket.
+        timeout (float|None): The maximum duration of the job in sec.
+            If None, the job is never interrupted.
+        out_file (file|None): The file where the output is written.
+            If None, `sys.stdout` is used.
+
+    Returns:
+        exit_code (int|None): The exit code of the job.
+            None if the job was killed or the connection was lost.
+
+    Raises:
+        OSError: If the daemon is not running (or is of another user).
+    """
+    out_file = out_file or sys.stdout
+    with _connect(socket_filepath) as conn, conn.makefile('rb') as conn_file:
+        _send(conn, {
+            'action': 'run', 'module': module_name, 'argv': list(argv),
+            'cwd': os.getcwd(), 'timeout': timeout})
+        for message in _receive(conn_file):
+            if 'out' in message:
+                out_file.write(message['out'])
+                out_file.flush()
+            elif 'exit_code' in message:
+                return message['exit_code']
+            elif 'error' in message:
+                msg('E: Daemon: {}'.format(message['error']))
+                return 1
+    return None
+
+
+# ======================================================================
+def run_cli(
+        module_name,
+        argv=(),
+        socket_filepath=D_SOCKET_FILEPATH,
+        timeout=None,
+        verbose=D_VERB_LVL):
+    """
+    Run a DCMPI module, on the daemon if it is running.
+
+    Within a job of the daemon, the module is run in the same process.
+    Otherwise, if the daemon is not running, a new process is started.
+
+    Args:
+        module_name (str): The name of the module.
+        argv (Iterable[str]): The command-line arguments.
+        socket_filepath (str): The path to the Unix socket.
+        timeout (float|None): The maximum duration of the job in sec.
+            If None, the job is never interrupted.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        exit_code (int|None): The exit code of the job.
+            None if the job was killed.
+    """
+    argv = list(argv)
+    msg('Run: {} {}'.format(module_name, argv), verbose, VERB_LVL['medium'])
+    if os.getenv(WORKER_ENV) == str(os.getpid()):
+        return run_module(module_name, argv)
+    try:
+        return submit(module_name, argv, socket_filepath, timeout)
+    except (IOError, OSError):
+        msg('I: Daemon not running, starting a new process.',
+            verbose, VERB_LVL['high'])
+    try:
+        return subprocess.call(
+            [sys.executable, '-m', module_name] + argv, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+
+
+# ======================================================================
+def handle_arg():
+    """
+    Handle command-line application arguments.
+    """
+    # :: Create Argument Parser
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog=fmtm('v.{version} - {author}\n{license}', INFO),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    # :: Add POSIX standard arguments
+    arg_parser.add_argument(
+        '--ver', '--version',
+        version=fmt(
+            '%(prog)s - ver. {version}\n{}\n{copyright} {author}\n{notice}',
+            next(line for line in __doc__.splitlines() if line), **INFO),
+        action='version')
+    arg_parser.add_argument(
+        '-v', '--verbose',
+        action='count', default=D_VERB_LVL,
+        help='increase the level of verbosity [%(default)s]')
+    # :: Add additional arguments
+    arg_parser.add_argument(
+        'action',
+        choices=('serve', 'submit', 'status', 'stop'),
+        help='serve the jobs, submit a job, or query/stop the daemon')
+    arg_parser.add_argument(
+        'job',
+        nargs=argparse.REMAINDER,
+        help='the module (e.g. `dcmpi.dcmpi_run_cli`) and its arguments '
+             '(only for `submit`, after all the other options)')
+    arg_parser.add_argument(
+        '-s', '--socket_filepath', metavar='FILE',
+        default=D_SOCKET_FILEPATH,
+        help='set Unix socket path (in a private directory) [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--num_workers', metavar='NUM',
+        type=int, default=None,
+        help='set maximum number of concurrent jobs. '
+             'If not set, use the number of CPUs [%(default)s]')
+    arg_parser.add_argument(
+        '-t', '--timeout', metavar='X',
+        type=float, default=None,
+        help='set maximum duration of the job in sec [%(default)s]')
+    return arg_parser
+
+
+# ======================================================================
+def main():
+    """
+    Main entry point for the script.
+    """
+    # :: handle program parameters
+    arg_parser = handle_arg()
+    args = arg_parser.parse_args()
+    # :: print debug info
+    if args.verbose >= VERB_LVL['debug']:
+        arg_parser.print_help()
+        msg('\nARGS: ' + str(vars(args)), args.verbose, VERB_LVL['debug'])
+    begin_time = datetime.datetime.now()
+
+    if args.job and args.action != 'submit':
+        arg_parser.error('unrecognized arguments: ' + ' '.join(args.job))
+
+    exit_code = 0
+    if args.action == 'serve':
+        msg(__doc__.strip())
+        Daemon(args.socket_filepath, args.num_workers, MODULES, args.verbose) \
+            .serve()
+    elif args.action == 'submit':
+        if not args.job:
+            arg_parser.error('a module to run is required.')
+        try:
+            exit_code = submit(
+                args.job[0], args.job[1:], args.socket_filepath,
+                args.timeout)
+        except (IOError, OSError) as e:
+            print(e)
+            msg('E: Daemon not running on `{}`.'.format(
+                args.socket_filepath))
+            exit_code = 1
+        else:
+            exit_code = 1 if exit_code is None else exit_code
+    else:
+        try:
+            print(json.dumps(
+                request({'action': args.action}, args.socket_filepath),
+                sort_keys=True))
+        except (IOError, OSError) as e:
+            print(e)
+            msg('E: Daemon not running on `{}`.'.format(
+                args.socket_filepath))
+            exit_code = 1
+
+    exec_time = datetime.datetime.now() - begin_time
+    msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return exit_code
+
+
+# ======================================================================
+if __name__ == '__main__':
+    sys.exit(main())
@@ -38,7 +38,7 @@ except ImportError:
     import tkSimpleDialog as simpledialog
 
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 
@@ -35,7 +35,13 @@ import time  # Time access and conversions
 import datetime  # Basic date and time types
 import argparse  # Parser for command-line options, arguments and sub-commands
 import subprocess  # Subprocess management
-import blessed  # Wrapper for terminal coloring, styling, and positioning
+import select  # Waiting for I/O completion
+import struct  # Interpret strings as packed binary data
+import ctypes  # A foreign function library for Python
+import ctypes.util  # A foreign function library for Python: utilities
+import threading  # Thread-based parallelism
+import sqlite3  # DB-API 2.0 interface for SQLite databases
+# import blessed  # Wrapper for terminal coloring, styling, and positioning
 
 # :: External Imports
 
@@ -43,11 +49,494 @@ import blessed  # Wrapper for terminal coloring, styling, and positioning
 
 # :: Local Imports
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import dcmpi_daemon
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 
 
+# ======================================================================
+# inotify event masks (from `<sys/inotify.h>`)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# events signalling changes in the watched top directory
+TOP_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+
+# events signalling activity within a watched (new) directory
+TREE_EVENTS = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_CREATE | IN_DELETE
+    | IN_MOVED_FROM | IN_MOVED_TO)
+
+INOTIFY_EVENT = struct.Struct(b'iIII')
+
+
+# ======================================================================
+class Inotify(object):
+    """
+    Minimal inotify interface (Linux only) using `ctypes`.
+
+    Raises:
+        OSError: if inotify is not available.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError('inotify not available.')
+        self.libc.inotify_add_watch.argtypes = (
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed.')
+        self.watches = {}
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        """
+        Watch a path for the specified events.
+
+        Args:
+            path (str): The path to watch.
+            mask (int): The events to watch.
+
+        Returns:
+            wd (int): The watch descriptor (negative on failure).
+                Failures (e.g. `fs.inotify.max_user_watches` reached) are
+                reported.
+        """
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(path), mask)
+        if wd >= 0:
+            self.watches[wd] = path
+        else:
+            msg('W: Could not watch `{}` ({}).'.format(
+                path, os.strerror(ctypes.get_errno())))
+        return wd
+
+    def rm_watch(self, wd):
+        """
+        Stop watching a path.
+
+        Args:
+            wd (int): The watch descriptor.
+
+        Returns:
+            None.
+        """
+        if self.watches.pop(wd, None) is not None:
+            # : fails if already removed by the kernel (e.g. deleted path)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def rm_tree(self, path):
+        """
+        Stop watching a path and all its sub-paths.
+
+        Args:
+            path (str): The path.
+
+        Returns:
+            None.
+        """
+        for wd, watched in list(self.watches.items()):
+            if watched == path or watched.startswith(path + os.sep):
+                self.rm_watch(wd)
+
+    def read(self, timeout=None):
+        """
+        Read the pending events.
+
+        Args:
+            timeout (float|None): The maximum waiting time in seconds.
+                If None, wait until an event is available.
+
+        Returns:
+            events (list[tuple]): The events as (path, mask, name) tuples,
+                where `path` is the watched path.
+        """
+        events = []
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except OSError:
+                buf = b''
+            i = 0
+            while i + INOTIFY_EVENT.size <= len(buf):
+                wd, mask, cookie, size = INOTIFY_EVENT.unpack_from(buf, i)
+                i += INOTIFY_EVENT.size
+                name = os.fsdecode(buf[i:i + size].rstrip(b'\0'))
+                i += size
+                events.append((self.watches.get(wd), mask, name))
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+# ======================================================================
+class Journal(object):
+    """
+    Durable journal of the monitored directories (SQLite).
+
+    Each directory (identified by its path) has a state:
+     - 'pending': new, waiting for its content to be quiet.
+     - 'seen': known, but not to be processed (e.g. already present when
+       the journal was created, or not passing the check).
+     - 'queued', 'running', 'done', 'failed': the state of its job.
+    together with its fingerprint (to detect re-created directories) and
+    the job information (see `JobQueue`).
+    Each change is committed immediately.
+    """
+    COLUMNS = (
+        'state', 'fingerprint', 'seen', 'cmd', 'attempts', 'enqueued',
+        'next_try', 'started', 'finished', 'ret_code')
+    TABLE_NAME = 'dirs'
+
+    def __init__(self, filepath):
+        """
+        Args:
+            filepath (str): Path to the SQLite journal.
+        """
+        self.filepath = filepath
+        # : an existing journal may be empty (e.g. an empty directory)
+        self.is_new = not os.path.isfile(filepath)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(filepath, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS {} (path TEXT PRIMARY KEY, {})'
+                .format(self.TABLE_NAME, ', '.join(self.COLUMNS)))
+
+    def load(self):
+        """
+        Load the journal.
+
+        Returns:
+            records (dict): path -> record (dict of `COLUMNS`).
+        """
+        with self.lock:
+            rows = self.conn.execute('SELECT path, {} FROM {}'.format(
+                ', '.join(self.COLUMNS), self.TABLE_NAME)).fetchall()
+        return {row[0]: dict(zip(self.COLUMNS, row[1:])) for row in rows}
+
+    def update(self, path, **kws):
+        """
+        Insert or update the record of a directory.
+
+        Args:
+            path (str): The directory path.
+            **kws: The fields to update (must be in `COLUMNS`).
+
+        Returns:
+            None.
+        """
+        keys = [key for key in self.COLUMNS if key in kws]
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO {} (path) VALUES (?)'.format(
+                    self.TABLE_NAME), (path,))
+            self.conn.execute(
+                'UPDATE {} SET {} WHERE path = ?'.format(
+                    self.TABLE_NAME, ', '.join(key + ' = ?' for key in keys)),
+                [kws[key] for key in keys] + [path])
+
+    def delete(self, path):
+        """Delete the record of a directory."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                'DELETE FROM {} WHERE path = ?'.format(self.TABLE_NAME),
+                (path,))
+
+    def close(self):
+        self.conn.close()
+
+
+# ======================================================================
+def _dir_fingerprint(dirpath):
+    """
+    Compute the fingerprint identifying a directory (not its content).
+
+    Args:
+        dirpath (str): The directory path.
+
+    Returns:
+        fingerprint (str): The device and inode numbers.
+    """
+    stat = os.stat(dirpath)
+    return '{}:{}'.format(stat.st_dev, stat.st_ino)
+
+
+# ======================================================================
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+JOB_FIELDS = (
+    'cmd', 'state', 'attempts', 'enqueued', 'next_try', 'started',
+    'finished', 'ret_code')
+
+
+# ======================================================================
+class JobQueue(object):
+    """
+    Queue of shell commands run by a pool of worker threads.
+
+    Each job is identified by a key (e.g. the directory path) and runs its
+    command with an optional timeout. Failed jobs are retried with an
+    exponential backoff. If a journal is used, each change is recorded and
+    unfinished jobs are resumed on load (interrupted jobs are run again).
+    """
+
+    def __init__(
+            self,
+            num_workers=2,
+            timeout=None,
+            max_retries=3,
+            backoff=60.0,
+            journal=None,
+            verbose=D_VERB_LVL):
+        """
+        Args:
+            num_workers (int): The number of concurrent jobs.
+            timeout (float|None): The maximum duration of a job in sec.
+                If None, jobs are never interrupted.
+            max_retries (int): The maximum number of retries of a job.
+            backoff (float): The delay before the first retry in sec.
+                The delay doubles with each retry.
+            journal (Journal|None): The journal of the jobs.
+                If None, the queue is not persistent.
+            verbose (int): Set level of verbosity.
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.journal = journal
+        self.verbose = verbose
+        self.jobs = {}
+        self.lock = threading.Condition()
+        self.is_running = True
+        if journal:
+            for key, record in journal.load().items():
+                if record['state'] in JOB_STATES:
+                    self.jobs[key] = {
+                        name: record[name] for name in JOB_FIELDS}
+                    if record['state'] == 'running':
+                        self.jobs[key]['state'] = 'queued'
+                        self._save(key)
+        self.workers = [
+            threading.Thread(target=self._work) for i in range(num_workers)]
+        for worker in self.workers:
+            worker.daemon = True
+            worker.start()
+
+    def put(self, key, cmd):
+        """
+        Add a job to the queue (unless already queued or running).
+
+        Args:
+            key (str): The job identifier.
+            cmd (str): The shell command to execute.
+
+        Returns:
+            result (bool): True if the job was added, False otherwise.
+        """
+        with self.lock:
+            job = self.jobs.get(key)
+            if job and job['state'] in ('queued', 'running'):
+                return False
+            self.jobs[key] = {
+                'cmd': cmd, 'state': 'queued', 'attempts': 0,
+                'enqueued': time.time(), 'next_try': 0,
+                'started': None, 'finished': None, 'ret_code': None}
+            self._save(key)
+            self.lock.notify_all()
+        msg('Queue: {}'.format(key), self.verbose, VERB_LVL['medium'])
+        return True
+
+    def _next_job(self):
+        """Wait for the next job to be ready. Call with the lock held."""
+        while self.is_running:
+            now = time.time()
+            queued = [
+                (job['next_try'], job['enqueued'], key)
+                for key, job in self.jobs.items()
+                if job['state'] == 'queued']
+            ready = [item for item in queued if item[0] <= now]
+            if ready:
+                return min(ready)[2]
+            self.lock.wait(
+                min(item[0] for item in queued) - now if queued else None)
+        return None
+
+    def _work(self):
+        while True:
+            with self.lock:
+                key = self._next_job()
+                if key is None:
+                    return
+                job = self.jobs[key]
+                job['state'] = 'running'
+                job['attempts'] += 1
+                job['started'] = time.time()
+                self._save(key)
+            msg('Run: {}'.format(job['cmd']), self.verbose, VERB_LVL['medium'])
+            ret_code = self._run_daemon(job['cmd'])
+            if ret_code is False:
+                proc = subprocess.Popen(job['cmd'], shell=True)
+                try:
+                    ret_code = proc.wait(self.timeout)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                    ret_code = None
+            if ret_code is None:
+                msg('W: Timeout for `{}`.'.format(key))
+            with self.lock:
+                job['finished'] = time.time()
+                job['ret_code'] = ret_code
+                if ret_code == 0:
+                    job['state'] = 'done'
+                elif job['attempts'] <= self.max_retries:
+                    job['state'] = 'queued'
+                    job['next_try'] = time.time() \
+                        + self.backoff * 2 ** (job['attempts'] - 1)
+                    msg('W: Retrying `{}` (attempt {}).'.format(
+                        key, job['attempts'] + 1))
+                else:
+                    job['state'] = 'failed'
+                    msg('E: Failed `{}`.'.format(key))
+                self._save(key)
+                self.lock.notify_all()
+
+    def _run_daemon(self, cmd):
+        """
+        Run a command on the DCMPI daemon, if possible.
+
+        Args:
+            cmd (str): The shell command to execute.
+
+        Returns:
+            ret_code (int|None|bool): The exit code of the command.
+                None if the command was killed (e.g. after the timeout).
+                False if the command cannot be run on the daemon (i.e. it is
+                not a DCMPI module, or the daemon is not running).
+        """
+        job = dcmpi_daemon.resolve_cmd(cmd)
+        if not job:
+            return False
+        try:
+            return dcmpi_daemon.submit(*job, timeout=self.timeout)
+        except (IOError, OSError):
+            return False
+
+    def stats(self):
+        """
+        Compute the queue statistics.
+
+        Returns:
+            stats (dict): The statistics, containing:
+             - the number of jobs for each state.
+             - 'depth': the number of queued or running jobs.
+             - 'latency': the mean waiting time of the started jobs in sec.
+             - 'duration': the mean duration of the finished jobs in sec.
+        """
+        with self.lock:
+            jobs = list(self.jobs.values())
+        stats = {
+            state: sum(job['state'] == state for job in jobs)
+            for state in JOB_STATES}
+        stats['depth'] = stats['queued'] + stats['running']
+        started = [job for job in jobs if job['started']]
+        stats['latency'] = \
+            sum(job['started'] - job['enqueued'] for job in started) \
+            / len(started) if started else None
+        finished = [
+            job for job in jobs if job['finished'] and job['state'] == 'done']
+        stats['duration'] = \
+            sum(job['finished'] - job['started'] for job in finished) \
+            / len(finished) if finished else None
+        return stats
+
+    def _save(self, key):
+        """Record a job in the journal. Call with the lock held."""
+        if self.journal:
+            self.journal.update(key, **self.jobs[key])
+
+    def join(self):
+        """Wait until no job is queued or running."""
+        with self.lock:
+            while any(
+                    job['state'] in ('queued', 'running')
+                    for job in self.jobs.values()):
+                self.lock.wait(1.0)
+
+    def close(self):
+        """Stop the workers (running jobs are completed)."""
+        with self.lock:
+            self.is_running = False
+            self.lock.notify_all()
+        for worker in self.workers:
+            worker.join()
+
+
+# ======================================================================
+def reconcile(journal, dirpath, dirs):
+    """
+    Reconcile the journal with the monitored directory.
+
+    Only the directory fingerprints are compared (no content is checked).
+
+    Args:
+        journal (Journal): The journal.
+        dirpath (str): The monitored directory.
+        dirs (set[str]): The current subdirectories (names).
+
+    Returns:
+        known_dirs (set[str]): The subdirectories not to be processed again.
+            The others are to be considered as added.
+    """
+    records = journal.load()
+    now = time.time()
+    known_dirs = set()
+    for name in dirs:
+        path = os.path.join(dirpath, name)
+        fingerprint = _dir_fingerprint(path)
+        record = records.get(path)
+        if journal.is_new:
+            # : new journal: consider the existing directories as seen
+            journal.update(
+                path, state='seen', seen=now, fingerprint=fingerprint)
+            known_dirs.add(name)
+        elif record and record['fingerprint'] == fingerprint:
+            if record['state'] != 'pending':
+                known_dirs.add(name)
+        elif record:
+            # : re-created directory
+            journal.delete(path)
+    for path, record in records.items():
+        name = os.path.relpath(path, dirpath)
+        if name not in dirs and record['state'] in ('pending', 'seen'):
+            journal.delete(path)
+    msg('Journal: {} known, {} new'.format(
+        len(known_dirs), len(dirs) - len(known_dirs)))
+    return known_dirs
+
+
 # ======================================================================
 def monitor_folder(
         cmd,
@@ -57,54 +546,208 @@ def monitor_folder(
         on_added=True,
         max_count=0,
         delay_variance=0,
+        quiet=30,
+        use_inotify=True,
+        num_workers=2,
+        timeout=None,
+        max_retries=3,
+        journal_filepath=None,
         force=False,
         verbose=D_VERB_LVL):
     """
     Monitor changes in a dir and execute a command upon verify some condition.
+
+    The commands are run concurrently by a job queue (see `JobQueue`), so
+    that monitoring continues while the commands are running.
+
+    Changes are detected through inotify events (if available), with a
+    periodic poll as backup (e.g. for network file systems).
+    New directories are considered ready (and the command is executed) once
+    their content has been quiet for `quiet` seconds.
+
+    Args:
+        cmd (str): The command to execute.
+            `{}` is replaced by the path of the changed directory.
+        dirpath (str): The directory to monitor.
+        delay (float): The interval between polls in min.
+        check (callable|None): Condition on the changed directory path.
+            The command is executed only if this returns True.
+        on_added (bool): Act on added (True) or removed (False) directories.
+        max_count (int): The maximum number of actions.
+            If 0, monitor indefinitely.
+        delay_variance (float): Random variance of the delay in percent.
+        quiet (float): The quiescence time in sec for a directory to be
+            considered ready.
+        use_inotify (bool): Use inotify events (if available).
+            If False, or if inotify is not available, only poll (while
+            directories are pending, poll every `quiet` seconds).
+        num_workers (int): The number of concurrent commands.
+        timeout (float|None): The maximum duration of a command in min.
+            If None, commands are never interrupted.
+        max_retries (int): The maximum number of retries of a command.
+            Retries are delayed with an exponential backoff, starting from
+            `quiet` seconds.
+        journal_filepath (str|None): Path to the journal (SQLite).
+            If None, the state is not persistent.
+            Otherwise, on start-up the journal is reconciled with the
+            directory: directories created meanwhile (or re-created) are
+            processed, pending and unfinished jobs are resumed, and the
+            others are not checked again. If the journal is new, the
+            existing directories are considered as already seen.
+        force (bool): Force new processing.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        None.
     """
 
     def list_dirs(dirpath):
-        return [d for d in os.listdir(dirpath)
-                if os.path.isdir(os.path.join(dirpath, d))]
+        return set(d for d in os.listdir(dirpath)
+                   if os.path.isdir(os.path.join(dirpath, d)))
+
+    def watch_tree(watcher, path):
+        # : True if the whole tree is watched
+        return all([
+            watcher.add_watch(root, TREE_EVENTS) >= 0
+            for root, dirnames, filenames in os.walk(path)])
+
+    def top_name(path):
+        return os.path.relpath(path, dirpath).split(os.sep)[0]
 
     sec_in_min = 60
 
+    watcher = None
+    if use_inotify:
+        try:
+            watcher = Inotify()
+        except (OSError, AttributeError) as e:
+            msg('W: Using polling only ({}).'.format(e),
+                verbose, VERB_LVL['medium'])
+        else:
+            watcher.add_watch(dirpath, TOP_EVENTS)
+
+    old_dirs = list_dirs(dirpath)
+    journal = Journal(journal_filepath) if journal_filepath else None
+    if journal:
+        old_dirs = reconcile(journal, dirpath, old_dirs)
+    jobs = JobQueue(
+        num_workers, timeout * sec_in_min if timeout else None,
+        max_retries, quiet, journal, verbose)
     loop = True
     count = 0
-    old_dirs = list_dirs(dirpath)
+    # : pending (new) directories: name -> [signature, last change time,
+    #   polled], where the signature is only computed for the directories
+    #   that are polled (i.e. not fully watched by inotify)
+    pending = {}
+    next_poll = 0
     msg('Watch: {}'.format(dirpath))
     while loop:
-        new_dirs = list_dirs(dirpath)
-        removed_dirs = [d for d in old_dirs if d not in new_dirs]
-        added_dirs = [d for d in new_dirs if d not in old_dirs]
-        timestamp = time.strftime('%Y-%m-%d %H:%M:%S %Z', time.localtime())
-        randomized = random.random() * delay * delay_variance / 100
-        sleep_delay = (delay + randomized) * sec_in_min
-        if removed_dirs:
-            msg(': {}  --  {}'.format(timestamp, removed_dirs),
-                fmtt='{t.red}{t.bold}')
-        if added_dirs:
-            msg(': {}  ++  {}'.format(timestamp, added_dirs),
-                fmtt='{t.green}{t.bold}')
-        if not removed_dirs and not added_dirs:
-            text = 'All quiet on the western front.'
-            next_check = time.strftime(
-                '%H:%M:%S', time.localtime(time.time() + sleep_delay))
-            msg(': {}  ..  {}  (next check in ~{} min, at {})'.format(
-                timestamp, text, int(delay + randomized), next_check))
-        delta_dirs = added_dirs if on_added else removed_dirs
-        for delta in delta_dirs:
+        now = time.time()
+        is_changed = False
+        timeout = max(0, next_poll - now)
+        if pending:
+            # : the polled directories are checked when they may be ready
+            timeout = min(timeout, max(0, min(
+                last + quiet - now for sig, last, polled in pending.values())))
+        if watcher:
+            for path, mask, name in watcher.read(timeout):
+                if mask & IN_Q_OVERFLOW:
+                    next_poll = 0
+                    # : the events were lost, changes may be in progress
+                    for delta, info in pending.items():
+                        info[1] = time.time()
+                        if not info[2] and on_added and not watch_tree(
+                                watcher, os.path.join(dirpath, delta)):
+                            info[2] = True
+                elif path == dirpath:
+                    is_changed = True
+                elif path and top_name(path) in pending:
+                    info = pending[top_name(path)]
+                    info[1] = time.time()
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) \
+                            and not watch_tree(
+                                watcher, os.path.join(path, name)):
+                        info[2] = True
+        else:
+            time.sleep(timeout)
+
+        now = time.time()
+        if is_changed or now >= next_poll:
+            new_dirs = list_dirs(dirpath)
+            removed_dirs = sorted(old_dirs - new_dirs)
+            added_dirs = sorted(new_dirs - old_dirs)
+            timestamp = time.strftime(
+                '%Y-%m-%d %H:%M:%S %Z', time.localtime())
+            if removed_dirs:
+                msg(': {}  --  {}'.format(timestamp, removed_dirs),
+                    fmtt='{t.red}{t.bold}')
+            if added_dirs:
+                msg(': {}  ++  {}'.format(timestamp, added_dirs),
+                    fmtt='{t.green}{t.bold}')
+            if now >= next_poll:
+                randomized = random.random() * delay * delay_variance / 100
+                sleep_delay = (delay + randomized) * sec_in_min
+                next_poll = now + sleep_delay
+                if not removed_dirs and not added_dirs:
+                    text = 'All quiet on the western front.'
+                    next_check = time.strftime(
+                        '%H:%M:%S', time.localtime(next_poll))
+                    msg(': {}  ..  {}  (next check in ~{} min, at {})'.format(
+                        timestamp, text, int(delay + randomized), next_check))
+                msg('Jobs: {}'.format(
+                    ', '.join('{}={}'.format(key, val) for key, val in
+                              sorted(jobs.stats().items()))),
+                    verbose, VERB_LVL['medium'])
+            if on_added:
+                for delta in added_dirs:
+                    delta_dirpath = os.path.join(dirpath, delta)
+                    polled = not watcher or not watch_tree(
+                        watcher, delta_dirpath)
+                    pending[delta] = [
+                        utl.dir_signature(delta_dirpath) if polled else None,
+                        now, polled]
+                    if journal:
+                        journal.update(
+                            delta_dirpath, state='pending', seen=now,
+                            fingerprint=_dir_fingerprint(delta_dirpath))
+                for delta in removed_dirs:
+                    if watcher:
+                        watcher.rm_tree(os.path.join(dirpath, delta))
+                    if pending.pop(delta, None) and journal:
+                        journal.delete(os.path.join(dirpath, delta))
+            else:
+                for delta in removed_dirs:
+                    pending[delta] = [None, now - quiet, False]
+            old_dirs = new_dirs
+
+        # :: act on the ready directories
+        for delta in sorted(pending):
             delta_dirpath = os.path.join(dirpath, delta)
+            if on_added and pending[delta][2] \
+                    and now - pending[delta][1] >= quiet:
+                signature = utl.dir_signature(delta_dirpath)
+                if signature != pending[delta][0]:
+                    pending[delta][:2] = [signature, now]
+            if now - pending[delta][1] < quiet:
+                continue
+            del pending[delta]
+            if watcher:
+                watcher.rm_tree(delta_dirpath)
+            msg('Ready: {}'.format(delta_dirpath),
+                verbose, VERB_LVL['medium'])
             if check and check(delta_dirpath):
-                cmd = cmd.format(delta_dirpath)
-                subprocess.call(cmd, shell=True)
+                jobs.put(delta_dirpath, cmd.format(delta_dirpath))
                 count += 1
-        time.sleep(sleep_delay)
+            elif journal:
+                journal.update(delta_dirpath, state='seen')
         if 0 < max_count < count:
             loop = False
-        else:
-            old_dirs = new_dirs
-            loop = True
+    if watcher:
+        watcher.close()
+    jobs.join()
+    jobs.close()
+    if journal:
+        journal.close()
 
 
 # ======================================================================
@@ -145,13 +788,38 @@ def handle_arg():
         '-r', '--delay_var', metavar='DX',
         type=float, default=5,
         help='set random variance in the delay as percentage [%(default)s]')
+    arg_parser.add_argument(
+        '-q', '--quiet', metavar='SEC',
+        type=float, default=30.0,
+        help='set quiescence time for new dirs to be ready in s '
+             '[%(default)s]')
+    arg_parser.add_argument(
+        '-p', '--poll_only',
+        action='store_true',
+        help='only poll, do not use inotify events [%(default)s]')
+    arg_parser.add_argument(
+        '-w', '--num_workers', metavar='NUM',
+        type=int, default=2,
+        help='set number of concurrent commands [%(default)s]')
+    arg_parser.add_argument(
+        '-t', '--timeout', metavar='X',
+        type=float, default=None,
+        help='set maximum duration of a command in min [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--max_retries', metavar='NUM',
+        type=int, default=3,
+        help='set maximum number of retries of a command [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--journal_filepath', metavar='FILE',
+        default=None,
+        help='set persistent journal file (SQLite) [%(default)s]')
     arg_parser.add_argument(
         '-m', '--max_count', metavar='NUM',
         type=int, default=0,
         help='maximum number of actions to be performed [%(default)s]')
     arg_parser.add_argument(
         '-c', '--cmd', metavar='EXECUTABLE',
-        default=os.path.dirname(__file__) + '/dcm_analyze_dir.py {}',
+        default=os.path.dirname(__file__) + '/dcmpi_analyze_dir.py -d {}',
         help='execute when finding a new dir with DICOMs [%(default)s]')
     return arg_parser
 
@@ -175,9 +843,12 @@ def main():
     monitor_folder(
         args.cmd,
         args.dir, args.delay,
-        lambda x: utl.find_a_dicom(x)[0],
+        lambda x: utl.probe_dir(x)[0],
         True,
         args.max_count, args.delay_var,
+        args.quiet, not args.poll_only,
+        args.num_workers, args.timeout, args.max_retries,
+        args.journal_filepath,
         args.force, args.verbose)
 
     exec_time = datetime.datetime.now() - begin_time
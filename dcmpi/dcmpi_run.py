@@ -3,7 +3,6 @@
 """
 DCMPI: DICOM preprocessing.
 """
-#todo: separate gui/tui/cli
 
 # ======================================================================
 # :: Future Imports
@@ -13,37 +12,31 @@ from __future__ import (
 # ======================================================================
 # :: Python Standard Library Imports
 import os  # Miscellaneous operating system interfaces
-# import sys  # System-specific parameters and functions
+import sys  # System-specific parameters and functions
 # import platform  # Access to underlying platform’s identifying data
 import datetime  # Basic date and time types
 import collections  # High-performance container datatypes
 import argparse  # Parser for command-line options, arguments and subcommands
 import multiprocessing  # Process-based parallelism
+import threading  # Thread-based parallelism
 import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 import warnings  # Warning control
 
 # :: External Imports
 
 # :: External Imports Submodules
-# from pytk import tk
-# from pytk import ttk
-from pytk import messagebox
-from pytk import filedialog
-from pytk import simpledialog
-
-import pytk.util
-import pytk.widgets
 
 # :: Local Imports
-import dcmpi
 import dcmpi.util as utl
-from dcmpi import PATH, INFO
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 from dcmpi import MY_GREETINGS
 
 from dcmpi import (
     get_nifti, get_meta, get_prot, get_info, do_report, do_backup, )
+from dcmpi import profiling
+from dcmpi import catalogue as ctg
 
 # ======================================================================
 # :: determine initial configuration
@@ -68,6 +61,8 @@ CFG_DIRPATHS = (
     os.getenv('HOME'),
     os.path.dirname(__file__),
     PATHS['sys_cfg'])
+# the JSON summary of the headless batch processing
+SUMMARY_FILENAME = 'dcmpi_summary.json'
 
 ACTIONS = collections.OrderedDict((
     ('niz', (get_nifti.get_nifti,
@@ -85,6 +80,21 @@ ACTIONS = collections.OrderedDict((
                 dict(in_dirpath='{dcm_dirpath}', out_dirpath='{base_dirpath}',
                     basename='{backup_template}'))),))
 
+# the data each action reads (inputs) and writes (outputs)
+# : an action waits for the previous actions writing its inputs,
+#   and for those reading or writing its outputs
+ACTIONS_IO = {
+    'sort': ((), ('dcm',)),
+    'group': (('dcm',), ('group',)),
+    'niz': (('dcm',), ('niz',)),
+    'meta': (('dcm',), ('meta',)),
+    'prot': (('dcm',), ('prot',)),
+    'info': (('dcm',), ('info',)),
+    'report': (('dcm', 'group', 'info'), ('info', 'report')),
+    # : the backup seals the DICOM directory, after all its readers are done
+    'backup': (('dcm',), ('dcm', 'backup')),
+}
+
 
 # ======================================================================
 def default_config():
@@ -142,6 +152,34 @@ def load_config(
     return cfg
 
 
+# ======================================================================
+def get_config(
+        cfg_filename=CFG_FILENAME):
+    """
+    Get the configuration, from the first configuration file found.
+
+    Args:
+        cfg_filename (str): The configuration file name/path.
+            It is searched in `CFG_DIRPATHS`.
+
+    Returns:
+        result (tuple): The tuple
+            (cfg, cfg_filepath) where:
+             - cfg (dict): The configuration (updating the defaults).
+             - cfg_filepath (str): The path of the configuration file.
+    """
+    cfg = default_config()
+    for dirpath in CFG_DIRPATHS:
+        cfg_filepath = os.path.join(dirpath, cfg_filename)
+        loaded_cfg = load_config(cfg_filepath)
+        if loaded_cfg:
+            cfg.update(loaded_cfg)
+            break
+    else:
+        cfg_filepath = os.path.join(PATHS['usr_cfg'], CFG_FILENAME)
+    return cfg, cfg_filepath
+
+
 # ======================================================================
 def save_config(
         config,
@@ -163,6 +201,191 @@ def save_config(
         json.dump(config, cfg_file, sort_keys=True, indent=4)
 
 
+# ======================================================================
+def get_dependencies(
+        names,
+        actions_io=ACTIONS_IO):
+    """
+    Compute the dependencies among actions from their inputs and outputs.
+
+    An action depends on each previous action that writes one of its inputs
+    (read-after-write), or that reads or writes one of its outputs
+    (write-after-read, write-after-write).
+    Actions without known inputs and outputs depend on all previous actions.
+
+    Args:
+        names (Iterable[str]): The action names, in order of execution.
+        actions_io (dict): The action name -> (inputs, outputs).
+
+    Returns:
+        deps (collections.OrderedDict): The action name -> dependencies.
+
+    Examples:
+        >>> deps = get_dependencies(['sort', 'niz', 'meta', 'backup'])
+        >>> for name, dep in deps.items(): print(name, sorted(dep))
+        sort []
+        niz ['sort']
+        meta ['sort']
+        backup ['meta', 'niz', 'sort']
+        >>> deps = get_dependencies(['info', 'report', 'prot'])
+        >>> for name, dep in deps.items(): print(name, sorted(dep))
+        info []
+        report ['info']
+        prot []
+    """
+    deps = collections.OrderedDict()
+    for name in names:
+        deps[name] = set()
+        if name not in actions_io:
+            deps[name].update(deps.keys())
+            deps[name].discard(name)
+            continue
+        inputs, outputs = actions_io[name]
+        for prev_name in list(deps.keys())[:-1]:
+            if prev_name not in actions_io:
+                deps[name].add(prev_name)
+                continue
+            prev_inputs, prev_outputs = actions_io[prev_name]
+            if set(inputs).intersection(prev_outputs) \
+                    or set(outputs).intersection(prev_inputs + prev_outputs):
+                deps[name].add(prev_name)
+    return deps
+
+
+# ======================================================================
+def _run_action(func, kws):
+    """
+    Run an action, catching all errors and measuring the resources used.
+
+    Args:
+        func (callable): The action function.
+        kws (dict): Keyword arguments passed to `func`.
+
+    Returns:
+        result (tuple): The tuple
+            (error, stats) where:
+             - error (str|None): The error message, if any.
+             - stats (dict): The resources used (the execution time in s
+               is `wall`). See `profiling.Probe` for more details.
+    """
+    with profiling.Probe() as probe:
+        try:
+            func(**kws)
+        except Exception as e:
+            error = '{}: {}'.format(type(e).__name__, e)
+        else:
+            error = None
+    return error, probe.stats
+
+
+# ======================================================================
+def run_stages(
+        stages,
+        num_processes=None,
+        verbose=D_VERB_LVL):
+    """
+    Run stages concurrently, respecting their dependencies.
+
+    Each stage is started as soon as all its dependencies are completed
+    (even if unsuccessfully), without exceeding the number of processes.
+
+    Args:
+        stages (collections.OrderedDict): The stage ID -> (func, kws, deps).
+            Each stage runs `func(**kws)` after the stages in `deps`, which
+            must be listed before it.
+        num_processes (int|None): The number of parallel processes.
+            If None, uses the number of available CPUs.
+            If 1, the stages are run sequentially in the current process.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        results (dict): The stage ID -> (error, stats).
+            See `_run_action()` for more details.
+    """
+    results = {}
+    if num_processes is None:
+        num_processes = multiprocessing.cpu_count()
+    if num_processes == 1:
+        for stage_id, (func, kws, deps) in stages.items():
+            results[stage_id] = _run_action(func, kws)
+        return results
+
+    pending = collections.OrderedDict(stages)
+    running = set()
+    lock = threading.Condition()
+
+    def on_done(result, stage_id):
+        with lock:
+            results[stage_id] = result
+            running.discard(stage_id)
+            lock.notify()
+
+    def on_error(e, stage_id):
+        # : e.g. the stage could not be sent to (or received from) the pool
+        on_done(('{}: {}'.format(type(e).__name__, e), {}), stage_id)
+
+    pool = multiprocessing.Pool(processes=num_processes)
+    with lock:
+        while pending or running:
+            for stage_id, (func, kws, deps) in list(pending.items()):
+                if len(running) >= num_processes:
+                    break
+                if all(dep in results for dep in deps):
+                    msg('Start: {}'.format(stage_id),
+                        verbose, VERB_LVL['medium'])
+                    del pending[stage_id]
+                    running.add(stage_id)
+                    pool.apply_async(
+                        _run_action, (func, kws),
+                        callback=lambda result, stage_id=stage_id:
+                        on_done(result, stage_id),
+                        error_callback=lambda e, stage_id=stage_id:
+                        on_error(e, stage_id))
+            if running:
+                lock.wait()
+            elif pending:
+                # : unsatisfiable dependencies
+                for stage_id in pending:
+                    results[stage_id] = ('Unmet dependencies', {})
+                pending.clear()
+    pool.close()
+    pool.join()
+    return results
+
+
+# ======================================================================
+def save_records(
+        records,
+        out_dirpath,
+        trace_filepath=profiling.TRACE_FILENAME,
+        chrome_trace_filepath=None):
+    """
+    Save the stage records to the trace files in the output directory.
+
+    Args:
+        records (Iterable[dict]): The stage records.
+        out_dirpath (str): Path to output directory.
+        trace_filepath (str|None): Path to the JSON lines trace.
+            If relative, it is relative to the output directory.
+            If None, the trace is not saved.
+        chrome_trace_filepath (str|None): Path to the Chrome trace file.
+            If relative, it is relative to the output directory.
+            If None, the Chrome trace is not saved.
+
+    Returns:
+        None.
+    """
+    if trace_filepath or chrome_trace_filepath:
+        if not os.path.isdir(out_dirpath):
+            os.makedirs(out_dirpath)
+        profiling.save_trace(
+            records,
+            os.path.join(out_dirpath, trace_filepath)
+            if trace_filepath else None,
+            os.path.join(out_dirpath, chrome_trace_filepath)
+            if chrome_trace_filepath else None)
+
+
 # ======================================================================
 def dcmpi_run(
         in_dirpath,
@@ -176,13 +399,22 @@ def dcmpi_run(
         report_template=utl.TPL['report'],
         backup_template=utl.TPL['backup'],
         actions=ACTIONS,
+        num_processes=1,
+        trace_filepath=profiling.TRACE_FILENAME,
+        chrome_trace_filepath=None,
+        catalogue_filepath=None,
         force=False,
         verbose=D_VERB_LVL):
     """
     Standard preprocessing of DICOM files.
 
+    After the import, the sorting and the other actions of all sessions are
+    scheduled together: independent actions (e.g. `niz`, `meta`, `prot`)
+    run concurrently, according to their inputs and outputs (see
+    `ACTIONS_IO` and `get_dependencies()`).
+
     Args:
-        in_dirpath (str): Path to input directory.
+        in_dirpath (str|Iterable[str]): Path(s) to input directory.
         out_dirpath (str): Path to output directory.
         subpath (str):
         dcm_subpath (str):
@@ -193,25 +425,72 @@ def dcmpi_run(
         report_template (str):
         backup_template (str):
         actions (dict):
+        num_processes (int|None): The number of parallel processes.
+            This is the global budget for all the sessions.
+            If None, uses the number of available CPUs.
+            If 1, the actions are run sequentially.
+        trace_filepath (str|None): Path to the JSON lines trace.
+            The resources used by each stage of each session are appended.
+            If relative, it is relative to the output directory.
+            If None, the trace is not saved.
+        chrome_trace_filepath (str|None): Path to the Chrome trace file.
+            If relative, it is relative to the output directory.
+            If None, the Chrome trace is not saved.
+        catalogue_filepath (str|None): Path to the catalogue.
+            The instances already imported (in any session) are skipped.
+            If relative, it is relative to the output directory.
+            If None, the catalogue is not used.
+            See `dcmpi.catalogue.Catalogue` for more details.
         force (bool): Force new processing.
         verbose (int): Set level of verbosity.
 
     Returns:
-        None.
+        results (dict): The DICOM directory -> action -> (error, elapsed).
+            Inputs failing the import are reported as: input directory ->
+            'acquire' -> (error, elapsed).
+            See `_run_action()` for more details.
     """
     from dcmpi.do_acquire_sources import do_acquire_sources
-    from dcmpi.do_sorting import sorting
+    from dcmpi.do_sorting import sorting, grouping
 
+    in_dirpaths = [in_dirpath] if isinstance(in_dirpath, str) else in_dirpath
     # import
-    dcm_dirpaths = do_acquire_sources(
-        in_dirpath, out_dirpath, 'copy', subpath, dcm_subpath, force, verbose)
+    dcm_dirpaths = []
+    results = {}
+    records = []
+    for in_dirpath in in_dirpaths:
+        error, stats = _run_action(
+            lambda **_kws: dcm_dirpaths.extend(do_acquire_sources(**_kws)),
+            dict(
+                in_dirpath=in_dirpath, out_dirpath=out_dirpath,
+                method='copy', subpath=subpath, extra_subpath=dcm_subpath,
+                catalogue_filepath=catalogue_filepath,
+                force=force, verbose=verbose))
+        records.append(dict(
+            session=in_dirpath, stage='acquire', error=error, stats=stats))
+        if error:
+            # : failed inputs are reported with their own path
+            results[in_dirpath] = {'acquire': (error, stats['wall'])}
+            warnings.warn('{}: {}: {}'.format(in_dirpath, 'acquire', error))
+    # : different inputs may be acquired into the same session
+    dcm_dirpaths = [
+        dcm_dirpath for i, dcm_dirpath in enumerate(dcm_dirpaths)
+        if dcm_dirpath not in dcm_dirpaths[:i]]
+    stages = collections.OrderedDict()
     for dcm_dirpath in dcm_dirpaths:
         base_dirpath = os.path.dirname(dcm_dirpath)
         # sort
-        sorting(
-            dcm_dirpath, utl.D_SUMMARY + '.' + utl.EXT['json'],
-            force, verbose)
-        # run other actions
+        session_stages = collections.OrderedDict()
+        session_stages['sort'] = (sorting, dict(
+            dirpath=dcm_dirpath, summary=None,
+            force=force, verbose=verbose,
+            catalogue_filepath=os.path.join(out_dirpath, catalogue_filepath)
+            if catalogue_filepath else None))
+        session_stages['group'] = (grouping, dict(
+            dirpath=dcm_dirpath,
+            summary=utl.D_SUMMARY + '.' + utl.EXT['json'],
+            force=force, verbose=verbose))
+        # other actions
         dirpath = {
             'niz': niz_subpath,
             'meta': meta_subpath,
@@ -225,644 +504,36 @@ def dcmpi_run(
                 if isinstance(val, str):
                     kws[key] = fmtm(val)
             kws.update(dict(force=force, verbose=verbose))
-            try:
-                func(**kws)
-            except Exception as e:
-                warnings.warn(str(e))
-
+            session_stages[action] = (func, kws)
+        deps = get_dependencies(session_stages.keys())
+        for action, (func, kws) in session_stages.items():
+            stages[(dcm_dirpath, action)] = (
+                func, kws, [(dcm_dirpath, dep) for dep in deps[action]])
+
+    results.update({dcm_dirpath: {} for dcm_dirpath in dcm_dirpaths})
+    for (dcm_dirpath, action), (error, stats) in sorted(
+            run_stages(stages, num_processes, verbose).items()):
+        elapsed = stats.get('wall', 0.0)
+        results[dcm_dirpath][action] = error, elapsed
+        if stats:
+            records.append(dict(
+                session=dcm_dirpath, stage=action, error=error, stats=stats))
+        if error:
+            warnings.warn('{}: {}: {}'.format(dcm_dirpath, action, error))
+        msg('Done: {} {} ({:.3f} s)'.format(dcm_dirpath, action, elapsed),
+            verbose, VERB_LVL['medium'])
+    for dcm_dirpath in dcm_dirpaths:
         msg('Done: {}'.format(dcm_dirpath))
-
-
-# ======================================================================
-class About(pytk.Window):
-    def __init__(self, parent):
-        self.win = pytk.Window.__init__(self, parent)
-        self.transient(parent)
-        self.parent = parent
-        self.title('About {}'.format(INFO['name']))
-        self.resizable(False, False)
-        self.frm = pytk.widgets.Frame(self)
-        self.frm.pack(fill='both', expand=True)
-        self.frmMain = pytk.widgets.Frame(self.frm)
-        self.frmMain.pack(fill='both', padx=1, pady=1, expand=True)
-
-        about_txt = '\n'.join((
-            MY_GREETINGS[1:],
-            dcmpi.__doc__,
-            '{} - ver. {}\n{} {}\n{}'.format(
-                INFO['name'], INFO['version'],
-                INFO['copyright'], INFO['author'], INFO['notice'])
-        ))
-        msg(about_txt)
-        self.lblInfo = pytk.widgets.Label(
-            self.frmMain, text=about_txt, anchor='center',
-            background='#333', foreground='#ccc', font='TkFixedFont')
-        self.lblInfo.pack(padx=8, pady=8, ipadx=8, ipady=8)
-
-        self.btnClose = pytk.widgets.Button(
-            self.frmMain, text='Close', command=self.destroy)
-        self.btnClose.pack(side='bottom', padx=8, pady=8)
-        self.bind('<Return>', self.destroy)
-        self.bind('<Escape>', self.destroy)
-
-        pytk.util.center(self, self.parent)
-
-        self.grab_set()
-        self.wait_window(self)
-
-
-# ======================================================================
-class Settings(pytk.Window):
-    def __init__(self, parent, app):
-        self.settings = collections.OrderedDict((
-            ('use_mp', {'label': 'Use parallel processing', 'dtype': bool, }),
-            ('num_processes', {
-                'label': 'Number of parallel processes',
-                'dtype': int,
-                'values': {'start': 1, 'stop': 2 * multiprocessing.cpu_count()},
-            }),
-            ('gui_style_tk', {
-                'label': 'GUI Style (Tk)',
-                'dtype': tuple,
-                'values': app.style.theme_names()
-            }),
-        ))
-        for name, info in self.settings.items():
-            self.settings[name]['default'] = app.cfg[name]
-        self.result = None
-
-        self.win = pytk.Window.__init__(self, parent)
-        self.transient(parent)
-        self.parent = parent
-        self.app = app
-        self.title('{} Advanced Settings'.format(INFO['name']))
-        self.frm = pytk.widgets.Frame(self)
-        self.frm.pack(fill='both', expand=True)
-        self.frmMain = pytk.widgets.Frame(self.frm)
-        self.frmMain.pack(fill='both', padx=8, pady=8, expand=True)
-
-        self.frmSpacers = []
-
-        self.wdgOptions = {}
-        for name, info in self.settings.items():
-            if info['dtype'] == bool:
-                chk = pytk.widgets.Checkbox(self.frmMain, text=info['label'])
-                chk.pack(fill='x', padx=1, pady=1)
-                chk.set_val(info['default'])
-                self.wdgOptions[name] = {'chk': chk}
-            elif info['dtype'] == int:
-                frm = pytk.widgets.Frame(self.frmMain)
-                frm.pack(fill='x', padx=1, pady=1)
-                lbl = pytk.widgets.Label(frm, text=info['label'])
-                lbl.pack(side='left', fill='x', padx=1, pady=1, expand=True)
-                spb = pytk.widgets.Spinbox(frm, **info['values'])
-                spb.set_val(info['default'])
-                spb.pack(
-                    side='left', fill='x', anchor='w', padx=1, pady=1)
-                self.wdgOptions[name] = {'frm': frm, 'lbl': lbl, 'spb': spb}
-            elif info['dtype'] == tuple:
-                frm = pytk.widgets.Frame(self.frmMain)
-                frm.pack(fill='x', padx=1, pady=1)
-                lbl = pytk.widgets.Label(frm, text=info['label'])
-                lbl.pack(side='left', fill='x', padx=1, pady=1, expand=True)
-                lst = pytk.widgets.Listbox(frm, values=info['values'])
-                lst.set_val(info['default'])
-                lst.pack(
-                    side='left', fill='x', anchor='w', padx=1, pady=1)
-                self.wdgOptions[name] = {'frm': frm, 'lbl': lbl, 'lst': lst}
-
-        self.frmButtons = pytk.widgets.Frame(self.frmMain)
-        self.frmButtons.pack(side='bottom', padx=4, pady=4)
-        spacer = pytk.widgets.Frame(self.frmButtons)
-        spacer.pack(side='left', anchor='e', expand=True)
-        self.frmSpacers.append(spacer)
-        self.btnOK = pytk.widgets.Button(
-            self.frmButtons, text='OK', compound='left',
-            command=self.ok)
-        self.btnOK.pack(side='left', padx=4, pady=4)
-        self.btnReset = pytk.widgets.Button(
-            self.frmButtons, text='Reset', compound='left',
-            command=self.reset)
-        self.btnReset.pack(side='left', padx=4, pady=4)
-        self.btnCancel = pytk.widgets.Button(
-            self.frmButtons, text='Cancel', compound='left',
-            command=self.cancel)
-        self.btnCancel.pack(side='left', padx=4, pady=4)
-        self.bind('<Return>', self.ok)
-        self.bind('<Escape>', self.cancel)
-
-        pytk.util.center(self, self.parent)
-
-        self.grab_set()
-        self.wait_window(self)
-
-    # --------------------------------
-    def ok(self, event=None):
-        if not self.validate():
-            return
-        self.withdraw()
-        self.update_idletasks()
-        self.apply()
-        self.cancel()
-
-    def cancel(self, event=None):
-        # put focus back to the parent window
-        self.parent.focus_set()
-        self.destroy()
-
-    def reset(self, event=None):
-        for name, info in self.settings.items():
-            if info['dtype'] == bool:
-                self.wdgOptions[name]['chk'].set_val(self.app.cfg[name])
-            elif info['dtype'] == int:
-                self.wdgOptions[name]['spb'].set_val(self.app.cfg[name])
-            elif info['dtype'] == str:
-                self.wdgOptions[name]['ent'].set_val(self.app.cfg[name])
-            elif info['dtype'] == tuple:
-                self.wdgOptions[name]['lst'].set_val(self.app.cfg[name])
-
-    def validate(self, event=None):
-        return True
-
-    def apply(self, event=None):
-        self.result = {}
-        for name, info in self.settings.items():
-            if info['dtype'] == bool:
-                self.result[name] = self.wdgOptions[name]['chk'].get_val()
-            elif info['dtype'] == int:
-                self.result[name] = self.wdgOptions[name]['spb'].get_val()
-            elif info['dtype'] == str:
-                self.result[name] = self.wdgOptions[name]['ent'].get_val()
-            elif info['dtype'] == tuple:
-                self.result[name] = self.wdgOptions[name]['lst'].get_val()
-
-
-# ======================================================================
-class Main(pytk.widgets.Frame):
-    def __init__(self, parent, args):
-        # get_val config data
-        cfg = {}
-        self.cfg = default_config()
-        for dirpath in CFG_DIRPATHS:
-            self.cfg_filepath = os.path.join(dirpath, args.config)
-            cfg = load_config(self.cfg_filepath)
-            if cfg:
-                break
-        if cfg:
-            self.cfg.update(cfg)
-        else:
-            self.cfg_filepath = os.path.join(
-                PATHS['usr_cfg'], CFG_FILENAME)
-
-        self.modules = collections.OrderedDict([
-            ('dcm_subpath', {'label': 'DICOM (required)'}),
-            ('niz_subpath', {'label': 'NIfTI Image'}),
-            ('meta_subpath', {'label': 'Metadata'}),
-            ('prot_subpath', {'label': 'Protocol'}),
-            ('info_subpath', {'label': 'Information'}),
-            ('report_template', {'label': 'Report template'}),
-            ('backup_template', {'label': 'Backup template'}),
-        ])
-        self.options = collections.OrderedDict((
-            ('force', {
-                'label': 'Force',
-                'dtype': bool
-            }),
-            ('verbose', {
-                'label': 'Verbosity',
-                'dtype': int,
-                'values': {'values': VERB_LVL_NAMES},
-            }),
-        ))
-
-        # :: initialization of the UI
-        pytk.widgets.Frame.__init__(self, parent)
-        self.parent = parent
-        self.parent.title('DCMPI: DICOM Preprocessing Interface')
-        self.parent.protocol('WM_DELETE_WINDOW', self.actionExit)
-
-        self.style = pytk.Style()
-        # print(self.style.theme_names())
-        self.style.theme_use(self.cfg['gui_style_tk'])
-        self.pack(fill='both', expand=True)
-
-        self._make_menu()
-
-        # :: define UI items
-        self.frmMain = pytk.widgets.Frame(self)
-        self.frmMain.pack(fill='both', padx=8, pady=8, expand=True)
-        self.frmSpacers = []
-
-        # left frame
-        self.frmLeft = pytk.widgets.Frame(self.frmMain)
-        self.frmLeft.pack(
-            side='left', fill='both', padx=4, pady=4, expand=True)
-
-        self.frmInput = pytk.widgets.Frame(self.frmLeft)
-        self.frmInput.pack(
-            side='top', fill='both', padx=4, pady=4, expand=True)
-        self.lblInput = pytk.widgets.Label(self.frmInput, text='Input')
-        self.lblInput.pack(padx=1, pady=1)
-        self.lsvInput = pytk.widgets.Listview(
-            self.frmInput, show='tree', height=4)
-        self.lsvInput.bind('<Double-Button-1>', self.actionAdd)
-        self.lsvInput.pack(fill='both', padx=1, pady=1, expand=True)
-        self.btnImport = pytk.widgets.Button(
-            self.frmInput, text='Import', compound='left',
-            command=self.actionImport)
-        self.btnImport.pack(side='left', padx=4, pady=4)
-        self.btnExport = pytk.widgets.Button(
-            self.frmInput, text='Export', compound='left',
-            command=self.actionExport)
-        self.btnExport.pack(side='left', padx=4, pady=4)
-        spacer = pytk.widgets.Frame(self.frmInput)
-        spacer.pack(side='left', anchor='e', expand=True)
-        self.frmSpacers.append(spacer)
-        self.btnAdd = pytk.widgets.Button(
-            self.frmInput, text='Add', compound='left',
-            command=self.actionAdd)
-        self.btnAdd.pack(side='left', anchor='e', padx=4, pady=4)
-        self.btnRemove = pytk.widgets.Button(
-            self.frmInput, text='Remove', compound='left',
-            command=self.actionRemove)
-        self.btnRemove.pack(side='left', anchor='e', padx=4, pady=4)
-        self.btnClear = pytk.widgets.Button(
-            self.frmInput, text='Clear', compound='left',
-            command=self.actionClear)
-        self.btnClear.pack(side='left', anchor='e', padx=4, pady=4)
-
-        self.frmOutput = pytk.widgets.Frame(self.frmLeft)
-        self.frmOutput.pack(fill='x', padx=4, pady=4)
-        self.lblOutput = pytk.widgets.Label(self.frmOutput, text='Output')
-        self.lblOutput.pack(side='top', padx=1, pady=1)
-
-        self.frmPath = pytk.widgets.Frame(self.frmOutput)
-        self.frmPath.pack(fill='x', expand=True)
-        self.lblPath = pytk.widgets.Label(self.frmPath, text='Path', width=8)
-        self.lblPath.pack(side='left', fill='x', padx=1, pady=1)
-        self.txtPath = pytk.widgets.Text(self.frmPath)
-        self.txtPath.insert(0, self.cfg['output_path'])
-        self.txtPath.bind('<Double-Button>', self.actionPath)
-        self.txtPath.pack(
-            side='left', fill='x', padx=1, pady=1, expand=True)
-
-        self.frmSubpath = pytk.widgets.Frame(self.frmOutput)
-        self.frmSubpath.pack(fill='x', expand=True)
-        self.lblSubpath = pytk.widgets.Label(self.frmSubpath, text='Sub-Path',
-            width=8)
-        self.lblSubpath.pack(side='left', fill='x', padx=1, pady=1)
-        self.txtSubpath = pytk.widgets.Text(self.frmSubpath)
-        self.txtSubpath.insert(0, self.cfg['output_subpath'])
-        self.txtSubpath.pack(
-            side='left', fill='x', padx=1, pady=1, expand=True)
-
-        # right frame
-        self.frmRight = pytk.widgets.Frame(self.frmMain)
-        self.frmRight.pack(side='right', fill='both', padx=4, pady=4)
-
-        self.lblActions = pytk.widgets.Label(
-            self.frmRight, text='Sub-Paths and Templates')
-        self.lblActions.pack(padx=1, pady=1)
-        self.wdgModules = collections.OrderedDict()
-        for name, info in self.modules.items():
-            frm = pytk.widgets.Frame(self.frmRight)
-            frm.pack(fill='x', padx=1, pady=1)
-            if 'subpath' in name:
-                chk = pytk.widgets.Checkbox(frm, text=info['label'])
-                chk.pack(
-                    side='left', fill='x', padx=1, pady=1, expand=True)
-                chk.config(command=self.activateModules)
-                entry = pytk.widgets.Text(frm, width=8)
-                entry.pack(side='right', fill='x', padx=1, pady=1)
-            elif 'template' in name:
-                chk = pytk.widgets.Checkbox(frm, text=info['label'])
-                chk.pack(fill='x', padx=1, pady=1, expand=True)
-                # chk.set_val(info['default'])
-                chk.config(command=self.activateModules)
-                entry = pytk.widgets.Text(frm, width=24)
-                entry.pack(fill='x', padx=1, pady=1, expand=True)
-            else:
-                chk = pytk.widgets.Checkbox(frm, text=info['label'])
-                chk.pack(fill='x', padx=1, pady=1, expand=True)
-                chk.config(command=self.activateModules)
-                entry = None
-            self.wdgModules[name] = {
-                'frm': frm, 'chk': chk, 'ent': entry}
-        # self.wdgModules['dcm_subpath']['chk']['state'] = 'readonly'
-        self.activateModules()
-
-        spacer = pytk.widgets.Frame(self.frmRight)
-        spacer.pack(side='top', padx=4, pady=4)
-        self.frmSpacers.append(spacer)
-        self.lblOptions = pytk.widgets.Label(self.frmRight, text='Options')
-        self.lblOptions.pack(padx=1, pady=1)
-        self.wdgOptions = {}
-        for name, info in self.options.items():
-            if info['dtype'] == bool:
-                chk = pytk.widgets.Checkbox(self.frmRight, text=info['label'])
-                chk.pack(fill='x', padx=1, pady=1)
-                self.wdgOptions[name] = {'chk': chk}
-            elif info['dtype'] == int:
-                frm = pytk.widgets.Frame(self.frmRight)
-                frm.pack(fill='x', padx=1, pady=1)
-                lbl = pytk.widgets.Label(frm, text=info['label'])
-                lbl.pack(side='left', fill='x', padx=1, pady=1)
-                spb = pytk.widgets.Spinbox(frm, **info['values'])
-                spb.pack(
-                    side='left', fill='x', anchor='w', padx=1, pady=1)
-                self.wdgOptions[name] = {'frm': frm, 'lbl': lbl, 'spb': spb}
-            elif info['dtype'] == str:
-                pass
-
-        spacer = pytk.widgets.Frame(self.frmRight)
-        spacer.pack(side='top', padx=4, pady=4)
-        self.frmSpacers.append(spacer)
-        self.pbrRunning = pytk.widgets.Progressbar(self.frmRight)
-        self.pbrRunning.pack(side='top', fill='x', expand=True)
-
-        spacer = pytk.widgets.Frame(self.frmRight)
-        spacer.pack(side='top', padx=4, pady=4)
-        self.frmSpacers.append(spacer)
-        self.frmButtons = pytk.widgets.Frame(self.frmRight)
-        self.frmButtons.pack(side='bottom', padx=4, pady=4)
-        spacer = pytk.widgets.Frame(self.frmButtons)
-        spacer.pack(side='left', anchor='e', expand=True)
-        self.frmSpacers.append(spacer)
-        self.btnRun = pytk.widgets.Button(
-            self.frmButtons, text='Run', compound='left',
-            command=self.actionRun)
-        self.btnRun.pack(side='left', padx=4, pady=4)
-        self.btnExit = pytk.widgets.Button(
-            self.frmButtons, text='Exit', compound='left',
-            command=self.actionExit)
-        self.btnExit.pack(side='left', padx=4, pady=4)
-
-        pytk.util.center(self.parent)
-
-        self._cfg_to_ui()
-
-    # --------------------------------
-    def _ui_to_cfg(self):
-        """Update the config information from the UI."""
-        cfg = self.cfg
-        cfg.update({
-            'input_paths': self.lsvInput.get_items(),
-            'output_path': self.txtPath.get(),
-            'output_subpath': self.txtSubpath.get(),
-            'save_on_exit': bool(self.save_on_exit.get()),
-            'gui_style_tk': self.style.theme_use()
-        })
-        for name, items in self.wdgModules.items():
-            cfg[name] = items['ent'].get_val() if items['chk'].get_val() else ''
-        for name, items in self.wdgOptions.items():
-            if 'chk' in items:
-                cfg[name] = items['chk'].get_val()
-            elif 'spb' in items:
-                cfg[name] = utl.auto_convert(items['spb'].get_val())
-        return cfg
-
-    def _cfg_to_ui(self):
-        """Update the config information to the UI."""
-        for target in self.cfg['input_paths']:
-            self.lsvInput.add_item(target, unique=True)
-        self.txtPath.set_val(self.cfg['output_path'])
-        self.txtSubpath.set_val(self.cfg['output_subpath'])
-        self.save_on_exit.set(self.cfg['save_on_exit'])
-        self.style.theme_use(self.cfg['gui_style_tk'])
-        for name, items in self.wdgModules.items():
-            items['chk'].set_val(True if self.cfg[name] else False)
-            items['ent'].set_val(self.cfg[name])
-        for name, items in self.wdgOptions.items():
-            if 'chk' in items:
-                items['chk'].set_val(self.cfg[name])
-            elif 'spb' in items:
-                items['spb'].set_val(self.cfg[name])
-        self.activateModules()
-
-    def _make_menu(self):
-        self.save_on_exit = pytk.util.tk.BooleanVar(
-            value=self.cfg['save_on_exit'])
-
-        self.mnuMain = pytk.widgets.Menu(self.parent, tearoff=False)
-        self.parent.config(menu=self.mnuMain)
-        self.mnuFile = pytk.widgets.Menu(self.mnuMain, tearoff=False)
-        self.mnuMain.add_cascade(label='File', menu=self.mnuFile)
-        self.mnuFileInput = pytk.widgets.Menu(self.mnuFile, tearoff=False)
-        self.mnuFile.add_cascade(label='Input', menu=self.mnuFileInput)
-        self.mnuFileInput.add_command(label='Add...', command=self.actionAdd)
-        self.mnuFileInput.add_command(
-            label='Remove', command=self.actionRemove)
-        self.mnuFileInput.add_command(
-            label='Clear', command=self.actionClear)
-        self.mnuFileInput.add_separator()
-        self.mnuFileInput.add_command(
-            label='Import...', command=self.actionImport)
-        self.mnuFileInput.add_command(
-            label='Export...', command=self.actionExport)
-        self.mnuFileOutput = pytk.widgets.Menu(self.mnuFile, tearoff=False)
-        self.mnuFile.add_cascade(label='Output', menu=self.mnuFileOutput)
-        self.mnuFileOutput.add_command(
-            label='Path...', command=self.actionPath)
-        self.mnuFile.add_separator()
-        self.mnuFile.add_command(label='Run', command=self.actionRun)
-        self.mnuFile.add_separator()
-        self.mnuFile.add_command(label='Exit', command=self.actionExit)
-        self.mnuSettings = pytk.widgets.Menu(self.mnuMain, tearoff=False)
-        self.mnuMain.add_cascade(label='Settings', menu=self.mnuSettings)
-        self.mnuSettings.add_command(
-            label='Advanced', command=self.actionAdvancedSettings)
-        self.mnuSettings.add_separator()
-        self.mnuSettings.add_command(
-            label='Load Settings', command=self.actionLoadSettings)
-        self.mnuSettings.add_command(
-            label='Save Settings', command=self.actionSaveSettings)
-        self.mnuSettings.add_separator()
-        self.mnuSettings.add_checkbutton(
-            label='Save on Exit', variable=self.save_on_exit)
-        self.mnuSettings.add_command(
-            label='Reset Defaults', command=self.actionResetDefaults)
-        self.mnuHelp = pytk.widgets.Menu(self.mnuMain, tearoff=False)
-        self.mnuMain.add_cascade(label='Help', menu=self.mnuHelp)
-        self.mnuHelp.add_command(label='About', command=self.actionAbout)
-
-    def actionRun(self, event=None):
-        """Action on Click Button Run."""
-
-        def _name_to_tag(text):
-            for ending in ('_subpath', '_template'):
-                if text.endswith(ending):
-                    text = text[:-len(ending)]
-            return text
-
-        # TODO: redirect stdout to some log box / use progressbar
-        # extract options
-        force = self.wdgOptions['force']['chk'].get_val()
-        msg('Force: {}'.format(force))
-        verbose = VERB_LVL[self.wdgOptions['verbose']['spb'].get_val()]
-        msg('Verb.: {}'.format(verbose))
-        if self.cfg['use_mp']:
-            # parallel
-            pool = multiprocessing.Pool(processes=self.cfg['num_processes'])
-            proc_results = []
-        in_dirpaths = self.lsvInput.get_items()
-        for in_dirpath in in_dirpaths:
-            kws = {
-                name: info['ent'].get_val()
-                for name, info in self.wdgModules.items()}
-            triggered = collections.OrderedDict(
-                [(_name_to_tag(name), ACTIONS[_name_to_tag(name)])
-                 for name, info in self.wdgModules.items()
-                 if info['chk'].get_val() and _name_to_tag(name) in ACTIONS])
-            kws.update({
-                'in_dirpath': in_dirpath,
-                'out_dirpath': os.path.expanduser(self.txtPath.get()),
-                'subpath': self.txtSubpath.get(),
-                'actions': triggered,
-                'force': force,
-                'verbose': verbose,
-            })
-            if self.cfg['use_mp']:
-                proc_results.append(pool.apply_async(dcmpi_run, kwds=kws))
-            else:
-                dcmpi_run(**kws)
-        # print(proc_results)
-        if self.cfg['use_mp']:
-            res_list = [proc_result.get() for proc_result in proc_results]
-        return
-
-    def actionImport(self, event=None):
-        """Action on Click Button Import."""
-        title = '{} {} List'.format(
-            self.btnImport.cget('text'), self.lblInput.cget('text'))
-        in_filepath = filedialog.askopenfilename(
-            parent=self, title=title, defaultextension='.json',
-            initialdir=self.cfg['import_path'],
-            filetypes=[('JSON Files', '*.json')])
-        if in_filepath:
-            try:
-                with open(in_filepath, 'r') as in_file:
-                    targets = json.load(in_file)
-                for target in targets:
-                    self.lsvInput.add_item(target, unique=True)
-            except ValueError:
-                title = self.btnImport.cget('text') + ' Failed'
-                msg = 'Could not import input list from `{}`'.format(
-                    in_filepath)
-                messagebox.showerror(title=title, message=msg)
-            finally:
-                self.cfg['import_path'] = os.path.dirname(in_filepath)
-
-    def actionExport(self, event=None):
-        """Action on Click Button Export."""
-        title = '{} {} List'.format(
-            self.btnExport.cget('text'), self.lblInput.cget('text'))
-        out_filepath = filedialog.asksaveasfilename(
-            parent=self, title=title, defaultextension='.json',
-            initialdir=self.cfg['export_path'],
-            filetypes=[('JSON Files', '*.json')], confirmoverwrite=True)
-        if out_filepath:
-            targets = self.lsvInput.get_items()
-            if not targets:
-                title = self.btnExport.cget('text')
-                msg = 'Empty {} list.\n'.format(self.lblInput.cget('text')) + \
-                      'Do you want to proceed exporting?'
-                proceed = messagebox.askyesno(title=title, message=msg)
-            else:
-                proceed = True
-            if proceed:
-                with open(out_filepath, 'w') as out_file:
-                    json.dump(targets, out_file, sort_keys=True, indent=4)
-                self.cfg['export_path'] = os.path.dirname(out_filepath)
-
-    def actionAdd(self, event=None):
-        """Action on Click Button Add."""
-        title = self.btnAdd.cget('text') + ' ' + self.lblInput.cget('text')
-        target = filedialog.askdirectory(
-            parent=self, title=title, initialdir=self.cfg['add_path'],
-            mustexist=True)
-        if target:
-            self.lsvInput.add_item(target, unique=True)
-            self.cfg['add_path'] = target
-            # : adding multiple files
-            # for subdir in os.listdir(target):
-            #     tmp = os.path.join(target, subdir)
-            #     self.lsvInput.add_item(tmp, unique=True)
-            # self.cfg['add_path'] = target
-        return target
-
-    def actionRemove(self, event=None):
-        """Action on Click Button Remove."""
-        items = self.lsvInput.get_children('')
-        selected = self.lsvInput.selection()
-        if selected:
-            for item in selected:
-                self.lsvInput.delete(item)
-        elif items:
-            self.lsvInput.delete(items[-1])
-        else:
-            msg('Empty input list!')
-
-    def actionClear(self, event=None):
-        """Action on Click Button Clear."""
-        self.lsvInput.clear()
-
-    def actionPath(self, event=None):
-        """Action on Click Text Output."""
-        title = self.lblOutput.cget('text') + ' ' + self.lblPath.cget('text')
-        target = filedialog.askdirectory(
-            parent=self, title=title, initialdir=self.cfg['output_path'],
-            mustexist=True)
-        if target:
-            self.txtPath.set_val(target)
-        return target
-
-    def activateModules(self, event=None):
-        """Action on Change Checkbox Import."""
-        for name, items in self.wdgModules.items():
-            active = items['chk'].get_val()
-            if items['ent']:
-                items['ent']['state'] = 'enabled' if active else 'disabled'
-
-    def actionExit(self, event=None):
-        """Action on Exit."""
-        if messagebox.askokcancel('Quit', 'Are you sure you want to quit?'):
-            self.cfg = self._ui_to_cfg()
-            if self.cfg['save_on_exit']:
-                save_config(self.cfg, self.cfg_filepath)
-            self.parent.destroy()
-
-    def actionAbout(self, event=None):
-        """Action on About."""
-        self.winAbout = About(self.parent)
-
-    def actionAdvancedSettings(self, event=None):
-        self.winSettings = Settings(self.parent, self)
-        if self.winSettings.result:
-            self.cfg.update(self.winSettings.result)
-        self._cfg_to_ui()
-        # force resize for redrawing widgets correctly
-        # w, h = self.parent.winfo_width(), self.parent.winfo_height()
-        self.parent.update()
-
-    def actionLoadSettings(self):
-        self.cfg = load_config(self.cfg_filepath)
-        self._cfg_to_ui()
-
-    def actionSaveSettings(self):
-        self.cfg = self._ui_to_cfg()
-        save_config(self.cfg, self.cfg_filepath)
-
-    def actionResetDefaults(self, event=None):
-        self.cfg = default_config()
-        self._cfg_to_ui()
+    profiling.summarize(records, verbose)
+    save_records(records, out_dirpath, trace_filepath, chrome_trace_filepath)
+    return results
 
 
 # ======================================================================
 def dcmpi_run_gui(*_args, **_kws):
-    root = pytk.tk.Tk()
-    app = Main(root, *_args, **_kws)
-    pytk.util.set_icon(root, 'icon', PATH['resources'])
-    root.mainloop()
+    from dcmpi.dcmpi_run_gui import run
+
+    return run(*_args, **_kws)
 
 
 # ======================================================================
@@ -874,15 +545,16 @@ def dcmpi_run_tui(*_args, **_kws):
     # check if asciimatics is available
     # if not asciimatics:
     warnings.warn('Text UI not supported. Using command-line interface...')
-    dcmpi_run_cli(**_kws)
+    return dcmpi_run_cli(*_args, **_kws)
     # else:
     #     pass
 
 
 # ======================================================================
-def dcmpi_run_cli(*_args, **_kws):
-    msg('We-are-doomed...')
-    pass
+def dcmpi_run_cli(args):
+    from dcmpi.dcmpi_run_cli import run
+
+    return run(args)
 
 
 # ======================================================================
@@ -917,9 +589,10 @@ def handle_arg():
         action='store_true',
         help='force new processing [%(default)s]')
     arg_parser.add_argument(
-        '-i', '--in_dirpath', metavar='DIR',
-        default='.',
-        help='set input directory [%(default)s]')
+        '-i', '--in_dirpaths', metavar='DIR|FILE',
+        nargs='+', default=['.'],
+        help='set input directories, glob patterns or list files '
+             '[%(default)s]')
     arg_parser.add_argument(
         '-o', '--out_dirpath', metavar='DIR',
         default='.',
@@ -952,6 +625,37 @@ def handle_arg():
         '-b', '--backup_subpath',
         default=utl.TPL['backup'],
         help='Template for the backup filename. Empty to skip [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--num_processes', metavar='NUM',
+        type=int, default=None,
+        help='set number of parallel processes. '
+             'If not set, use the configuration [%(default)s]')
+    arg_parser.add_argument(
+        '-u', '--summary_filepath', metavar='FILE',
+        default=SUMMARY_FILENAME,
+        help='set JSON summary file (`-` for stdout, empty to skip). '
+             'Relative to the output directory [%(default)s]')
+    arg_parser.add_argument(
+        '-x', '--trace_filepath', metavar='FILE',
+        default=profiling.TRACE_FILENAME,
+        help='set JSON lines stage trace file (empty to skip). '
+             'Relative to the output directory [%(default)s]')
+    arg_parser.add_argument(
+        '-g', '--chrome_trace_filepath', metavar='FILE',
+        default=None,
+        help='set Chrome trace-event file. '
+             'Relative to the output directory [%(default)s]')
+    arg_parser.add_argument(
+        '-k', '--catalogue_filepath', metavar='FILE',
+        default=None,
+        help='set catalogue file to skip already imported instances '
+             '(e.g. `{}`). If not set, the catalogue is not used. '
+             'Relative to the output directory [%(default)s]'.format(
+                 ctg.CATALOGUE_FILENAME))
+    arg_parser.add_argument(
+        '-a', '--streaming',
+        action='store_true',
+        help='stream the stages, overlapping I/O and CPU [%(default)s]')
     arg_parser.add_argument(
         '-c', '--config', metavar='FILE',
         default=CFG_FILENAME,
@@ -970,14 +674,14 @@ def main_gui():
 def main_tui():
     """Entry point for Text User Interface (TUI)"""
     # this is used by the setup.py script
-    main('tui')
+    return main('tui')
 
 
 # ======================================================================
 def main_cli():
     """Entry point for Command-Line Interface (CLI)"""
     # this is used by the setup.py script
-    main('cli')
+    return main('cli')
 
 
 # ======================================================================
@@ -992,23 +696,27 @@ def main(ui_mode=None):
     if args.verbose >= VERB_LVL['debug']:
         arg_parser.print_help()
         msg('\nARGS: ' + str(vars(args)), args.verbose, VERB_LVL['debug'])
-    msg(__doc__.strip())
-    begin_time = datetime.datetime.now()
-
     if not ui_mode:
         ui_mode = args.ui_mode
+    # :: greet only in the interactive modes
+    if utl.has_graphics(ui_mode) or utl.has_term(ui_mode):
+        msg(MY_GREETINGS)
+    msg(__doc__.strip())
+    begin_time = datetime.datetime.now()
 
+    exit_code = 0
     if utl.has_graphics(ui_mode):
         dcmpi_run_gui(args)
     elif utl.has_term(ui_mode):
-        dcmpi_run_tui(args)
+        exit_code = dcmpi_run_tui(args)
     else:
-        dcmpi_run_cli(args)
+        exit_code = dcmpi_run_cli(args)
 
     exec_time = datetime.datetime.now() - begin_time
     msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return exit_code
 
 
 # ======================================================================
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,764 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: streaming DICOM preprocessing, overlapping I/O and CPU stages.
+
+The stages are connected by bounded queues (providing backpressure) and run
+on an event loop:
+ - scan: the input directories are walked (on the I/O executor);
+ - parse: the DICOM headers are parsed (on the process executor);
+ - place: each file is copied directly into its sorted location, i.e.
+   `<session>/<dcm>/<series>/` (on the I/O executor), unless it is already
+   in the catalogue (see `dcmpi.catalogue`);
+ - series: the per-series actions (`niz`, `meta`) start as soon as a series
+   is complete (see `dcmpi.tracking`), while the session is still being
+   imported (on the process executor, while the metadata is written on the
+   I/O executor);
+ - session: the other actions start as soon as their dependencies are
+   done (see `dcmpi.dcmpi_run.get_dependencies()`).
+
+The output layout is the same as `dcmpi.dcmpi_run.dcmpi_run()`.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import time  # Time access and conversions
+import shutil  # High-level file operations
+import collections  # High-performance container datatypes
+import functools  # Higher-order functions and operations on callable objects
+import multiprocessing  # Process-based parallelism
+import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import warnings  # Warning control
+import asyncio  # Asynchronous I/O
+import concurrent.futures  # Launching parallel tasks
+
+# :: External Imports
+
+# :: External Imports Submodules
+
+# :: Local Imports
+import dcmpi.util as utl
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+
+from dcmpi import get_nifti, get_meta, profiling, tracking
+from dcmpi import catalogue as ctg
+from dcmpi.dcmpi_run import ACTIONS, get_dependencies, save_records
+
+# ======================================================================
+D_QUEUE_SIZE = 256
+D_NUM_IO_WORKERS = 4
+
+# the actions run separately on each series, as soon as it is complete
+SERIES_ACTIONS = collections.OrderedDict((
+    ('niz', get_nifti.get_nifti),
+    ('meta', get_meta.get_meta),))
+
+
+# ======================================================================
+def _read_source(
+        filepath,
+        full_subpath):
+    """
+    Parse the DICOM header of a source file (for the sorted location).
+
+    Args:
+        filepath (str): The path to the (possibly compressed) source file.
+        full_subpath (str): The session sub-path template.
+            See `dcmpi.util.fill_from_dicom()` for more details.
+
+    Returns:
+        source (dict|None): The source information, if it is a DICOM.
+            Contains: `dcm_subpath` (the session sub-path), `src_id` (the
+            series ID, None if not available), `expected` (the expected
+            number of files of the series, None if not known),
+            `compression` and `uids` (see `dcmpi.catalogue.get_uids()`).
+    """
+    is_dicom, compression = utl.probe_dicom(filepath)
+    if not is_dicom:
+        return None
+    try:
+        with utl.open_compressed(filepath, 'rb', compression) as file_obj:
+            dcm, offset = utl.read_dicom_header(file_obj)
+    except Exception:
+        return None
+    if 'DirectoryRecordSequence' in dcm:
+        return None
+    try:
+        src_id = utl.get_series_id(dcm)
+    except (AttributeError, TypeError, ValueError):
+        src_id = None
+    return dict(
+        dcm_subpath=utl.fill_from_dataset(full_subpath, dcm)
+        if full_subpath else '',
+        src_id=src_id,
+        expected=tracking.expected_count(dcm),
+        compression=compression,
+        uids=ctg.get_uids(dcm))
+
+
+# ======================================================================
+def _place_source(
+        filepath,
+        out_filepath,
+        compression=None,
+        hashed=False,
+        force=False):
+    """
+    Copy (and decompress) a source file into its sorted location.
+
+    The file is written to a temporary name first and then renamed,
+    so that readers never see partially written files.
+
+    Args:
+        filepath (str): The path to the source file.
+        out_filepath (str): The path to the destination file.
+        compression (str|None): The compression of the source file.
+        hashed (bool): Compute the digest of the content while copying.
+            See `dcmpi.catalogue.copy_hashed()` for more details.
+        force (bool): Overwrite existing destination files.
+
+    Returns:
+        result (tuple|None): The tuple
+            (digest, size) if the file was copied, None otherwise.
+            Both are None if `hashed` is False.
+    """
+    if os.path.isfile(out_filepath) and not force:
+        return None
+    out_dirpath, filename = os.path.split(out_filepath)
+    if not os.path.isdir(out_dirpath):
+        os.makedirs(out_dirpath, exist_ok=True)
+    # : write to a temporary name, so that partial files are never visible
+    tmp_filepath = os.path.join(out_dirpath, '.' + filename + '.part')
+    try:
+        if hashed:
+            result = ctg.copy_hashed(filepath, tmp_filepath, compression)
+        elif compression:
+            with utl.open_compressed(filepath, 'rb', compression) \
+                    as src_file, open(tmp_filepath, 'wb') as dst_file:
+                shutil.copyfileobj(src_file, dst_file)
+            result = None, None
+        else:
+            shutil.copy(filepath, tmp_filepath)
+            result = None, None
+        os.replace(tmp_filepath, out_filepath)
+    finally:
+        if os.path.isfile(tmp_filepath):
+            os.remove(tmp_filepath)
+    return result
+
+
+# ======================================================================
+def _write_json(
+        obj,
+        filepath):
+    """
+    Write an object to a JSON file.
+
+    Args:
+        obj (Any): The object to write.
+        filepath (str): The path to the JSON file.
+
+    Returns:
+        None.
+    """
+    with open(filepath, 'w') as json_file:
+        json.dump(obj, json_file, sort_keys=True, indent=4)
+
+
+# ======================================================================
+def _call(func, kws):
+    """
+    Call a function, catching all errors and measuring the resources used.
+
+    Args:
+        func (callable): The function.
+        kws (dict): Keyword arguments passed to `func`.
+
+    Returns:
+        result (tuple): The tuple
+            (value, error, stats) where:
+             - value (Any): The value returned by `func` (None on errors).
+             - error (str|None): The error message, if any.
+             - stats (dict): The resources used.
+               See `profiling.Probe` for more details.
+    """
+    value = None
+    with profiling.Probe() as probe:
+        try:
+            value = func(**kws)
+        except Exception as e:
+            error = '{}: {}'.format(type(e).__name__, e)
+        else:
+            error = None
+    return value, error, probe.stats
+
+
+# ======================================================================
+class Session(object):
+    """
+    The state of a session being streamed.
+
+    Args:
+        dcm_dirpath (str): The path to the DICOM directory of the session.
+        dirpath (dict): The action -> output directory.
+    """
+
+    def __init__(self, dcm_dirpath, dirpath):
+        self.dcm_dirpath = dcm_dirpath
+        self.base_dirpath = os.path.dirname(dcm_dirpath)
+        self.dirpath = dirpath
+        self.begin_time = time.time()
+        self.import_time = None
+        # : the series ID -> sorted file paths
+        self.series = collections.OrderedDict()
+        self.complete = set()
+        # : the series changed after being complete
+        self.stale = set()
+        # : the action -> series ID -> task
+        self.series_tasks = collections.defaultdict(
+            collections.OrderedDict)
+        self.skipped = set()
+        self.imported = asyncio.Event()
+        self.task = None
+
+
+# ======================================================================
+class Pipeline(object):
+    """
+    The streaming pipeline.
+
+    Args:
+        out_dirpath (str): Path to output directory.
+        full_subpath (str): The DICOM sub-path template of each session.
+        subpaths (dict): The action -> sub-path (or template).
+        actions (dict): The action -> (func, kws).
+            See `dcmpi.dcmpi_run.ACTIONS` for more details.
+        num_processes (int): The number of worker processes.
+        num_io_workers (int): The number of I/O worker threads.
+        queue_size (int): The maximum size of the queues between stages.
+        quiet_time (float): The quiet time for the series completion in s.
+            See `dcmpi.tracking.SeriesTracker` for more details.
+        catalogue (dcmpi.catalogue.Catalogue|None): The catalogue.
+            The instances already in the catalogue are not imported.
+        force (bool): Force new processing.
+        verbose (int): Set level of verbosity.
+    """
+
+    def __init__(
+            self,
+            out_dirpath,
+            full_subpath,
+            subpaths,
+            actions=ACTIONS,
+            num_processes=1,
+            num_io_workers=D_NUM_IO_WORKERS,
+            queue_size=D_QUEUE_SIZE,
+            quiet_time=tracking.D_QUIET_TIME,
+            catalogue=None,
+            force=False,
+            verbose=D_VERB_LVL):
+        self.out_dirpath = out_dirpath
+        self.full_subpath = full_subpath
+        self.subpaths = subpaths
+        self.actions = actions
+        self.num_processes = num_processes
+        self.num_io_workers = num_io_workers
+        self.queue_size = queue_size
+        self.force = force
+        self.verbose = verbose
+        self.tracker = tracking.SeriesTracker(quiet_time)
+        self.catalogue = catalogue
+        self.num_duplicates = 0
+        self.sessions = collections.OrderedDict()
+        self.results = {}
+        self.records = []
+        self._loop = None
+        self._io_pool = None
+        self._cpu_pool = None
+
+    # --------------------------------
+    def _io(self, func, *_args):
+        return self._loop.run_in_executor(self._io_pool, func, *_args)
+
+    # --------------------------------
+    def _cpu(self, func, *_args):
+        return self._loop.run_in_executor(self._cpu_pool, func, *_args)
+
+    # --------------------------------
+    def _scan(self, in_dirpaths, files_queue):
+        """Walk the input directories (in an I/O thread)."""
+        for in_dirpath in in_dirpaths:
+            if not os.path.isdir(in_dirpath):
+                self.results[in_dirpath] = {
+                    'acquire': ('Input path does NOT exists.', 0.0)}
+                continue
+            msg(':: Importing sources...')
+            msg('Input:  {}'.format(in_dirpath))
+            for root, dirs, files in os.walk(in_dirpath):
+                for name in files:
+                    asyncio.run_coroutine_threadsafe(
+                        files_queue.put(
+                            (in_dirpath, os.path.join(root, name))),
+                        self._loop).result()
+
+    # --------------------------------
+    async def _parse(self, files_queue, sources_queue):
+        """Parse the headers of the scanned files."""
+        while True:
+            item = await files_queue.get()
+            if item is None:
+                break
+            in_dirpath, filepath = item
+            try:
+                source = await self._cpu(
+                    _read_source, filepath, self.full_subpath)
+            except Exception as e:
+                msg('W: Invalid source found `{}`: {}'.format(
+                    filepath[len(in_dirpath):], e),
+                    self.verbose, VERB_LVL['medium'])
+                continue
+            if source:
+                await sources_queue.put((in_dirpath, filepath, source))
+            else:
+                msg('W: Invalid source found `{}`'.format(
+                    filepath[len(in_dirpath):]),
+                    self.verbose, VERB_LVL['medium'])
+
+    # --------------------------------
+    async def _place(self, sources_queue):
+        """Copy the parsed files into their sorted location."""
+        while True:
+            item = await sources_queue.get()
+            if item is None:
+                break
+            in_dirpath, filepath, source = item
+            dcm_dirpath = os.path.join(
+                self.out_dirpath, source['dcm_subpath'])
+            session = self.get_session(dcm_dirpath)
+            uids = source['uids'] if self.catalogue else None
+            # : the catalogue may wait for other writers (or the disk)
+            record = await self._io(
+                self.catalogue.is_duplicate, uids['sop_uid'], filepath,
+                source['compression']) \
+                if uids and not self.force else None
+            if record:
+                self.num_duplicates += 1
+                msg('I: Duplicate `{}` already in `{}`'.format(
+                    filepath[len(in_dirpath):], record['filepath']),
+                    self.verbose, VERB_LVL['medium'])
+                continue
+            filename = os.path.basename(filepath)
+            if source['compression']:
+                filename = os.path.splitext(filename)[0]
+            fake_path = os.path.dirname(os.path.relpath(
+                filepath, in_dirpath)).replace(
+                os.path.sep, utl.INFO_SEP) + utl.INFO_SEP
+            out_filepath = os.path.join(
+                dcm_dirpath, source['src_id'] or '', fake_path + filename)
+            try:
+                placed = await self._io(
+                    _place_source, filepath, out_filepath,
+                    source['compression'], bool(uids), self.force)
+            except Exception as e:
+                msg('W: failed processing `{}`: {}'.format(filepath, e),
+                    self.verbose, VERB_LVL['low'])
+            else:
+                if uids and placed:
+                    digest, size = placed
+                    await self._io(functools.partial(
+                        self.catalogue.add,
+                        uids['sop_uid'], series_uid=uids['series_uid'],
+                        study_uid=uids['study_uid'], filepath=out_filepath,
+                        digest=digest, size=size))
+                if source['src_id']:
+                    self.add_source(
+                        session, source['src_id'], out_filepath,
+                        source['expected'])
+
+    # --------------------------------
+    def get_session(self, dcm_dirpath):
+        """
+        Get the session of a DICOM directory, starting it if new.
+
+        Args:
+            dcm_dirpath (str): The path to the DICOM directory.
+
+        Returns:
+            session (Session): The session.
+        """
+        if dcm_dirpath not in self.sessions:
+            base_dirpath = os.path.dirname(dcm_dirpath)
+            msg('Subpath: {}'.format(dcm_dirpath[len(self.out_dirpath):]),
+                self.verbose, VERB_LVL['low'])
+            dirpath = {
+                k: os.path.join(base_dirpath, v)
+                for k, v in self.subpaths.items() if v}
+            session = Session(dcm_dirpath, dirpath)
+            # : proceed only if output is not likely to be there
+            for action in SERIES_ACTIONS:
+                if action in self.actions and action in dirpath:
+                    if os.path.exists(dirpath[action]) and not self.force:
+                        msg('I: Skipping existing output path `{}`. '
+                            'Use `force` to override.'.format(
+                                dirpath[action]))
+                        session.skipped.add(action)
+                    else:
+                        os.makedirs(dirpath[action], exist_ok=True)
+            session.task = asyncio.ensure_future(self._run_session(session))
+            self.sessions[dcm_dirpath] = session
+        return self.sessions[dcm_dirpath]
+
+    # --------------------------------
+    async def _watch(self, imported):
+        """Complete the quiet series, until the import is done."""
+        if not self.tracker.quiet_time:
+            await imported.wait()
+            return
+        interval = min(self.tracker.quiet_time / 4, 1.0)
+        while not imported.is_set():
+            try:
+                await asyncio.wait_for(imported.wait(), interval)
+            except asyncio.TimeoutError:
+                for dcm_dirpath, src_id in self.tracker.poll():
+                    self.complete_series(self.sessions[dcm_dirpath], src_id)
+
+    # --------------------------------
+    def add_source(self, session, src_id, filepath, expected=None):
+        """
+        Add a sorted file to a series of a session.
+
+        Args:
+            session (Session): The session.
+            src_id (str): The series ID.
+            filepath (str): The path to the sorted file.
+            expected (int|None): The expected number of files of the series.
+                See `dcmpi.tracking.expected_count()` for more details.
+
+        Returns:
+            None.
+        """
+        session.series.setdefault(src_id, []).append(filepath)
+        if src_id in session.complete:
+            msg('W: File `{}` added to complete series `{}`.'.format(
+                filepath, src_id), self.verbose, VERB_LVL['low'])
+            session.stale.add(src_id)
+        if self.tracker.add((session.dcm_dirpath, src_id), expected):
+            self.complete_series(session, src_id)
+
+    # --------------------------------
+    def complete_series(self, session, src_id):
+        """
+        Mark a series as complete, starting its per-series actions.
+
+        Args:
+            session (Session): The session.
+            src_id (str): The series ID.
+
+        Returns:
+            None.
+        """
+        if src_id in session.complete:
+            return
+        session.complete.add(src_id)
+        msg('Series ready: {}'.format(
+            os.path.join(session.dcm_dirpath, src_id)),
+            self.verbose, VERB_LVL['medium'])
+        for action in SERIES_ACTIONS:
+            if action in self.actions and action in session.dirpath \
+                    and action not in session.skipped:
+                # : a series processed again waits for the previous run
+                previous = session.series_tasks[action].get(src_id)
+                session.series_tasks[action][src_id] = asyncio.ensure_future(
+                    self._run_series_action(
+                        session, src_id, action, previous))
+
+    # --------------------------------
+    def complete_session(self, session):
+        """
+        Mark a session as imported, completing all its series.
+
+        The series changed after being complete are processed again.
+
+        Args:
+            session (Session): The session.
+
+        Returns:
+            None.
+        """
+        for src_id in session.series:
+            if src_id in session.stale:
+                msg('W: Series `{}` changed after completion. '
+                    'Processing again.'.format(src_id),
+                    self.verbose, VERB_LVL['low'])
+                session.complete.discard(src_id)
+            self.complete_series(session, src_id)
+        session.import_time = time.time()
+        session.imported.set()
+
+    # --------------------------------
+    async def _run_series_action(self, session, src_id, action, previous):
+        """Run a per-series action (after its previous run, if any)."""
+        if previous:
+            await previous
+        out_dirpath = session.dirpath[action]
+        if action == 'niz':
+            value, error, stats = await self._cpu(_call, (
+                get_nifti.get_series_nifti), dict(
+                in_dirpath=session.dcm_dirpath, out_dirpath=out_dirpath,
+                src_id=src_id, verbose=self.verbose))
+        else:  # if action == 'meta':
+            value, error, stats = await self._cpu(_call, (
+                get_meta.get_series_meta), dict(
+                filepaths=sorted(session.series[src_id]),
+                verbose=self.verbose))
+            if not error:
+                out_filepath = os.path.join(
+                    out_dirpath, src_id + '.' + utl.ID['meta'])
+                msg('Meta: {}'.format(out_filepath[len(out_dirpath):]),
+                    self.verbose, D_VERB_LVL)
+                await self._io(_write_json, value, out_filepath)
+        self.records.append(dict(
+            session=session.dcm_dirpath, stage=action, error=error,
+            stats=stats))
+        if error:
+            error = '{}: {}'.format(src_id, error)
+        return error, stats['wall']
+
+    # --------------------------------
+    async def _run_stage(self, session, action, func, kws, dep_tasks):
+        """Run a session action, after its dependencies."""
+        await asyncio.gather(*dep_tasks)
+        if action in SERIES_ACTIONS and action in session.dirpath:
+            results = await asyncio.gather(
+                *session.series_tasks[action].values())
+            errors = [error for error, elapsed in results if error]
+            result = (
+                '; '.join(errors) if errors else None,
+                sum(elapsed for error, elapsed in results))
+        else:
+            msg('Start: {} {}'.format(session.dcm_dirpath, action),
+                self.verbose, VERB_LVL['medium'])
+            value, error, stats = await self._cpu(_call, func, kws)
+            self.records.append(dict(
+                session=session.dcm_dirpath, stage=action, error=error,
+                stats=stats))
+            result = error, stats['wall']
+        self.results[session.dcm_dirpath][action] = result
+        if result[0]:
+            warnings.warn('{}: {}: {}'.format(
+                session.dcm_dirpath, action, result[0]))
+        msg('Done: {} {} ({:.3f} s)'.format(
+            session.dcm_dirpath, action, result[1]),
+            self.verbose, VERB_LVL['medium'])
+
+    # --------------------------------
+    async def _run_session(self, session):
+        """Run the session actions, as soon as their inputs are ready."""
+        from dcmpi.do_sorting import grouping
+
+        self.results[session.dcm_dirpath] = {}
+        await session.imported.wait()
+        self.results[session.dcm_dirpath]['sort'] = (
+            None, session.import_time - session.begin_time)
+        stages = collections.OrderedDict()
+        stages['sort'] = None, None
+        stages['group'] = (grouping, dict(
+            dirpath=session.dcm_dirpath,
+            summary=utl.D_SUMMARY + '.' + utl.EXT['json'],
+            force=self.force, verbose=self.verbose))
+        fmt_kws = dict(
+            dcm_dirpath=session.dcm_dirpath,
+            base_dirpath=session.base_dirpath, dirpath=session.dirpath,
+            report_template=self.subpaths.get('report'),
+            backup_template=self.subpaths.get('backup'))
+        for action, (func, kws) in self.actions.items():
+            kws = kws.copy()
+            for key, val in kws.items():
+                if isinstance(val, str):
+                    kws[key] = fmtm(val, fmt_kws)
+            kws.update(dict(force=self.force, verbose=self.verbose))
+            stages[action] = (func, kws)
+        deps = get_dependencies(stages.keys())
+        tasks = {'sort': asyncio.ensure_future(asyncio.sleep(0))}
+        for action, (func, kws) in list(stages.items())[1:]:
+            tasks[action] = asyncio.ensure_future(self._run_stage(
+                session, action, func, kws,
+                [tasks[dep] for dep in deps[action]]))
+        await asyncio.gather(*tasks.values())
+        msg('Done: {}'.format(session.dcm_dirpath))
+
+    # --------------------------------
+    async def run(self, in_dirpaths):
+        """
+        Run the pipeline on the input directories.
+
+        Args:
+            in_dirpaths (Iterable[str]): Paths to input directories.
+
+        Returns:
+            results (dict): The DICOM directory -> action -> (error, elapsed).
+                See `dcmpi_run_async()` for more details.
+        """
+        self._loop = asyncio.get_event_loop()
+        self._cpu_pool = concurrent.futures.ProcessPoolExecutor(
+            self.num_processes)
+        # : start the worker processes before the threads
+        await self._cpu(os.getpid)
+        # : one more thread for the scanner
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(
+            self.num_io_workers + 1)
+        try:
+            files_queue = asyncio.Queue(self.queue_size)
+            sources_queue = asyncio.Queue(self.queue_size)
+            imported = asyncio.Event()
+            watcher = asyncio.ensure_future(self._watch(imported))
+            with profiling.Probe() as probe:
+                # : keep the worker processes busy
+                parsers = [
+                    asyncio.ensure_future(
+                        self._parse(files_queue, sources_queue))
+                    for _ in range(2 * self.num_processes)]
+                placers = [
+                    asyncio.ensure_future(self._place(sources_queue))
+                    for _ in range(self.num_io_workers)]
+                await self._io(self._scan, in_dirpaths, files_queue)
+                for _ in parsers:
+                    await files_queue.put(None)
+                await asyncio.gather(*parsers)
+                for _ in placers:
+                    await sources_queue.put(None)
+                await asyncio.gather(*placers)
+                if self.num_duplicates:
+                    msg('I: Skipped {} duplicates. '
+                        'Use `force` to override.'.format(self.num_duplicates))
+                imported.set()
+                await watcher
+                for session in self.sessions.values():
+                    self.complete_session(session)
+            self.records.append(dict(
+                session=self.out_dirpath, stage='acquire', error=None,
+                stats=probe.stats))
+            await asyncio.gather(
+                *[session.task for session in self.sessions.values()])
+        finally:
+            self._io_pool.shutdown()
+            self._cpu_pool.shutdown()
+        return self.results
+
+
+# ======================================================================
+def dcmpi_run_async(
+        in_dirpath,
+        out_dirpath,
+        subpath=utl.TPL['acquire'],
+        dcm_subpath=utl.ID['dicom'],
+        niz_subpath=utl.ID['niz'],
+        meta_subpath=utl.ID['meta'],
+        prot_subpath=utl.ID['prot'],
+        info_subpath=utl.ID['info'],
+        report_template=utl.TPL['report'],
+        backup_template=utl.TPL['backup'],
+        actions=ACTIONS,
+        num_processes=None,
+        num_io_workers=D_NUM_IO_WORKERS,
+        queue_size=D_QUEUE_SIZE,
+        quiet_time=tracking.D_QUIET_TIME,
+        trace_filepath=profiling.TRACE_FILENAME,
+        chrome_trace_filepath=None,
+        catalogue_filepath=None,
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Standard preprocessing of DICOM files, streaming the stages.
+
+    This is a drop-in replacement for `dcmpi.dcmpi_run.dcmpi_run()`:
+    the import and the sorting are merged (each file is copied directly
+    into its series directory), the per-series actions start as soon as a
+    series is complete (even if the session is still being imported), and
+    the other actions as soon as their inputs are ready.
+    Compressed sources are decompressed while being copied.
+    The instances already in the catalogue are not imported again.
+
+    Args:
+        in_dirpath (str|Iterable[str]): Path(s) to input directory.
+        out_dirpath (str): Path to output directory.
+        subpath (str): The output sub-path template.
+        dcm_subpath (str): The DICOM sub-path.
+        niz_subpath (str): The NIfTI sub-path. Empty to skip.
+        meta_subpath (str): The metadata sub-path. Empty to skip.
+        prot_subpath (str): The protocol sub-path. Empty to skip.
+        info_subpath (str): The information sub-path. Empty to skip.
+        report_template (str): The report template.
+        backup_template (str): The backup template.
+        actions (dict): The action -> (func, kws).
+            See `dcmpi.dcmpi_run.ACTIONS` for more details.
+        num_processes (int|None): The number of worker processes.
+            If None, uses the number of available CPUs.
+        num_io_workers (int): The number of I/O worker threads.
+        queue_size (int): The maximum size of the queues between stages.
+        quiet_time (float): The quiet time for the series completion in s.
+            See `dcmpi.tracking.SeriesTracker` for more details.
+        trace_filepath (str|None): Path to the JSON lines trace.
+            See `dcmpi.dcmpi_run.save_records()` for more details.
+        chrome_trace_filepath (str|None): Path to the Chrome trace file.
+            See `dcmpi.dcmpi_run.save_records()` for more details.
+        catalogue_filepath (str|None): Path to the catalogue.
+            See `dcmpi.dcmpi_run.dcmpi_run()` for more details.
+        force (bool): Force new processing.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        results (dict): The DICOM directory -> action -> (error, elapsed).
+            The elapsed time of `sort` is the time spent importing the
+            session. Missing inputs are reported as: input directory ->
+            'acquire' -> (error, elapsed).
+    """
+    in_dirpaths = [in_dirpath] if isinstance(in_dirpath, str) else in_dirpath
+    if num_processes is None:
+        num_processes = multiprocessing.cpu_count()
+    full_subpath = os.path.join(subpath, dcm_subpath)
+    subpaths = dict(
+        niz=niz_subpath, meta=meta_subpath, prot=prot_subpath,
+        info=info_subpath, report=report_template, backup=backup_template)
+    if catalogue_filepath:
+        if not os.path.isdir(out_dirpath):
+            os.makedirs(out_dirpath)
+        catalogue = ctg.Catalogue(
+            os.path.join(out_dirpath, catalogue_filepath))
+    else:
+        catalogue = None
+    pipeline = Pipeline(
+        out_dirpath, full_subpath, subpaths, actions, num_processes,
+        num_io_workers, queue_size, quiet_time, catalogue, force, verbose)
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        results = loop.run_until_complete(pipeline.run(in_dirpaths))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+        if catalogue:
+            catalogue.close()
+    for in_dirpath, result in results.items():
+        if 'acquire' in result:
+            warnings.warn('{}: {}: {}'.format(
+                in_dirpath, 'acquire', result['acquire'][0]))
+    profiling.summarize(pipeline.records, verbose)
+    save_records(
+        pipeline.records, out_dirpath, trace_filepath, chrome_trace_filepath)
+    return results
+
+
+# ======================================================================
+if __name__ == '__main__':
+    import doctest  # Test interactive Python examples
+
+    msg(__doc__.strip())
+    doctest.testmod()
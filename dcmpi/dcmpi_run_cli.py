@@ -1,7 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-Extract and preprocess DICOM files.
+Extract and preprocess DICOM files (headless batch processing).
+
+All the sessions are processed on a single process pool, and a failure
+only affects the failed session.
+A machine-readable (JSON) summary is produced, and the exit code is
+non-zero if any session failed.
 """
 
 # ======================================================================
@@ -14,7 +19,7 @@ from __future__ import unicode_literals
 # ======================================================================
 # :: Python Standard Library Imports
 import os  # Miscellaneous operating system interfaces
-# import sys  # System-specific parameters and functions
+import sys  # System-specific parameters and functions
 # import shutil  # High-level file operations
 # import platform  # Access to underlying platform’s identifying data
 # import math  # Mathematical functions
@@ -22,13 +27,15 @@ import time  # Time access and conversions
 import datetime  # Basic date and time types
 # import re  # Regular expression operations
 # import operator  # Standard operators as functions
-# import collections  # High-performance container datatypes
+import collections  # High-performance container datatypes
 import argparse  # Parser for command-line options, arguments and sub-commands
 # import itertools  # Functions creating iterators for efficient looping
 # import functools  # Higher-order functions and operations on callable objects
 # import subprocess  # Subprocess management
 # import multiprocessing  # Process-based parallelism
 # import csv  # CSV File Reading and Writing [CSV: Comma-Separated Values]
+import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import glob  # Unix style pathname pattern expansion
 
 # :: External Imports
 # import numpy as np  # NumPy (multidimensional numerical arrays library)
@@ -51,93 +58,173 @@ import argparse  # Parser for command-line options, arguments and sub-commands
 # import scipy.ndimage  # SciPy: ND-image Manipulation
 
 # :: Local Imports
-from dcmpi.do_acquire_sources import do_acquire_sources
-from dcmpi.do_sorting import sorting
 import dcmpi.util as utl
-from dcmpi.get_nifti import get_nifti
-from dcmpi.get_info import get_info
-from dcmpi.get_prot import get_prot
-from dcmpi.get_meta import get_meta
-from dcmpi.do_backup import do_backup
-from dcmpi.do_report import do_report
-from dcmpi import INFO, PATH
+from dcmpi.dcmpi_run import (
+    dcmpi_run, get_config, ACTIONS, CFG_FILENAME, SUMMARY_FILENAME)
+from dcmpi import profiling
+from dcmpi import catalogue as ctg
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 
 
-ACTIONS = {
-    get_info: 'ciao',
-}
-# print(ACTIONS)
-#     (get_nifti, ),
-#     (get_meta, ),
-#     (get_prot, ),
-#     (do_report, ),
-#     (do_backup, ),
-# )
+# ======================================================================
+def get_in_dirpaths(items):
+    """
+    Expand the input items into a list of input directories.
+
+    Args:
+        items (Iterable[str]): The input items.
+            Each item can be a directory, a glob pattern, or a file listing
+            the input directories (either a JSON list, as exported from the
+            GUI, or one path per line; empty lines and lines starting with
+            `#` are ignored).
+
+    Returns:
+        in_dirpaths (list[str]): The input directories.
+            Items not matching anything are kept, so that they are
+            reported as failed.
+    """
+    in_dirpaths = []
+    for item in items:
+        if os.path.isfile(item):
+            with open(item, 'r') as in_file:
+                text = in_file.read()
+            try:
+                paths = json.loads(text)
+            except ValueError:
+                paths = [
+                    line.strip() for line in text.splitlines()
+                    if line.strip() and not line.strip().startswith('#')]
+            in_dirpaths.extend(get_in_dirpaths(paths))
+        else:
+            in_dirpaths.extend(sorted(glob.glob(item)) or [item])
+    # : remove duplicates, keeping the order
+    return [
+        path for i, path in enumerate(in_dirpaths)
+        if path not in in_dirpaths[:i]]
+
 
 # ======================================================================
-def process(
-        in_dirpath,
+def dcmpi_run_batch(
+        in_dirpaths,
         out_dirpath,
         subpath=utl.TPL['acquire'],
-        import_subpath=utl.ID['dicom'],
+        dcm_subpath=utl.ID['dicom'],
         niz_subpath=utl.ID['niz'],
         meta_subpath=utl.ID['meta'],
         prot_subpath=utl.ID['prot'],
         info_subpath=utl.ID['info'],
         report_template=utl.TPL['report'],
         backup_template=utl.TPL['backup'],
+        num_processes=None,
+        summary_filepath=SUMMARY_FILENAME,
+        trace_filepath=profiling.TRACE_FILENAME,
+        chrome_trace_filepath=None,
+        catalogue_filepath=None,
+        streaming=False,
         force=False,
         verbose=D_VERB_LVL):
     """
-    Standard preprocessing of DICOM files.
+    Standard preprocessing of many DICOM sessions, without user interface.
 
     Args:
-        in_dirpath (str): Path to input directory.
+        in_dirpaths (Iterable[str]): The input items.
+            See `get_in_dirpaths()` for the accepted values.
         out_dirpath (str): Path to output directory.
-        subpath ():
-        niz_subpath ():
-        meta_subpath ():
-        prot_subpath ():
-        info_subpath ():
-        report_subpath ():
-        backup_subpath ():
+        subpath (str): The output sub-path template.
+        dcm_subpath (str): The DICOM sub-path.
+        niz_subpath (str): The NIfTI sub-path. Empty to skip.
+        meta_subpath (str): The metadata sub-path. Empty to skip.
+        prot_subpath (str): The protocol sub-path. Empty to skip.
+        info_subpath (str): The information sub-path. Empty to skip.
+        report_template (str): The report template. Empty to skip.
+        backup_template (str): The backup template. Empty to skip.
+        num_processes (int|None): The number of parallel processes.
+            This is the global budget for all the sessions.
+            If None, uses the number of available CPUs.
+            If 1, the sessions are processed sequentially.
+        summary_filepath (str|None): Path to the JSON summary file.
+            If relative, it is relative to the output directory.
+            If '-', the summary is printed to the standard output
+            (mixed with the log messages).
+            If None, the summary is not saved.
+        trace_filepath (str|None): Path to the JSON lines stage trace.
+            See `dcmpi.dcmpi_run.dcmpi_run()` for more details.
+        chrome_trace_filepath (str|None): Path to the Chrome trace file.
+            See `dcmpi.dcmpi_run.dcmpi_run()` for more details.
+        catalogue_filepath (str|None): Path to the catalogue.
+            See `dcmpi.dcmpi_run.dcmpi_run()` for more details.
+        streaming (bool): Stream the stages, overlapping I/O and CPU.
+            See `dcmpi.dcmpi_run_async.dcmpi_run_async()` for more details.
         force (bool): Force new processing.
         verbose (int): Set level of verbosity.
 
     Returns:
-        None.
+        summary (dict): The summary of the processing.
+            Contains the overall `status`, the number of sessions and
+            failures, the elapsed time, and for each session its `status`
+            and the `error` and `elapsed` time of each action.
+
+    See Also:
+        dcmpi.dcmpi_run.dcmpi_run
     """
-    subdirs = (
-        niz_subpath, meta_subpath, prot_subpath, info_subpath, report_template,
-        backup_template)
-    # import
-    dcm_dirpaths = do_acquire_sources(
-        in_dirpath, out_dirpath, False, subpath, import_subpath, force, verbose)
-    for dcm_dirpath in dcm_dirpaths:
-        base_dirpath = os.path.dirname(dcm_dirpath)
-        # sort
-        sorting(
-            dcm_dirpath, utl.D_SUMMARY + '.' + utl.EXT['json'],
-            force, verbose)
-        # other actions
-        # actions = [(a, d) for a, d in zip(utl.D_ACTIONS, subdirs)
-        #            if d.strip()]
-        # for action, subdir in actions:
-        #     i_dirpath = dcm_dirpath if action[0] != 'do_report' else \
-        #         os.path.join(base_dirpath, info_subpath)
-        #     o_dirpath = os.path.join(base_dirpath, subdir)
-        #     if verbose >= VERB_LVL['debug']:
-        #         print('I:  input dir: {}'.format(i_dirpath))
-        #         print('I: output dir: {}'.format(o_dirpath))
-        #     func, params = action
-        #     func = globals()[func]
-        #     params = [(vars()[par[2:]] if str(par).startswith('::') else par)
-        #               for par in params]
-        #     if verbose >= VERB_LVL['debug']:
-        #         print('DBG: {}'.format(params))
-        #     func(*params, force=force, verbose=verbose)
+    begin_time = time.time()
+    in_dirpaths = get_in_dirpaths(in_dirpaths)
+    msg(':: Batch processing {} inputs...'.format(len(in_dirpaths)))
+    subpaths = dict(
+        niz=niz_subpath, meta=meta_subpath, prot=prot_subpath,
+        info=info_subpath, report=report_template, backup=backup_template)
+    actions = collections.OrderedDict(
+        (name, action) for name, action in ACTIONS.items()
+        if subpaths.get(name, True))
+    sessions = {}
+    for in_dirpath in in_dirpaths:
+        if not os.path.isdir(in_dirpath):
+            sessions[in_dirpath] = {'acquire': (
+                'Input path does NOT exists.', 0.0)}
+    if streaming:
+        from dcmpi.dcmpi_run_async import dcmpi_run_async as run_func
+    else:
+        run_func = dcmpi_run
+    results = run_func(
+        [in_dirpath for in_dirpath in in_dirpaths
+         if in_dirpath not in sessions],
+        out_dirpath, subpath, dcm_subpath,
+        niz_subpath, meta_subpath, prot_subpath, info_subpath,
+        report_template, backup_template, actions,
+        num_processes=num_processes, trace_filepath=trace_filepath,
+        chrome_trace_filepath=chrome_trace_filepath,
+        catalogue_filepath=catalogue_filepath,
+        force=force, verbose=verbose)
+    sessions.update(results)
+
+    summary = {'sessions': {}}
+    for session, actions_results in sorted(sessions.items()):
+        failed = any(error for error, elapsed in actions_results.values())
+        summary['sessions'][session] = {
+            'status': 'failed' if failed else 'ok',
+            'actions': {
+                action: {'error': error, 'elapsed': round(elapsed, 3)}
+                for action, (error, elapsed) in actions_results.items()}}
+    summary['num_sessions'] = len(summary['sessions'])
+    summary['num_failed'] = sum(
+        info['status'] != 'ok' for info in summary['sessions'].values())
+    summary['status'] = \
+        'failed' if summary['num_failed'] or not sessions else 'ok'
+    summary['elapsed'] = round(time.time() - begin_time, 3)
+    msg('Sessions: {} ({} failed)'.format(
+        summary['num_sessions'], summary['num_failed']))
+    if summary_filepath == '-':
+        print(json.dumps(summary, sort_keys=True))
+    elif summary_filepath:
+        summary_filepath = os.path.join(out_dirpath, summary_filepath)
+        if not os.path.isdir(os.path.dirname(summary_filepath)):
+            os.makedirs(os.path.dirname(summary_filepath))
+        msg('Summary: {}'.format(summary_filepath))
+        with open(summary_filepath, 'w') as summary_file:
+            json.dump(summary, summary_file, sort_keys=True, indent=4)
+    return summary
 
 
 # ======================================================================
@@ -167,9 +254,10 @@ def handle_arg():
         action='store_true',
         help='force new processing [%(default)s]')
     arg_parser.add_argument(
-        '-i', '--in_dirpath', metavar='DIR',
-        default='.',
-        help='set input directory [%(default)s]')
+        '-i', '--in_dirpaths', metavar='DIR|FILE',
+        nargs='+', default=['.'],
+        help='set input directories, glob patterns or list files '
+             '[%(default)s]')
     arg_parser.add_argument(
         '-o', '--out_dirpath', metavar='DIR',
         default='.',
@@ -202,9 +290,74 @@ def handle_arg():
         '-b', '--backup_subpath',
         default=utl.TPL['backup'],
         help='Template for the backup filename. Empty to skip [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--num_processes', metavar='NUM',
+        type=int, default=None,
+        help='set number of parallel processes. '
+             'If not set, use the configuration [%(default)s]')
+    arg_parser.add_argument(
+        '-u', '--summary_filepath', metavar='FILE',
+        default=SUMMARY_FILENAME,
+        help='set JSON summary file (`-` for stdout, empty to skip). '
+             'Relative to the output directory [%(default)s]')
+    arg_parser.add_argument(
+        '-x', '--trace_filepath', metavar='FILE',
+        default=profiling.TRACE_FILENAME,
+        help='set JSON lines stage trace file (empty to skip). '
+             'Relative to the output directory [%(default)s]')
+    arg_parser.add_argument(
+        '-g', '--chrome_trace_filepath', metavar='FILE',
+        default=None,
+        help='set Chrome trace-event file. '
+             'Relative to the output directory [%(default)s]')
+    arg_parser.add_argument(
+        '-k', '--catalogue_filepath', metavar='FILE',
+        default=None,
+        help='set catalogue file to skip already imported instances '
+             '(e.g. `{}`). If not set, the catalogue is not used. '
+             'Relative to the output directory [%(default)s]'.format(
+                 ctg.CATALOGUE_FILENAME))
+    arg_parser.add_argument(
+        '-a', '--streaming',
+        action='store_true',
+        help='stream the stages, overlapping I/O and CPU [%(default)s]')
+    arg_parser.add_argument(
+        '-c', '--config', metavar='FILE',
+        default=CFG_FILENAME,
+        help='specify configuration file name/path [%(default)s]')
     return arg_parser
 
 
+# ======================================================================
+def run(args):
+    """
+    Run the batch processing from the command-line arguments.
+
+    The `use_mp` and `num_processes` configuration settings are used,
+    unless the number of processes is explicitly set.
+
+    Args:
+        args (argparse.Namespace): The command-line arguments.
+
+    Returns:
+        exit_code (int): The exit code (non-zero if any session failed).
+    """
+    cfg, cfg_filepath = get_config(args.config)
+    num_processes = args.num_processes
+    if not num_processes:
+        num_processes = cfg['num_processes'] if cfg['use_mp'] else 1
+    summary = dcmpi_run_batch(
+        args.in_dirpaths, args.out_dirpath, args.subpath,
+        cfg['dcm_subpath'],
+        args.niz_subpath, args.meta_subpath, args.prot_subpath,
+        args.info_subpath, args.report_subpath, args.backup_subpath,
+        num_processes, args.summary_filepath or None,
+        args.trace_filepath or None, args.chrome_trace_filepath,
+        args.catalogue_filepath or None, args.streaming,
+        args.force, args.verbose)
+    return 0 if summary['status'] == 'ok' else 1
+
+
 # ======================================================================
 def main():
     """
@@ -220,16 +373,13 @@ def main():
     msg(__doc__.strip())
     begin_time = datetime.datetime.now()
 
-    dcmpi_cli(
-        args.in_dirpath, args.out_dirpath, args.subpath,
-        args.niz_subpath, args.meta_subpath, args.prot_subpath, args.info_subpath,
-        args.report_subpath, args.backup_subpath,
-        args.force, args.verbose)
+    exit_code = run(args)
 
     exec_time = datetime.datetime.now() - begin_time
     msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return exit_code
 
 
 # ======================================================================
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
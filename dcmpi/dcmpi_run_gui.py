@@ -1,227 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: DICOM preprocessing (Graphical User Interface).
+
+Note: this module requires `pytk` (and Tk), and it is only imported when
+the graphical interface is requested.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
 # ======================================================================
 # :: Python Standard Library Imports
 import os  # Miscellaneous operating system interfaces
-import sys  # System-specific parameters and functions
-import platform  # Access to underlying platform’s identifying data
-import datetime  # Basic date and time types
 import collections  # High-performance container datatypes
-import argparse  # Parser for command-line options, arguments and subcommands
 import multiprocessing  # Process-based parallelism
 import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
-import warnings  # Warning control
-
-# Python interface to Tcl/Tk
-try:
-    import tkinter as tk
-    import tkinter.ttk as ttk
-    import tkinter.messagebox as messagebox
-    import tkinter.filedialog as filedialog
-    import tkinter.simpledialog as simpledialog
-except ImportError:
-    import Tkinter as tk
-    import ttk
-    import tkMessageBox as messagebox
-    import tkFileDialog as filedialog
-    import tkSimpleDialog as simpledialog
 
 # :: External Imports
 import pytk
 
 # :: External Imports Submodules
-import pytk.widgets
+from pytk import messagebox
+from pytk import filedialog
+
 import pytk.util
+import pytk.widgets
 
 # :: Local Imports
+import dcmpi
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import PATH, INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 from dcmpi import MY_GREETINGS
 
-# ======================================================================
-# :: determine initial configuration
-try:
-    import appdirs
-
-    _app_dirs = appdirs.AppDirs(INFO['name'].lower(), INFO['author'])
-    PATHS = {
-        'usr_cfg': _app_dirs.user_config_dir,
-        'sys_cfg': _app_dirs.site_config_dir,
-    }
-except ImportError:
-    PATHS = {
-        'usr_cfg': os.path.realpath('.'),
-        'sys_cfg': os.path.dirname(__file__),
-    }
-
-CFG_FILENAME = os.path.splitext(os.path.basename(__file__))[0] + '.cfg.json'
-CFG_DIRPATHS = (
-    PATHS['usr_cfg'],
-    os.path.realpath('.'),
-    os.getenv('HOME'),
-    os.path.dirname(__file__),
-    PATHS['sys_cfg'])
+from dcmpi.dcmpi_run import (
+    ACTIONS, default_config, load_config, get_config, save_config,
+    dcmpi_run, )
 
 
 # ======================================================================
-def default_config():
-    """
-
-    Args:
-        cfg_filepath ():
-
-    Returns:
-
-    """
-    cfg = {
-        'add_path': os.path.realpath('.'),
-        'import_path': os.path.realpath('.'),
-        'export_path': os.path.realpath('.'),
-        'input_paths': [],
-        'output_path': os.path.realpath('.'),
-        'output_subpath': '{study}/{name}_{date}_{time}_{sys}',
-        'import_subpath': utl.ID['dicom'],
-        'niz_subpath': utl.ID['niz'],
-        'meta_subpath': utl.ID['meta'],
-        'prot_subpath': utl.ID['prot'],
-        'info_subpath': utl.ID['info'],
-        'report_template': utl.TPL['report'],
-        'backup_template': utl.TPL['backup'],
-        'force': False,
-        'verbose': D_VERB_LVL,
-        'use_mp': True,
-        'num_processes': multiprocessing.cpu_count(),
-        'gui_style_tk': 'default',
-        'save_on_exit': True,
-    }
-    return cfg
-
-
-# ======================================================================
-def load_config(
-        cfg_filepath=CFG_FILENAME):
-    """
-
-    Args:
-        cfg_filepath ():
-
-    Returns:
-
-    """
-    cfg = {}
-    if os.path.exists(cfg_filepath):
-        msg('Load configuration from `{}`.'.format(cfg_filepath))
-        try:
-            with open(cfg_filepath, 'r') as cfg_file:
-                cfg = json.load(cfg_file)
-        except json.JSONDecodeError:
-            pass
-    return cfg
-
-
-# ======================================================================
-def save_config(
-        config,
-        cfg_filepath=CFG_FILENAME):
-    """
-
-    Args:
-        config ():
-        cfg_filepath ():
-
-    Returns:
-
-    """
-    msg('Save configuration from `{}`.'.format(cfg_filepath))
-    dirpath = os.path.dirname(cfg_filepath)
-    if not os.path.isdir(dirpath):
-        os.makedirs(dirpath)
-    with open(cfg_filepath, 'w') as cfg_file:
-        json.dump(config, cfg_file, sort_keys=True, indent=4)
-
-
-# ======================================================================
-def dcmpi_run(
-        in_dirpath,
-        out_dirpath,
-        subpath=utl.TPL['acquire'],
-        import_subpath=utl.ID['dicom'],
-        niz_subpath=utl.ID['niz'],
-        meta_subpath=utl.ID['meta'],
-        prot_subpath=utl.ID['prot'],
-        info_subpath=utl.ID['info'],
-        report_template=utl.TPL['report'],
-        backup_template=utl.TPL['backup'],
-        force=False,
-        verbose=D_VERB_LVL):
-    """
-    Standard preprocessing of DICOM files.
-
-    Args:
-        in_dirpath (str): Path to input directory.
-        out_dirpath (str): Path to output directory.
-        subpath ():
-        niz_subpath ():
-        meta_subpath ():
-        prot_subpath ():
-        info_subpath ():
-        report_subpath ():
-        backup_subpath ():
-        force (bool): Force new processing.
-        verbose (int): Set level of verbosity.
-
-    Returns:
-        None.
-    """
-    from dcmpi.do_acquire_sources import do_acquire_sources
-    from dcmpi.do_sorting import sorting
-
-    subdirs = (
-        niz_subpath, meta_subpath, prot_subpath, info_subpath, report_template,
-        backup_template)
-    # import
-    dcm_dirpaths = do_acquire_sources(
-        in_dirpath, out_dirpath, 'copy', subpath, import_subpath,
-        force, verbose)
-    for dcm_dirpath in dcm_dirpaths:
-        base_dirpath = os.path.dirname(dcm_dirpath)
-        # sort
-        sorting(
-            dcm_dirpath, utl.D_SUMMARY + '.' + utl.EXT['json'],
-            force, verbose)
-        msg('Done: {}'.format(dcm_dirpath))
-
-
-# ======================================================================
-class About(tk.Toplevel):
+class About(pytk.Window):
     def __init__(self, parent):
-        self.win = tk.Toplevel.__init__(self, parent)
+        self.win = pytk.Window.__init__(self, parent)
         self.transient(parent)
         self.parent = parent
         self.title('About {}'.format(INFO['name']))
         self.resizable(False, False)
         self.frm = pytk.widgets.Frame(self)
-        self.frm.pack(fill=tk.BOTH, expand=True)
+        self.frm.pack(fill='both', expand=True)
         self.frmMain = pytk.widgets.Frame(self.frm)
-        self.frmMain.pack(fill=tk.BOTH, padx=1, pady=1, expand=True)
+        self.frmMain.pack(fill='both', padx=1, pady=1, expand=True)
 
         about_txt = '\n'.join((
             MY_GREETINGS[1:],
-            'DCMPI: DICOM Preprocess Interface',
-            __doc__,
+            dcmpi.__doc__,
             '{} - ver. {}\n{} {}\n{}'.format(
                 INFO['name'], INFO['version'],
                 INFO['copyright'], INFO['author'], INFO['notice'])
         ))
         msg(about_txt)
         self.lblInfo = pytk.widgets.Label(
-            self.frmMain, text=about_txt, anchor=tk.CENTER,
+            self.frmMain, text=about_txt, anchor='center',
             background='#333', foreground='#ccc', font='TkFixedFont')
         self.lblInfo.pack(padx=8, pady=8, ipadx=8, ipady=8)
 
         self.btnClose = pytk.widgets.Button(
             self.frmMain, text='Close', command=self.destroy)
-        self.btnClose.pack(side=tk.BOTTOM, padx=8, pady=8)
+        self.btnClose.pack(side='bottom', padx=8, pady=8)
         self.bind('<Return>', self.destroy)
         self.bind('<Escape>', self.destroy)
 
@@ -232,10 +81,10 @@ class About(tk.Toplevel):
 
 
 # ======================================================================
-class Settings(tk.Toplevel):
+class Settings(pytk.Window):
     def __init__(self, parent, app):
         self.settings = collections.OrderedDict((
-            ('use_mp', {'label': 'Use parallel processing', 'dtype': bool,}),
+            ('use_mp', {'label': 'Use parallel processing', 'dtype': bool, }),
             ('num_processes', {
                 'label': 'Number of parallel processes',
                 'dtype': int,
@@ -251,64 +100,63 @@ class Settings(tk.Toplevel):
             self.settings[name]['default'] = app.cfg[name]
         self.result = None
 
-        self.win = tk.Toplevel.__init__(self, parent)
+        self.win = pytk.Window.__init__(self, parent)
         self.transient(parent)
         self.parent = parent
         self.app = app
         self.title('{} Advanced Settings'.format(INFO['name']))
         self.frm = pytk.widgets.Frame(self)
-        self.frm.pack(fill=tk.BOTH, expand=True)
+        self.frm.pack(fill='both', expand=True)
         self.frmMain = pytk.widgets.Frame(self.frm)
-        self.frmMain.pack(fill=tk.BOTH, padx=8, pady=8, expand=True)
+        self.frmMain.pack(fill='both', padx=8, pady=8, expand=True)
 
         self.frmSpacers = []
 
         self.wdgOptions = {}
         for name, info in self.settings.items():
             if info['dtype'] == bool:
-                chk =pytk.widgets.Checkbutton(
-                    self.frmMain, text=info['label'])
-                chk.pack(fill=tk.X, padx=1, pady=1)
+                chk = pytk.widgets.Checkbox(self.frmMain, text=info['label'])
+                chk.pack(fill='x', padx=1, pady=1)
                 chk.set_val(info['default'])
                 self.wdgOptions[name] = {'chk': chk}
             elif info['dtype'] == int:
                 frm = pytk.widgets.Frame(self.frmMain)
-                frm.pack(fill=tk.X, padx=1, pady=1)
+                frm.pack(fill='x', padx=1, pady=1)
                 lbl = pytk.widgets.Label(frm, text=info['label'])
-                lbl.pack(side=tk.LEFT, fill=tk.X, padx=1, pady=1, expand=True)
+                lbl.pack(side='left', fill='x', padx=1, pady=1, expand=True)
                 spb = pytk.widgets.Spinbox(frm, **info['values'])
                 spb.set_val(info['default'])
                 spb.pack(
-                    side=tk.LEFT, fill=tk.X, anchor=tk.W, padx=1, pady=1)
+                    side='left', fill='x', anchor='w', padx=1, pady=1)
                 self.wdgOptions[name] = {'frm': frm, 'lbl': lbl, 'spb': spb}
             elif info['dtype'] == tuple:
                 frm = pytk.widgets.Frame(self.frmMain)
-                frm.pack(fill=tk.X, padx=1, pady=1)
+                frm.pack(fill='x', padx=1, pady=1)
                 lbl = pytk.widgets.Label(frm, text=info['label'])
-                lbl.pack(side=tk.LEFT, fill=tk.X, padx=1, pady=1, expand=True)
+                lbl.pack(side='left', fill='x', padx=1, pady=1, expand=True)
                 lst = pytk.widgets.Listbox(frm, values=info['values'])
                 lst.set_val(info['default'])
                 lst.pack(
-                    side=tk.LEFT, fill=tk.X, anchor=tk.W, padx=1, pady=1)
+                    side='left', fill='x', anchor='w', padx=1, pady=1)
                 self.wdgOptions[name] = {'frm': frm, 'lbl': lbl, 'lst': lst}
 
         self.frmButtons = pytk.widgets.Frame(self.frmMain)
-        self.frmButtons.pack(side=tk.BOTTOM, padx=4, pady=4)
+        self.frmButtons.pack(side='bottom', padx=4, pady=4)
         spacer = pytk.widgets.Frame(self.frmButtons)
-        spacer.pack(side=tk.LEFT, anchor='e', expand=True)
+        spacer.pack(side='left', anchor='e', expand=True)
         self.frmSpacers.append(spacer)
         self.btnOK = pytk.widgets.Button(
-            self.frmButtons, text='OK', compound=tk.LEFT,
+            self.frmButtons, text='OK', compound='left',
             command=self.ok)
-        self.btnOK.pack(side=tk.LEFT, padx=4, pady=4)
+        self.btnOK.pack(side='left', padx=4, pady=4)
         self.btnReset = pytk.widgets.Button(
-            self.frmButtons, text='Reset', compound=tk.LEFT,
+            self.frmButtons, text='Reset', compound='left',
             command=self.reset)
-        self.btnReset.pack(side=tk.LEFT, padx=4, pady=4)
+        self.btnReset.pack(side='left', padx=4, pady=4)
         self.btnCancel = pytk.widgets.Button(
-            self.frmButtons, text='Cancel', compound=tk.LEFT,
+            self.frmButtons, text='Cancel', compound='left',
             command=self.cancel)
-        self.btnCancel.pack(side=tk.LEFT, padx=4, pady=4)
+        self.btnCancel.pack(side='left', padx=4, pady=4)
         self.bind('<Return>', self.ok)
         self.bind('<Escape>', self.cancel)
 
@@ -359,25 +207,13 @@ class Settings(tk.Toplevel):
 
 
 # ======================================================================
-class MainGui(pytk.widgets.Frame):
+class Main(pytk.widgets.Frame):
     def __init__(self, parent, args):
-        super(MainGui, self).__init__()
         # get_val config data
-        cfg = {}
-        self.cfg = default_config()
-        for dirpath in CFG_DIRPATHS:
-            self.cfg_filepath = os.path.join(dirpath, args.config)
-            cfg = load_config(self.cfg_filepath)
-            if cfg:
-                break
-        if cfg:
-            self.cfg.update(cfg)
-        else:
-            self.cfg_filepath = os.path.join(
-                PATHS['usr_cfg'], CFG_FILENAME)
+        self.cfg, self.cfg_filepath = get_config(args.config)
 
         self.modules = collections.OrderedDict([
-            ('import_subpath', {'label': 'DICOM'}),
+            ('dcm_subpath', {'label': 'DICOM (required)'}),
             ('niz_subpath', {'label': 'NIfTI Image'}),
             ('meta_subpath', {'label': 'Metadata'}),
             ('prot_subpath', {'label': 'Protocol'}),
@@ -406,157 +242,158 @@ class MainGui(pytk.widgets.Frame):
         self.style = pytk.Style()
         # print(self.style.theme_names())
         self.style.theme_use(self.cfg['gui_style_tk'])
-        self.pack(fill=tk.BOTH, expand=True)
+        self.pack(fill='both', expand=True)
 
         self._make_menu()
 
         # :: define UI items
         self.frmMain = pytk.widgets.Frame(self)
-        self.frmMain.pack(fill=tk.BOTH, padx=8, pady=8, expand=True)
+        self.frmMain.pack(fill='both', padx=8, pady=8, expand=True)
         self.frmSpacers = []
 
         # left frame
         self.frmLeft = pytk.widgets.Frame(self.frmMain)
         self.frmLeft.pack(
-            side=tk.LEFT, fill=tk.BOTH, padx=4, pady=4, expand=True)
+            side='left', fill='both', padx=4, pady=4, expand=True)
 
         self.frmInput = pytk.widgets.Frame(self.frmLeft)
         self.frmInput.pack(
-            side=tk.TOP, fill=tk.BOTH, padx=4, pady=4, expand=True)
+            side='top', fill='both', padx=4, pady=4, expand=True)
         self.lblInput = pytk.widgets.Label(self.frmInput, text='Input')
         self.lblInput.pack(padx=1, pady=1)
         self.lsvInput = pytk.widgets.Listview(
             self.frmInput, show='tree', height=4)
         self.lsvInput.bind('<Double-Button-1>', self.actionAdd)
-        self.lsvInput.pack(fill=tk.BOTH, padx=1, pady=1, expand=True)
+        self.lsvInput.pack(fill='both', padx=1, pady=1, expand=True)
         self.btnImport = pytk.widgets.Button(
-            self.frmInput, text='Import', compound=tk.LEFT,
+            self.frmInput, text='Import', compound='left',
             command=self.actionImport)
-        self.btnImport.pack(side=tk.LEFT, padx=4, pady=4)
+        self.btnImport.pack(side='left', padx=4, pady=4)
         self.btnExport = pytk.widgets.Button(
-            self.frmInput, text='Export', compound=tk.LEFT,
+            self.frmInput, text='Export', compound='left',
             command=self.actionExport)
-        self.btnExport.pack(side=tk.LEFT, padx=4, pady=4)
+        self.btnExport.pack(side='left', padx=4, pady=4)
         spacer = pytk.widgets.Frame(self.frmInput)
-        spacer.pack(side=tk.LEFT, anchor='e', expand=True)
+        spacer.pack(side='left', anchor='e', expand=True)
         self.frmSpacers.append(spacer)
         self.btnAdd = pytk.widgets.Button(
-            self.frmInput, text='Add', compound=tk.LEFT,
+            self.frmInput, text='Add', compound='left',
             command=self.actionAdd)
-        self.btnAdd.pack(side=tk.LEFT, anchor='e', padx=4, pady=4)
+        self.btnAdd.pack(side='left', anchor='e', padx=4, pady=4)
         self.btnRemove = pytk.widgets.Button(
-            self.frmInput, text='Remove', compound=tk.LEFT,
+            self.frmInput, text='Remove', compound='left',
             command=self.actionRemove)
-        self.btnRemove.pack(side=tk.LEFT, anchor='e', padx=4, pady=4)
+        self.btnRemove.pack(side='left', anchor='e', padx=4, pady=4)
         self.btnClear = pytk.widgets.Button(
-            self.frmInput, text='Clear', compound=tk.LEFT,
+            self.frmInput, text='Clear', compound='left',
             command=self.actionClear)
-        self.btnClear.pack(side=tk.LEFT, anchor='e', padx=4, pady=4)
+        self.btnClear.pack(side='left', anchor='e', padx=4, pady=4)
 
         self.frmOutput = pytk.widgets.Frame(self.frmLeft)
-        self.frmOutput.pack(fill=tk.X, padx=4, pady=4)
+        self.frmOutput.pack(fill='x', padx=4, pady=4)
         self.lblOutput = pytk.widgets.Label(self.frmOutput, text='Output')
-        self.lblOutput.pack(side=tk.TOP, padx=1, pady=1)
+        self.lblOutput.pack(side='top', padx=1, pady=1)
 
         self.frmPath = pytk.widgets.Frame(self.frmOutput)
-        self.frmPath.pack(fill=tk.X, expand=True)
+        self.frmPath.pack(fill='x', expand=True)
         self.lblPath = pytk.widgets.Label(self.frmPath, text='Path', width=8)
-        self.lblPath.pack(side=tk.LEFT, fill=tk.X, padx=1, pady=1)
-        self.entPath = pytk.widgets.Entry(self.frmPath)
-        self.entPath.insert(0, self.cfg['output_path'])
-        self.entPath.bind('<Double-Button>', self.actionPath)
-        self.entPath.pack(
-            side=tk.LEFT, fill=tk.X, padx=1, pady=1, expand=True)
+        self.lblPath.pack(side='left', fill='x', padx=1, pady=1)
+        self.txtPath = pytk.widgets.Text(self.frmPath)
+        self.txtPath.insert(0, self.cfg['output_path'])
+        self.txtPath.bind('<Double-Button>', self.actionPath)
+        self.txtPath.pack(
+            side='left', fill='x', padx=1, pady=1, expand=True)
 
         self.frmSubpath = pytk.widgets.Frame(self.frmOutput)
-        self.frmSubpath.pack(fill=tk.X, expand=True)
-        self.lblSubpath = pytk.widgets.Label(self.frmSubpath, text='Sub-Path', width=8)
-        self.lblSubpath.pack(side=tk.LEFT, fill=tk.X, padx=1, pady=1)
-        self.entSubpath = pytk.widgets.Entry(self.frmSubpath)
-        self.entSubpath.insert(0, self.cfg['output_subpath'])
-        self.entSubpath.pack(
-            side=tk.LEFT, fill=tk.X, padx=1, pady=1, expand=True)
+        self.frmSubpath.pack(fill='x', expand=True)
+        self.lblSubpath = pytk.widgets.Label(self.frmSubpath, text='Sub-Path',
+            width=8)
+        self.lblSubpath.pack(side='left', fill='x', padx=1, pady=1)
+        self.txtSubpath = pytk.widgets.Text(self.frmSubpath)
+        self.txtSubpath.insert(0, self.cfg['output_subpath'])
+        self.txtSubpath.pack(
+            side='left', fill='x', padx=1, pady=1, expand=True)
 
         # right frame
         self.frmRight = pytk.widgets.Frame(self.frmMain)
-        self.frmRight.pack(side=tk.RIGHT, fill=tk.BOTH, padx=4, pady=4)
+        self.frmRight.pack(side='right', fill='both', padx=4, pady=4)
 
         self.lblActions = pytk.widgets.Label(
             self.frmRight, text='Sub-Paths and Templates')
         self.lblActions.pack(padx=1, pady=1)
-        self.wdgModules = {}
+        self.wdgModules = collections.OrderedDict()
         for name, info in self.modules.items():
             frm = pytk.widgets.Frame(self.frmRight)
-            frm.pack(fill=tk.X, padx=1, pady=1)
+            frm.pack(fill='x', padx=1, pady=1)
             if 'subpath' in name:
-                chk = pytk.widgets.Checkbutton(frm, text=info['label'])
+                chk = pytk.widgets.Checkbox(frm, text=info['label'])
                 chk.pack(
-                    side=tk.LEFT, fill=tk.X, padx=1, pady=1, expand=True)
+                    side='left', fill='x', padx=1, pady=1, expand=True)
                 chk.config(command=self.activateModules)
-                entry = pytk.widgets.Entry(frm, width=8)
-                entry.pack(side=tk.RIGHT, fill=tk.X, padx=1, pady=1)
+                entry = pytk.widgets.Text(frm, width=8)
+                entry.pack(side='right', fill='x', padx=1, pady=1)
             elif 'template' in name:
-                chk = pytk.widgets.Checkbutton(frm, text=info['label'])
-                chk.pack(fill=tk.X, padx=1, pady=1, expand=True)
+                chk = pytk.widgets.Checkbox(frm, text=info['label'])
+                chk.pack(fill='x', padx=1, pady=1, expand=True)
                 # chk.set_val(info['default'])
                 chk.config(command=self.activateModules)
-                entry = pytk.widgets.Entry(frm, width=24)
-                entry.pack(fill=tk.X, padx=1, pady=1, expand=True)
+                entry = pytk.widgets.Text(frm, width=24)
+                entry.pack(fill='x', padx=1, pady=1, expand=True)
             else:
-                chk = pytk.widgets.Checkbutton(frm, text=info['label'])
-                chk.pack(fill=tk.X, padx=1, pady=1, expand=True)
+                chk = pytk.widgets.Checkbox(frm, text=info['label'])
+                chk.pack(fill='x', padx=1, pady=1, expand=True)
                 chk.config(command=self.activateModules)
                 entry = None
             self.wdgModules[name] = {
                 'frm': frm, 'chk': chk, 'ent': entry}
+        # self.wdgModules['dcm_subpath']['chk']['state'] = 'readonly'
         self.activateModules()
 
         spacer = pytk.widgets.Frame(self.frmRight)
-        spacer.pack(side=tk.TOP, padx=4, pady=4)
+        spacer.pack(side='top', padx=4, pady=4)
         self.frmSpacers.append(spacer)
         self.lblOptions = pytk.widgets.Label(self.frmRight, text='Options')
         self.lblOptions.pack(padx=1, pady=1)
         self.wdgOptions = {}
         for name, info in self.options.items():
             if info['dtype'] == bool:
-                chk = pytk.widgets.Checkbutton(
-                    self.frmRight, text=info['label'])
-                chk.pack(fill=tk.X, padx=1, pady=1)
+                chk = pytk.widgets.Checkbox(self.frmRight, text=info['label'])
+                chk.pack(fill='x', padx=1, pady=1)
                 self.wdgOptions[name] = {'chk': chk}
             elif info['dtype'] == int:
                 frm = pytk.widgets.Frame(self.frmRight)
-                frm.pack(fill=tk.X, padx=1, pady=1)
+                frm.pack(fill='x', padx=1, pady=1)
                 lbl = pytk.widgets.Label(frm, text=info['label'])
-                lbl.pack(side=tk.LEFT, fill=tk.X, padx=1, pady=1)
+                lbl.pack(side='left', fill='x', padx=1, pady=1)
                 spb = pytk.widgets.Spinbox(frm, **info['values'])
                 spb.pack(
-                    side=tk.LEFT, fill=tk.X, anchor=tk.W, padx=1, pady=1)
+                    side='left', fill='x', anchor='w', padx=1, pady=1)
                 self.wdgOptions[name] = {'frm': frm, 'lbl': lbl, 'spb': spb}
             elif info['dtype'] == str:
                 pass
 
-        # spacer = pytk.widgets.Frame(self.frmRight)
-        # spacer.pack(side=tk.TOP, padx=4, pady=4)
-        # self.frmSpacers.append(spacer)
-        # self.pbrRunning = pytk.widgets.Progressbar(self.frmRight)
-        # self.pbrRunning.pack(side=tk.TOP, fill=tk.X, expand=True)
+        spacer = pytk.widgets.Frame(self.frmRight)
+        spacer.pack(side='top', padx=4, pady=4)
+        self.frmSpacers.append(spacer)
+        self.pbrRunning = pytk.widgets.Progressbar(self.frmRight)
+        self.pbrRunning.pack(side='top', fill='x', expand=True)
 
         spacer = pytk.widgets.Frame(self.frmRight)
-        spacer.pack(side=tk.TOP, padx=4, pady=4)
+        spacer.pack(side='top', padx=4, pady=4)
         self.frmSpacers.append(spacer)
         self.frmButtons = pytk.widgets.Frame(self.frmRight)
-        self.frmButtons.pack(side=tk.BOTTOM, padx=4, pady=4)
+        self.frmButtons.pack(side='bottom', padx=4, pady=4)
         spacer = pytk.widgets.Frame(self.frmButtons)
-        spacer.pack(side=tk.LEFT, anchor='e', expand=True)
+        spacer.pack(side='left', anchor='e', expand=True)
         self.frmSpacers.append(spacer)
         self.btnRun = pytk.widgets.Button(
-            self.frmButtons, text='Run', compound=tk.LEFT,
+            self.frmButtons, text='Run', compound='left',
             command=self.actionRun)
-        self.btnRun.pack(side=tk.LEFT, padx=4, pady=4)
+        self.btnRun.pack(side='left', padx=4, pady=4)
         self.btnExit = pytk.widgets.Button(
-            self.frmButtons, text='Exit', compound=tk.LEFT,
+            self.frmButtons, text='Exit', compound='left',
             command=self.actionExit)
-        self.btnExit.pack(side=tk.LEFT, padx=4, pady=4)
+        self.btnExit.pack(side='left', padx=4, pady=4)
 
         pytk.util.center(self.parent)
 
@@ -568,8 +405,8 @@ class MainGui(pytk.widgets.Frame):
         cfg = self.cfg
         cfg.update({
             'input_paths': self.lsvInput.get_items(),
-            'output_path': self.entPath.get(),
-            'output_subpath': self.entSubpath.get(),
+            'output_path': self.txtPath.get(),
+            'output_subpath': self.txtSubpath.get(),
             'save_on_exit': bool(self.save_on_exit.get()),
             'gui_style_tk': self.style.theme_use()
         })
@@ -586,8 +423,8 @@ class MainGui(pytk.widgets.Frame):
         """Update the config information to the UI."""
         for target in self.cfg['input_paths']:
             self.lsvInput.add_item(target, unique=True)
-        self.entPath.set_val(self.cfg['output_path'])
-        self.entSubpath.set_val(self.cfg['output_subpath'])
+        self.txtPath.set_val(self.cfg['output_path'])
+        self.txtSubpath.set_val(self.cfg['output_subpath'])
         self.save_on_exit.set(self.cfg['save_on_exit'])
         self.style.theme_use(self.cfg['gui_style_tk'])
         for name, items in self.wdgModules.items():
@@ -601,13 +438,14 @@ class MainGui(pytk.widgets.Frame):
         self.activateModules()
 
     def _make_menu(self):
-        self.save_on_exit = tk.BooleanVar(value=self.cfg['save_on_exit'])
+        self.save_on_exit = pytk.util.tk.BooleanVar(
+            value=self.cfg['save_on_exit'])
 
-        self.mnuMain = tk.Menu(self.parent, tearoff=False)
+        self.mnuMain = pytk.widgets.Menu(self.parent, tearoff=False)
         self.parent.config(menu=self.mnuMain)
-        self.mnuFile = tk.Menu(self.mnuMain, tearoff=False)
+        self.mnuFile = pytk.widgets.Menu(self.mnuMain, tearoff=False)
         self.mnuMain.add_cascade(label='File', menu=self.mnuFile)
-        self.mnuFileInput = tk.Menu(self.mnuFile, tearoff=False)
+        self.mnuFileInput = pytk.widgets.Menu(self.mnuFile, tearoff=False)
         self.mnuFile.add_cascade(label='Input', menu=self.mnuFileInput)
         self.mnuFileInput.add_command(label='Add...', command=self.actionAdd)
         self.mnuFileInput.add_command(
@@ -619,7 +457,7 @@ class MainGui(pytk.widgets.Frame):
             label='Import...', command=self.actionImport)
         self.mnuFileInput.add_command(
             label='Export...', command=self.actionExport)
-        self.mnuFileOutput = tk.Menu(self.mnuFile, tearoff=False)
+        self.mnuFileOutput = pytk.widgets.Menu(self.mnuFile, tearoff=False)
         self.mnuFile.add_cascade(label='Output', menu=self.mnuFileOutput)
         self.mnuFileOutput.add_command(
             label='Path...', command=self.actionPath)
@@ -627,7 +465,7 @@ class MainGui(pytk.widgets.Frame):
         self.mnuFile.add_command(label='Run', command=self.actionRun)
         self.mnuFile.add_separator()
         self.mnuFile.add_command(label='Exit', command=self.actionExit)
-        self.mnuSettings = tk.Menu(self.mnuMain, tearoff=False)
+        self.mnuSettings = pytk.widgets.Menu(self.mnuMain, tearoff=False)
         self.mnuMain.add_cascade(label='Settings', menu=self.mnuSettings)
         self.mnuSettings.add_command(
             label='Advanced', command=self.actionAdvancedSettings)
@@ -641,45 +479,45 @@ class MainGui(pytk.widgets.Frame):
             label='Save on Exit', variable=self.save_on_exit)
         self.mnuSettings.add_command(
             label='Reset Defaults', command=self.actionResetDefaults)
-        self.mnuHelp = tk.Menu(self.mnuMain, tearoff=False)
+        self.mnuHelp = pytk.widgets.Menu(self.mnuMain, tearoff=False)
         self.mnuMain.add_cascade(label='Help', menu=self.mnuHelp)
         self.mnuHelp.add_command(label='About', command=self.actionAbout)
 
     def actionRun(self, event=None):
         """Action on Click Button Run."""
+
+        def _name_to_tag(text):
+            for ending in ('_subpath', '_template'):
+                if text.endswith(ending):
+                    text = text[:-len(ending)]
+            return text
+
         # TODO: redirect stdout to some log box / use progressbar
         # extract options
         force = self.wdgOptions['force']['chk'].get_val()
         msg('Force: {}'.format(force))
         verbose = VERB_LVL[self.wdgOptions['verbose']['spb'].get_val()]
         msg('Verb.: {}'.format(verbose))
-        if self.cfg['use_mp']:
-            # parallel
-            pool = multiprocessing.Pool(processes=self.cfg['num_processes'])
-            proc_result_list = []
-        for in_dirpath in self.lsvInput.get_items():
-            kws = {
-                name: info['ent'].get_val()
-                for name, info in self.wdgModules.items()}
-            kws.update({
-                'in_dirpath': in_dirpath,
-                'out_dirpath': os.path.expanduser(self.entPath.get()),
-                'subpath': self.entSubpath.get(),
-                'force': force,
-                'verbose': verbose,
-            })
-            # print(kws)
-            if self.cfg['use_mp']:
-                proc_result = pool.apply_async(
-                    dcmpi_run, kwds=kws)
-                proc_result_list.append(proc_result)
-            else:
-                dcmpi_run(**kws)
-        # print(proc_result_list)
-        if self.cfg['use_mp']:
-            res_list = []
-            for proc_result in proc_result_list:
-                res_list.append(proc_result.get())
+        in_dirpaths = self.lsvInput.get_items()
+        kws = {
+            name: info['ent'].get_val()
+            for name, info in self.wdgModules.items()}
+        triggered = collections.OrderedDict(
+            [(_name_to_tag(name), ACTIONS[_name_to_tag(name)])
+             for name, info in self.wdgModules.items()
+             if info['chk'].get_val() and _name_to_tag(name) in ACTIONS])
+        kws.update({
+            'in_dirpath': in_dirpaths,
+            'out_dirpath': os.path.expanduser(self.txtPath.get()),
+            'subpath': self.txtSubpath.get(),
+            'actions': triggered,
+            # : all sessions share the same process budget
+            'num_processes':
+                self.cfg['num_processes'] if self.cfg['use_mp'] else 1,
+            'force': force,
+            'verbose': verbose,
+        })
+        dcmpi_run(**kws)
         return
 
     def actionImport(self, event=None):
@@ -735,6 +573,11 @@ class MainGui(pytk.widgets.Frame):
         if target:
             self.lsvInput.add_item(target, unique=True)
             self.cfg['add_path'] = target
+            # : adding multiple files
+            # for subdir in os.listdir(target):
+            #     tmp = os.path.join(target, subdir)
+            #     self.lsvInput.add_item(tmp, unique=True)
+            # self.cfg['add_path'] = target
         return target
 
     def actionRemove(self, event=None):
@@ -760,7 +603,7 @@ class MainGui(pytk.widgets.Frame):
             parent=self, title=title, initialdir=self.cfg['output_path'],
             mustexist=True)
         if target:
-            self.entPath.set_val(target)
+            self.txtPath.set_val(target)
         return target
 
     def activateModules(self, event=None):
@@ -805,7 +648,13 @@ class MainGui(pytk.widgets.Frame):
 
 
 # ======================================================================
-def dcmpi_run_gui(*_args, **_kws):
-    root = tk.Tk()
-    app = MainGui(root, *_args, **_kws)
+def run(*_args, **_kws):
+    root = pytk.tk.Tk()
+    app = Main(root, *_args, **_kws)
+    pytk.util.set_icon(root, 'icon', PATH['resources'])
     root.mainloop()
+
+
+# ======================================================================
+if __name__ == '__main__':
+    msg(__doc__.strip())
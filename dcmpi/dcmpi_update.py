@@ -14,21 +14,206 @@ from __future__ import unicode_literals
 # ======================================================================
 # :: Python Standard Library Imports
 import os  # Miscellaneous operating system interfaces
+import sys  # System-specific parameters and functions
 import shutil  # High-level file operations
 import datetime  # Basic date and time types
 import argparse  # Parser for command-line options, arguments and sub-commands
+import functools  # Higher-order functions and operations on callable objects
+import multiprocessing  # Process-based parallelism
+import collections  # High-performance container datatypes
+import io  # Core tools for working with streams
+import mmap  # Memory-mapped file support
 import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 
 # :: External Imports
-import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+# import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 
 # :: External Imports Submodules
 
 # :: Local Imports
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+pydcm = lazy_import('pydicom')  # PyDicom (Read, modify and write DICOM files.)
+
+
+# ======================================================================
+# value representations where trailing padding is not significant
+PAD_VR = {
+    'AE': b' ', 'AS': b' ', 'CS': b' ', 'DA': b' ', 'DS': b' ', 'DT': b' ',
+    'IS': b' ', 'LO': b' ', 'LT': b' ', 'PN': b' ', 'SH': b' ', 'ST': b' ',
+    'TM': b' ', 'UC': b' ', 'UT': b' ', 'UI': b'\0'}
+
+
+# ======================================================================
+def _get_patch(dcm, raw_elem, value):
+    """
+    Encode a new value for a raw element, if it fits in place.
+
+    Args:
+        dcm (pydicom.Dataset): The DICOM header.
+        raw_elem (pydicom.dataelem.RawDataElement): The raw element.
+            Must be obtained from the header before any value access.
+        value (str): The new value.
+
+    Returns:
+        result (tuple|None): The tuple
+            (offset, data) where:
+             - offset (int): The position of the value in the file.
+             - data (bytes): The encoded (and padded) value.
+            If None, the encoded value does not fit the existing length.
+    """
+    if not isinstance(raw_elem, pydcm.dataelem.RawDataElement) \
+            or raw_elem.value_tell is None \
+            or raw_elem.length == 0xFFFFFFFF:
+        return None
+    vr = raw_elem.VR or pydcm.datadict.dictionary_VR(raw_elem.tag)
+    if vr not in PAD_VR:
+        return None
+    fp = pydcm.filebase.DicomBytesIO()
+    fp.is_little_endian = raw_elem.is_little_endian
+    fp.is_implicit_VR = raw_elem.is_implicit_VR
+    pydcm.filewriter.write_data_element(
+        fp, pydcm.dataelem.DataElement(raw_elem.tag, vr, value),
+        dcm._character_set)
+    header_size = 12 if not raw_elem.is_implicit_VR \
+        and vr in pydcm.valuerep.EXPLICIT_VR_LENGTH_32 else 8
+    data = fp.getvalue()[header_size:]
+    if len(data) > raw_elem.length:
+        return None
+    return \
+        raw_elem.value_tell, data.ljust(raw_elem.length, PAD_VR[vr])
+
+
+# ======================================================================
+def update_file(
+        filepath,
+        dcm_info,
+        backup_prefix=None,
+        dry=False):
+    """
+    Modify selected DICOM fields of a single (possibly compressed) file.
+
+    Only the header is parsed.
+    If the file is not compressed, no backup is requested and all the new
+    encoded values fit the existing lengths (once padded), the values are
+    overwritten in place through a memory map, leaving the rest of the file
+    untouched.
+    Otherwise, the header is re-encoded: the pixel data (and anything
+    following it) is copied through as raw bytes, without decoding.
+    Compressed files are decompressed and re-compressed in-process.
+    The file is written to a temporary file and then renamed.
+
+    Args:
+        filepath (str): Path to the file.
+        dcm_info (dict): The DICOM fields to update.
+            Fields not present in the file are ignored.
+        backup_prefix (str|None): Prefix to use for backup files.
+            The original file is kept (hard-linked, if possible) with this
+            prefix. If None, no backup is kept.
+        dry (bool): Only compute the changes, without modifying the file.
+
+    Returns:
+        changes (dict|None): The DICOM field -> (old value, new value).
+            If None, the file is not a valid DICOM.
+
+    Raises:
+        Exception: If the file could not be updated (e.g. I/O or encoding
+            errors). The file is left untouched.
+    """
+    is_dicom, compression = utl.probe_dicom(filepath)
+    if not is_dicom:
+        return None
+    basepath, filename = os.path.split(filepath)
+    tmp_filepath = os.path.join(basepath, '.' + filename + '.part')
+    try:
+        if compression:
+            # : compressed streams are read in memory (for seeking)
+            with utl.open_compressed(filepath, 'rb', compression) as in_file:
+                src = io.BytesIO(in_file.read())
+        else:
+            src = open(filepath, 'rb')
+        with src:
+            dcm, offset = utl.read_dicom_header(src)
+            if dcm.file_meta.get('TransferSyntaxUID') == \
+                    pydcm.uid.DeflatedExplicitVRLittleEndian:
+                # : deflated datasets cannot be copied through
+                src.seek(0)
+                dcm, offset = pydcm.read_file(src), None
+            changes = {}
+            # : raw elements must be retrieved before accessing their values
+            raw_elems = {
+                key: dcm.get_item(pydcm.datadict.tag_for_keyword(key))
+                for key in dcm_info if key in dcm}
+            for key, val in dcm_info.items():
+                if key in dcm:
+                    old_val, new_val = str(dcm.data_element(key).value), \
+                        str(val)
+                    if old_val != new_val:
+                        changes[key] = (old_val, new_val)
+            if dry or not changes:
+                return changes
+            if not compression and offset is not None and not backup_prefix:
+                patches = [
+                    _get_patch(dcm, raw_elems[key], new_val)
+                    for key, (old_val, new_val) in changes.items()]
+                if all(patches):
+                    with open(filepath, 'r+b') as out_file:
+                        mm = mmap.mmap(out_file.fileno(), 0)
+                        try:
+                            for pos, data in patches:
+                                mm[pos:pos + len(data)] = data
+                            mm.flush()
+                        finally:
+                            mm.close()
+                    return changes
+            for key, (old_val, new_val) in changes.items():
+                setattr(dcm, key, new_val)
+            buffer = io.BytesIO()
+            dcm.save_as(buffer, write_like_original=True)
+            with utl.open_compressed(
+                    tmp_filepath, 'wb', compression) as out_file:
+                out_file.write(buffer.getvalue())
+                if offset is not None:
+                    src.seek(offset)
+                    shutil.copyfileobj(src, out_file, 1024 * 1024)
+    except Exception:
+        if os.path.isfile(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+    if backup_prefix:
+        backup_filepath = os.path.join(basepath, backup_prefix + filename)
+        try:
+            os.link(filepath, backup_filepath)
+        except OSError:
+            shutil.copy2(filepath, backup_filepath)
+    os.rename(tmp_filepath, filepath)
+    return changes
+
+
+# ======================================================================
+def _update_file(filepath, **_kws):
+    """
+    Modify a single file, catching the errors (for pools).
+
+    Args:
+        filepath (str): Path to the file.
+        **_kws: Keyword arguments passed to `update_file()`.
+
+    Returns:
+        result (tuple): The tuple
+            (changes, error) where:
+             - changes (dict|None): See `update_file()` for more details.
+             - error (str|None): The error, if the update failed.
+    """
+    try:
+        return update_file(filepath, **_kws), None
+    except Exception as e:
+        return None, '{}: {}'.format(type(e).__name__, e)
 
 
 # ======================================================================
@@ -36,99 +221,93 @@ def dcmpi_update(
         dirpath,
         dcm_info=None,
         backup_prefix='~',
+        num_processes=None,
+        dry=False,
         verbose=D_VERB_LVL):
     """
     Modify selected DICOM fields of files within a directory.
 
+    The files are processed in parallel, and only their headers are parsed
+    (see `update_file()` for more details).
+
     Args:
         dirpath (str): Path to input directory.
         dcm_info (str): JSON encoded dictionary of DICOM fields to update.
             If None, DICOM files are left untouched.
         backup_prefix (str): Prefix to use for backup files.
+            Files starting with this prefix are not updated.
+        num_processes (int|None): The number of parallel processes.
+            If None, uses the number of available CPUs.
+        dry (bool): Only report the fields that would change.
         verbose (int): Set level of verbosity.
 
     Returns:
-        None.
+        result (tuple): The tuple
+            (changes, failed) where:
+             - changes (dict): The file path -> the changes of the DICOM
+               fields. Files that are not valid DICOMs (or that could not
+               be updated) are not included.
+             - failed (dict): The file path -> the error, for the files that
+               could not be updated.
 
     See Also:
-        utl.is_dicom, utl.is_compressed_dicom
+        utl.probe_dicom, utl.read_dicom_header
     """
 
     def get_filepaths(path):
         for root, dirs, files in os.walk(path):  # no need to sort
             for name in files:
-                yield os.path.join(root, name)
+                if not backup_prefix or not name.startswith(backup_prefix):
+                    yield os.path.join(root, name)
 
     msg(':: Updating DICOMs...')
     msg('Path: {}'.format(os.path.realpath(dirpath)),
         verbose, VERB_LVL['low'])
 
+    all_changes = {}
+    failed = {}
     if os.path.exists(dirpath) and dcm_info:
         # load DICOM field to update
         dcm_info = json.loads(dcm_info)
         # :: analyze directory tree
-        for filepath in get_filepaths(dirpath):
-            basepath, filename = os.path.split(filepath)
-            msg('Analyzing `{}`...'.format(filepath),
-                verbose, VERB_LVL['debug'])
-            if backup_prefix:
-                backup_filepath = os.path.join(
-                    basepath, backup_prefix + filename)
-                shutil.copy(filepath, backup_filepath)
-                msg('Backup `{}`'.format(backup_filepath),
-                    verbose, VERB_LVL['medium'])
-            is_dicom = utl.is_dicom(
-                filepath,
-                allow_dir=False,
-                allow_report=True,
-                allow_postprocess=True)
-            if not is_dicom:
-                is_compressed, compression = utl.is_compressed_dicom(
-                    filepath,
-                    allow_dir=False,
-                    allow_report=True,
-                    allow_postprocess=True)
-            else:
-                is_compressed = False
-                compression = None
-            if is_dicom or is_compressed and compression in utl.COMPRESSIONS:
-                if is_compressed and compression in utl.COMPRESSIONS:
-                    dcm_filepath = os.path.splitext(filepath)[0]
-                    cmd = utl.COMPRESSIONS[compression]['bwd'] + ' {}'.format(
-                        filepath)
-                    utl.execute(cmd)
-                    msg('Uncompressing: `{}`'.format(dcm_filepath),
-                        verbose, VERB_LVL['high'])
-                else:
-                    dcm_filepath = filepath
-                try:
-                    dcm = pydcm.read_file(dcm_filepath)
-                    for key, val in dcm_info.items():
-                        if key in dcm:
-                            setattr(dcm, key, str(val))
-                        else:
-                            msg('W: DICOM attr: `` not found.',
-                                verbose, VERB_LVL['medium'])
-                    dcm.save_as(dcm_filepath)
-                except Exception as e:
-                    print(e)
-                    msg('E: Could not open DICOM: {}.'.format(dcm_filepath))
-                finally:
-                    if is_compressed and compression in utl.COMPRESSIONS:
-                        cmd = utl.COMPRESSIONS[compression]['fwd'] + \
-                              ' {}'.format(dcm_filepath)
-                        utl.execute(cmd)
-                        msg('Compressing: `{}`'.format(filepath),
-                            verbose, VERB_LVL['high'])
-                    if dcm_filepath != filepath and \
-                            os.path.isfile(dcm_filepath):
-                        os.remove(dcm_filepath)
-            else:
+        filepaths = list(get_filepaths(dirpath))
+        worker = functools.partial(
+            _update_file, dcm_info=dcm_info, backup_prefix=backup_prefix,
+            dry=dry)
+        pool = multiprocessing.Pool(num_processes)
+        results = pool.imap(worker, filepaths, chunksize=16)
+        counts = collections.Counter()
+        for filepath, (changes, error) in zip(filepaths, results):
+            if error:
+                failed[filepath] = error
+                msg('E: Could not update `{}`: {}'.format(filepath, error),
+                    verbose, VERB_LVL['low'])
+                continue
+            elif changes is None:
                 subpath = filepath[len(dirpath):]
                 msg('W: Invalid source found `{}`'.format(subpath),
                     verbose, VERB_LVL['medium'])
+                continue
+            all_changes[filepath] = changes
+            counts.update(changes.keys())
+            for key, (old_val, new_val) in sorted(changes.items()):
+                msg('{} `{}`: {}: `{}` -> `{}`'.format(
+                    'Would update' if dry else 'Update', filepath,
+                    key, old_val, new_val),
+                    verbose, VERB_LVL['high'])
+        pool.close()
+        pool.join()
+        msg('{}: {} / {} DICOMs ({})'.format(
+            'Would update' if dry else 'Updated',
+            sum(bool(changes) for changes in all_changes.values()),
+            len(all_changes),
+            ', '.join('{}: {}'.format(key, val)
+                      for key, val in sorted(counts.items())) or '-'))
+        if failed:
+            msg('E: Failed: {} DICOMs'.format(len(failed)))
     else:
         msg('W: Input path does NOT exists.', verbose, VERB_LVL['low'])
+    return all_changes, failed
 
 
 # ======================================================================
@@ -168,6 +347,14 @@ def handle_arg():
         '-b', '--backup_prefix',
         default=None,
         help='set prefix to be prepended to backup files [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--num_processes', metavar='NUM',
+        type=int, default=None,
+        help='set number of parallel processes [%(default)s]')
+    arg_parser.add_argument(
+        '-y', '--dry',
+        action='store_true',
+        help='only report the fields that would change [%(default)s]')
     return arg_parser
 
 
@@ -186,13 +373,15 @@ def main():
     msg(__doc__.strip())
     begin_time = datetime.datetime.now()
 
-    dcmpi_update(
-        args.dirpath, args.dcm_info, args.backup_prefix, args.verbose)
+    changes, failed = dcmpi_update(
+        args.dirpath, args.dcm_info, args.backup_prefix,
+        args.num_processes, args.dry, args.verbose)
 
     exec_time = datetime.datetime.now() - begin_time
     msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return 1 if failed else 0
 
 
 # ======================================================================
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
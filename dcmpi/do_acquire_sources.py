@@ -74,7 +74,8 @@ import argparse  # Parser for command-line options, arguments and sub-commands
 # import mri_tools.modules.geometry as mrg
 # from mri_tools.modules.sequences import mp2rage
 from dcmpi import util
-from dcmpi import INFO, PATH
+from dcmpi import catalogue as ctg
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 
@@ -87,7 +88,8 @@ def do_acquire_sources(
         subpath='{study}/{name}_{date}_{time}_{sys}',
         extra_subpath=util.ID['dicom'],
         force=False,
-        verbose=D_VERB_LVL):
+        verbose=D_VERB_LVL,
+        catalogue_filepath=None):
     """
     Get all DICOM within an input directory.
 
@@ -106,7 +108,15 @@ def do_acquire_sources(
             `utils.fill_from_dicom()`.
         extra_subpath (str):
         force (bool): Force new processing.
+            This includes the instances already in the catalogue.
         verbose (int): Set level of verbosity.
+        catalogue_filepath (str|None): Path to the catalogue.
+            The instances already in the catalogue (with the same content)
+            are skipped (their location is reported), the others are added
+            to it (with their actual location).
+            If relative, it is relative to the output directory.
+            If None, the catalogue is not used.
+            See `dcmpi.catalogue.Catalogue` for more details.
 
     Returns:
         dcm_dirpaths : str set
@@ -114,7 +124,8 @@ def do_acquire_sources(
 
     See Also:
         utils.fill_from_dicom,
-        utils.find_a_dicom
+        utils.find_a_dicom,
+        dcmpi.catalogue.Catalogue
     """
 
     def get_filepaths(dirpath):
@@ -133,6 +144,14 @@ def do_acquire_sources(
     elif method == 'symlink':
         msg('W: Files will be linked!', fmtt='{t.yellow}{t.bold}')
     if os.path.exists(in_dirpath):
+        if catalogue_filepath:
+            if not os.path.isdir(out_dirpath):
+                os.makedirs(out_dirpath)
+            catalogue = ctg.Catalogue(
+                os.path.join(out_dirpath, catalogue_filepath))
+        else:
+            catalogue = None
+        num_duplicates = 0
         # :: analyze directory tree
         dcm_dirpaths = set()
         for filepath in get_filepaths(in_dirpath):
@@ -177,15 +196,44 @@ def do_acquire_sources(
                     filepath, in_dirpath)).replace(
                     os.path.sep, util.INFO_SEP) + util.INFO_SEP
                 out_filepath = os.path.join(dcm_dirpath, fake_path + filename)
-                if not os.path.isfile(out_filepath) or force:
+                uids = ctg.read_uids(filepath, compression) \
+                    if catalogue else None
+                record = catalogue.is_duplicate(
+                    uids['sop_uid'], filepath, compression) \
+                    if uids and not force else None
+                if record:
+                    num_duplicates += 1
+                    msg('I: Duplicate `{}` already in `{}`'.format(
+                        filepath[len(in_dirpath):], record['filepath']),
+                        verbose, VERB_LVL['medium'])
+                elif not os.path.isfile(out_filepath) or force:
+                    digest = None
                     if method == 'move':
                         shutil.move(filepath, out_filepath)
                     elif method == 'copy':
-                        shutil.copy(filepath, out_filepath)
+                        if uids and not compression:
+                            # : hash while copying, to read the file once
+                            digest, size = ctg.copy_hashed(
+                                filepath, out_filepath)
+                        else:
+                            shutil.copy(filepath, out_filepath)
                     elif method == 'symlink':
                         os.symlink(filepath, out_filepath)
                     elif method == 'link':
                         os.link(filepath, out_filepath)
+                    if uids:
+                        if not digest:
+                            digest, size = ctg.file_digest(
+                                out_filepath, compression)
+                        # : updated if moved by the sorting (see `do_sorting`)
+                        catalogue.add(
+                            uids['sop_uid'],
+                            series_uid=uids['series_uid'],
+                            study_uid=uids['study_uid'],
+                            filepath=os.path.join(
+                                os.path.realpath(dcm_dirpath),
+                                fake_path + filename),
+                            digest=digest, size=size)
                 else:
                     msg('I: Skipping existing output path. '
                         'Use `force` to override.')
@@ -193,6 +241,11 @@ def do_acquire_sources(
                 name = filepath[len(in_dirpath):]
                 msg('W: Invalid source found `{}`'.format(name),
                     verbose, VERB_LVL['medium'])
+        if catalogue:
+            catalogue.close()
+            if num_duplicates:
+                msg('I: Skipped {} duplicates. '
+                    'Use `force` to override.'.format(num_duplicates))
     else:
         dcm_dirpaths = None
         msg('W: Input path does NOT exists.', verbose, VERB_LVL['low'])
@@ -249,6 +302,11 @@ def handle_arg():
         '-e', '--extra_subpath',
         default='dcm',
         help='Append static subpath to output [%(default)s]')
+    arg_parser.add_argument(
+        '-k', '--catalogue_filepath', metavar='FILE',
+        default=None,
+        help='set catalogue file to skip already imported instances. '
+             'Relative to the output directory [%(default)s]')
     return arg_parser
 
 
@@ -16,19 +16,30 @@ from __future__ import unicode_literals
 # ======================================================================
 # :: Python Standard Library Imports
 import os  # Miscellaneous operating system interfaces
+import sys  # System-specific parameters and functions
 import shutil  # High-level file operations
 # import math  # Mathematical functions
 import time  # Time access and conversions
 import datetime  # Basic date and time types
 # import operator  # Standard operators as functions
-# import collections  # High-performance container datatypes
+import collections  # High-performance container datatypes
 import argparse  # Parser for command-line options, arguments and sub-commands
 # import itertools  # Functions creating iterators for efficient looping
 # import functools  # Higher-order functions and operations on callable objects
 # import subprocess  # Subprocess management
-# import multiprocessing  # Process-based parallelism
+import multiprocessing  # Process-based parallelism
+import multiprocessing.pool  # Process-based parallelism: pools
 # import csv  # CSV File Reading and Writing [CSV: Comma-Separated Values]
-# import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import tarfile  # Read and write tar archive files
+import zlib  # Compression compatible with gzip
+import bz2  # Support for bzip2 compression
+import lzma  # Compression using the LZMA algorithm
+import hashlib  # Secure hashes and message digests
+import struct  # Interpret strings as packed binary data
+import io  # Core tools for working with streams
+import fnmatch  # Unix filename pattern matching
+import tempfile  # Generate temporary files and directories
 
 # :: External Imports
 # import numpy as np  # NumPy (multidimensional numerical arrays library)
@@ -69,18 +80,711 @@ ARCHIVE_EXT = {
     '7z': '7z',
     'zip': 'zip',
     'txz': 'tar.xz',
+    'ptgz': 'tar.gz',
+    'ptbz2': 'tar.bz2',
+    'ptxz': 'tar.xz',
+    'dedup': 'dedup.json',
+    'itgz': 'idx.tar.gz',
 }
 
+# in-process parallel block compressors: method -> (compress, decompress)
+# : each block is an independent member/stream, so that the concatenated
+# : output is readable by the standard (de)compression tools
+PARALLEL_METHODS = {
+    'ptgz': (
+        lambda data, level: _gzip_compress(data, level),
+        lambda data: zlib.decompress(data, 31)),
+    'ptbz2': (
+        lambda data, level: bz2.compress(data, level),
+        bz2.decompress),
+    'ptxz': (
+        lambda data, level: lzma.compress(data, preset=level),
+        lzma.decompress),
+}
+
+# default compression levels of the parallel compressors
+PARALLEL_LEVELS = {'ptgz': 6, 'ptbz2': 9, 'ptxz': 6}
+
+# size (in bytes) of the uncompressed blocks of the parallel compressors
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# suffix of the per-file checksum manifest (alongside the archive)
+MANIFEST_EXT = 'crc.json'
+
+# name of the content-addressed chunk store (within the output directory)
+CHUNK_STORE = 'dcmpi_store'
+
+# maximum size (in bytes) of the chunks of the content-addressed store
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# name of the index member of the indexed archives
+INDEX_NAME = '.dcmpi_index.json'
+
+# trailer of the indexed archives: an empty gzip member whose extra field
+# (subfield ID: 'DX') contains the offset of the index member
+# : header (with FEXTRA flag), XLEN, subfield ID and length, offset,
+# : empty deflate block, CRC-32 and size of the (empty) content
+INDEX_TRAILER = struct.Struct(b'<4s4sBBH2sHQ2sII')
+INDEX_TRAILER_ID = b'DX'
+
+
+# ======================================================================
+def _gzip_compress(data, level):
+    """Compress data into a single gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+# ======================================================================
+def _compress_block(data, method, level, verify=True):
+    """
+    Compress (and verify) a single block.
+
+    Args:
+        data (bytes): The uncompressed block.
+        method (str): The compression method (see `PARALLEL_METHODS`).
+        level (int): The compression level.
+        verify (bool): Decompress the block and compare the checksums.
+
+    Returns:
+        result (tuple): The tuple
+            (compressed, crc) where:
+             - compressed (bytes): The compressed block.
+             - crc (int): The CRC-32 of the uncompressed block.
+
+    Raises:
+        IOError: if the verification fails.
+    """
+    compress, decompress = PARALLEL_METHODS[method]
+    crc = zlib.crc32(data) & 0xffffffff
+    compressed = compress(data, level)
+    if verify and zlib.crc32(decompress(compressed)) & 0xffffffff != crc:
+        raise IOError('Block verification failed.')
+    return compressed, crc
+
+
+# ======================================================================
+class ParallelCompressedWriter(object):
+    """
+    Write-only file-like object compressing blocks in parallel.
+
+    The data is split into blocks of fixed size, each compressed (and
+    verified) independently by a pool of threads (the compressors release
+    the GIL), and written in order as concatenated members/streams.
+    The checksums of the uncompressed and compressed streams are computed
+    while writing, so that no second reading pass is required.
+    """
+
+    def __init__(
+            self,
+            fileobj,
+            method='ptgz',
+            level=None,
+            block_size=BLOCK_SIZE,
+            num_threads=None,
+            verify=True):
+        """
+        Args:
+            fileobj (file): The (binary) output file object.
+            method (str): The compression method (see `PARALLEL_METHODS`).
+            level (int|None): The compression level.
+                If None, uses the default from `PARALLEL_LEVELS`.
+            block_size (int): The size of the uncompressed blocks in bytes.
+            num_threads (int|None): The number of compressing threads.
+                If None, uses the number of available CPUs.
+            verify (bool): Verify each compressed block.
+        """
+        self.fileobj = fileobj
+        self.method = method
+        self.level = PARALLEL_LEVELS[method] if level is None else level
+        self.block_size = block_size
+        self.num_threads = num_threads or multiprocessing.cpu_count()
+        self.verify = verify
+        self.pool = multiprocessing.pool.ThreadPool(self.num_threads)
+        self.pending = collections.deque()
+        self.buffer = []
+        self.buffer_size = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.num_blocks = 0
+        self.crc = 0
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        num_bytes = len(data)
+        self.buffer.append(data)
+        self.buffer_size += len(data)
+        self.size += len(data)
+        if self.buffer_size >= self.block_size:
+            data = b''.join(self.buffer)
+            for i in range(0, len(data) - self.block_size + 1,
+                           self.block_size):
+                self._submit(data[i:i + self.block_size])
+            data = data[len(data) - len(data) % self.block_size:]
+            self.buffer = [data] if data else []
+            self.buffer_size = len(data)
+        return num_bytes
+
+    def _submit(self, data):
+        self.crc = zlib.crc32(data, self.crc) & 0xffffffff
+        self.pending.append(self.pool.apply_async(
+            _compress_block, (data, self.method, self.level, self.verify)))
+        # : limit the memory used by the blocks in flight
+        while len(self.pending) > 2 * self.num_threads:
+            self._drain()
+
+    def _drain(self):
+        compressed, crc = self.pending.popleft().get()
+        self.fileobj.write(compressed)
+        self.digest.update(compressed)
+        self.compressed_size += len(compressed)
+        self.num_blocks += 1
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        """
+        Terminate the current block and write all pending blocks.
+
+        Afterwards, `compressed_size` is the offset of the next block.
+        """
+        if self.buffer_size:
+            self._submit(b''.join(self.buffer))
+            self.buffer, self.buffer_size = [], 0
+        while self.pending:
+            self._drain()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.pool.close()
+            self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.pool.terminate()
+
+
+# ======================================================================
+class _GzipMembersReader(object):
+    """
+    Read-only file-like object decompressing concatenated gzip members.
+
+    Only the compressed bytes within the specified range are read.
+    """
+
+    def __init__(self, fileobj, offset, size, read_size=64 * 1024):
+        self.fileobj = fileobj
+        self.fileobj.seek(offset)
+        self.remaining = size
+        self.read_size = read_size
+        self.decompressor = zlib.decompressobj(31)
+        self.buffer = b''
+
+    def read(self, size=-1):
+        while (size < 0 or len(self.buffer) < size) and \
+                (self.remaining or self.decompressor.unused_data):
+            if self.decompressor.eof:
+                data = self.decompressor.unused_data
+                self.decompressor = zlib.decompressobj(31)
+            else:
+                data = self.fileobj.read(min(self.read_size, self.remaining))
+                self.remaining -= len(data)
+                if not data:
+                    break
+            self.buffer += self.decompressor.decompress(data)
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+# ======================================================================
+def _index_trailer(offset):
+    """Build the trailer of an indexed archive (an empty gzip member)."""
+    return INDEX_TRAILER.pack(
+        b'\x1f\x8b\x08\x04', b'\0\0\0\0', 0, 255, 12,
+        INDEX_TRAILER_ID, 8, offset, b'\x03\x00', 0, 0)
+
+
+# ======================================================================
+def read_index(in_file):
+    """
+    Read the index of an indexed archive.
+
+    Args:
+        in_file (file): The (binary, seekable) archive file object.
+
+    Returns:
+        index (dict): The archive index, containing:
+         - 'blocks' (list[dict]): the 'path', 'offset' and 'size' of the
+           compressed blocks (one per directory).
+         - 'files' (dict): archive path -> 'block', 'size' and 'crc32'.
+
+    Raises:
+        IOError: if the archive is not indexed.
+    """
+    in_file.seek(0, os.SEEK_END)
+    end = in_file.tell()
+    if end < INDEX_TRAILER.size:
+        raise IOError('Archive index not found.')
+    in_file.seek(end - INDEX_TRAILER.size)
+    fields = INDEX_TRAILER.unpack(in_file.read(INDEX_TRAILER.size))
+    if fields[0] != b'\x1f\x8b\x08\x04' or fields[5] != INDEX_TRAILER_ID:
+        raise IOError('Archive index not found.')
+    offset = fields[7]
+    reader = _GzipMembersReader(
+        in_file, offset, end - INDEX_TRAILER.size - offset)
+    with tarfile.open(fileobj=reader, mode='r|') as tar:
+        tarinfo = tar.next()
+        if tarinfo is None or tarinfo.name != INDEX_NAME:
+            raise IOError('Archive index not found.')
+        return json.loads(tar.extractfile(tarinfo).read().decode('utf-8'))
+
+
+# ======================================================================
+class _CrcReader(object):
+    """Read-only file-like wrapper computing the CRC-32 while reading."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.crc = 0
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.crc = zlib.crc32(data, self.crc) & 0xffffffff
+        return data
+
+
+# ======================================================================
+def archive_dir(
+        in_dirpath,
+        out_filepath,
+        method='ptgz',
+        level=None,
+        block_size=BLOCK_SIZE,
+        num_threads=None,
+        index=False,
+        verbose=D_VERB_LVL):
+    """
+    Archive a directory using in-process parallel compression.
+
+    A tar stream is compressed in parallel blocks and each block is verified
+    while writing. The per-file checksums are saved in a JSON manifest
+    alongside the archive (with the `MANIFEST_EXT` suffix).
+    The archive is written to a temporary file and renamed when complete.
+
+    If indexed, the compressed blocks are aligned to the directories (e.g.
+    the series), the index is added as last member (`INDEX_NAME`) and
+    an empty gzip member pointing to it is appended (see `INDEX_TRAILER`).
+    The result is still a valid tar.gz archive, but single directories or
+    files can be extracted without decompressing everything.
+    See `restore()` for more details.
+
+    Args:
+        in_dirpath (str): Path to input directory.
+        out_filepath (str): Path to the output archive.
+        method (str): The compression method (see `PARALLEL_METHODS`).
+        level (int|None): The compression level.
+        block_size (int): The size of the uncompressed blocks in bytes.
+        num_threads (int|None): The number of compressing threads.
+        index (bool): Create an indexed archive (requires 'ptgz').
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        success (bool): True if the archive was created and verified.
+    """
+    in_dirpath = os.path.normpath(in_dirpath)
+    base_dirpath = os.path.dirname(in_dirpath)
+    tmp_filepath = out_filepath + '.part'
+    manifest = {
+        'archive': os.path.basename(out_filepath),
+        'method': method,
+        'files': {},
+    }
+    blocks = []
+    success = False
+    try:
+        if index and method != 'ptgz':
+            raise IOError('Indexed archives require `ptgz`.')
+        with open(tmp_filepath, 'wb') as out_file:
+            with ParallelCompressedWriter(
+                    out_file, method, level, block_size,
+                    num_threads) as writer:
+                with tarfile.open(fileobj=writer, mode='w') as tar:
+                    for dirpath, dirnames, filenames in os.walk(in_dirpath):
+                        dirnames.sort()
+                        arcdir = os.path.relpath(dirpath, base_dirpath)
+                        if index:
+                            # : align the blocks to the directories
+                            writer.flush()
+                            blocks.append({
+                                'path': arcdir,
+                                'offset': writer.compressed_size})
+                        tar.add(dirpath, arcdir, recursive=False)
+                        for filename in sorted(filenames):
+                            filepath = os.path.join(dirpath, filename)
+                            arcname = os.path.join(arcdir, filename)
+                            tarinfo = tar.gettarinfo(filepath, arcname)
+                            if not tarinfo.isreg():
+                                tar.addfile(tarinfo)
+                                continue
+                            with open(filepath, 'rb') as in_file:
+                                reader = _CrcReader(in_file)
+                                tar.addfile(tarinfo, reader)
+                            manifest['files'][arcname] = {
+                                'size': tarinfo.size,
+                                'crc32': '{:08x}'.format(reader.crc)}
+                            if index:
+                                manifest['files'][arcname]['block'] = \
+                                    len(blocks) - 1
+                            msg('Add: {}'.format(arcname),
+                                verbose, VERB_LVL['highest'])
+                    if index:
+                        writer.flush()
+                        index_offset = writer.compressed_size
+                        for block, next_block in zip(
+                                blocks, blocks[1:] + [None]):
+                            block['size'] = (
+                                next_block['offset'] if next_block
+                                else index_offset) - block['offset']
+                        manifest['blocks'] = blocks
+                        data = json.dumps(
+                            manifest, sort_keys=True).encode('utf-8')
+                        tarinfo = tarfile.TarInfo(INDEX_NAME)
+                        tarinfo.size = len(data)
+                        tarinfo.mtime = time.time()
+                        tar.addfile(tarinfo, io.BytesIO(data))
+            if index:
+                out_file.write(_index_trailer(index_offset))
+        manifest.update({
+            'size': writer.size,
+            'crc32': '{:08x}'.format(writer.crc),
+            'compressed_size': writer.compressed_size,
+            'sha256': writer.digest.hexdigest(),
+            'num_blocks': writer.num_blocks,
+            'block_size': block_size,
+        })
+        os.rename(tmp_filepath, out_filepath)
+        with open(out_filepath + '.' + MANIFEST_EXT, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, sort_keys=True, indent=4)
+        success = True
+    except (IOError, OSError, tarfile.TarError) as e:
+        print(e)
+        msg('E: failed archiving `{}`'.format(in_dirpath))
+        if os.path.isfile(tmp_filepath):
+            os.remove(tmp_filepath)
+    else:
+        msg('Archive: {} files, {} -> {} bytes in {} blocks'.format(
+            len(manifest['files']), manifest['size'],
+            manifest['compressed_size'], manifest['num_blocks']),
+            verbose, VERB_LVL['medium'])
+    return success
+
+
+# ======================================================================
+def _chunk_filepath(store_dirpath, chunk_id):
+    """Get the path of a chunk in the content-addressed store."""
+    return os.path.join(store_dirpath, chunk_id[:2], chunk_id + '.gz')
+
+
+# ======================================================================
+def _store_file(filepath, store_dirpath, chunk_size=CHUNK_SIZE):
+    """
+    Store a file in the content-addressed store.
+
+    The file is split into chunks, identified by their SHA-256 digest.
+    Only the chunks not already present are written (gzip-compressed).
+    Each chunk is written to a unique temporary file, then renamed, so that
+    identical chunks can be stored concurrently.
+
+    Args:
+        filepath (str): Path to the input file.
+        store_dirpath (str): Path to the content-addressed store.
+        chunk_size (int): The maximum size of the chunks in bytes.
+
+    Returns:
+        result (tuple): The tuple
+            (chunk_ids, num_new) where:
+             - chunk_ids (list[str]): The identifiers of the chunks.
+             - num_new (int): The number of chunks added to the store.
+    """
+    chunk_ids = []
+    num_new = 0
+    with open(filepath, 'rb') as in_file:
+        while True:
+            data = in_file.read(chunk_size)
+            if not data and chunk_ids:
+                break
+            chunk_id = hashlib.sha256(data).hexdigest()
+            chunk_ids.append(chunk_id)
+            chunk_filepath = _chunk_filepath(store_dirpath, chunk_id)
+            if not os.path.isfile(chunk_filepath):
+                chunk_dirpath = os.path.dirname(chunk_filepath)
+                if not os.path.isdir(chunk_dirpath):
+                    try:
+                        os.makedirs(chunk_dirpath)
+                    except OSError:
+                        pass  # : created concurrently
+                tmp_fd, tmp_filepath = tempfile.mkstemp(
+                    suffix='.part', prefix=os.path.basename(chunk_filepath),
+                    dir=chunk_dirpath)
+                try:
+                    with os.fdopen(tmp_fd, 'wb') as chunk_file:
+                        chunk_file.write(_gzip_compress(data, 6))
+                    if os.path.isfile(chunk_filepath):
+                        # : stored concurrently (with the same content)
+                        os.remove(tmp_filepath)
+                    else:
+                        os.chmod(tmp_filepath, 0o644)
+                        os.replace(tmp_filepath, chunk_filepath)
+                        num_new += 1
+                except BaseException:
+                    if os.path.isfile(tmp_filepath):
+                        os.remove(tmp_filepath)
+                    raise
+            if len(data) < chunk_size:
+                break
+    return chunk_ids, num_new
+
+
+# ======================================================================
+def dedup_dir(
+        in_dirpath,
+        out_filepath,
+        store_dirpath=None,
+        num_threads=None,
+        verbose=D_VERB_LVL):
+    """
+    Backup a directory into a content-addressed (deduplicated) store.
+
+    Each file is stored once (by content) in the chunk store, and the backup
+    itself is a small JSON manifest pointing to the chunks.
+    If the manifest already exists, the backup is incremental: unchanged
+    files (same size and modification time) are not read again, and the
+    files no longer present in the input are kept in the manifest.
+
+    Args:
+        in_dirpath (str): Path to input directory.
+        out_filepath (str): Path to the output manifest.
+        store_dirpath (str|None): Path to the chunk store.
+            If None, uses `CHUNK_STORE` in the directory of the manifest.
+        num_threads (int|None): The number of hashing threads.
+            If None, uses the number of available CPUs.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        success (bool): True if the backup was completed.
+    """
+    in_dirpath = os.path.normpath(in_dirpath)
+    base_dirpath = os.path.dirname(in_dirpath)
+    out_dirpath = os.path.dirname(os.path.abspath(out_filepath))
+    if not store_dirpath:
+        store_dirpath = os.path.join(out_dirpath, CHUNK_STORE)
+    manifest = {'method': 'dedup', 'files': {}}
+    if os.path.isfile(out_filepath):
+        with open(out_filepath, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+        msg('Update: {} files'.format(len(manifest['files'])),
+            verbose, VERB_LVL['medium'])
+    manifest['store'] = os.path.relpath(store_dirpath, out_dirpath)
+    old_files = manifest['files']
+
+    # :: find new or changed files
+    to_store = []
+    num_files = 0
+    for dirpath, dirnames, filenames in os.walk(in_dirpath):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            filepath = os.path.join(dirpath, filename)
+            arcname = os.path.relpath(filepath, base_dirpath)
+            stat = os.stat(filepath)
+            entry = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'mode': stat.st_mode & 0o7777}
+            old_entry = old_files.get(arcname, {})
+            num_files += 1
+            if all(old_entry.get(key) == val for key, val in entry.items()):
+                continue
+            to_store.append((arcname, filepath, entry))
+
+    # :: store the content
+    success = False
+    num_new = 0
+    try:
+        pool = multiprocessing.pool.ThreadPool(
+            num_threads or multiprocessing.cpu_count())
+        try:
+            results = pool.imap(
+                lambda item: _store_file(item[1], store_dirpath), to_store)
+            for (arcname, filepath, entry), (chunk_ids, num_chunks) in \
+                    zip(to_store, results):
+                entry['chunks'] = chunk_ids
+                old_files[arcname] = entry
+                num_new += num_chunks
+                msg('Add: {}'.format(arcname), verbose, VERB_LVL['highest'])
+        finally:
+            # : all the results are consumed, unless failed
+            pool.terminate()
+            pool.join()
+        tmp_filepath = out_filepath + '.part'
+        with open(tmp_filepath, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, sort_keys=True, indent=4)
+        os.rename(tmp_filepath, out_filepath)
+        success = True
+    except (IOError, OSError) as e:
+        print(e)
+        msg('E: failed backing up `{}`'.format(in_dirpath))
+    msg('Dedup: {} / {} files changed, {} new chunks'.format(
+        len(to_store), num_files, num_new), verbose, VERB_LVL['medium'])
+    return success
+
+
+# ======================================================================
+def restore(
+        in_filepath,
+        out_dirpath,
+        pattern=None,
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Restore files from a deduplicated backup or an indexed archive.
+
+    For deduplicated backups, the chunks are decompressed and streamed to the
+    output files, and their content is verified against the chunk
+    identifiers.
+    For indexed archives, only the blocks containing the matching files are
+    read and decompressed, and the files are verified against their CRC-32.
+
+    Args:
+        in_filepath (str): Path to the backup manifest or indexed archive.
+        out_dirpath (str): Path to output directory.
+        pattern (str|None): Restore only the matching files.
+            Uses Unix shell-style wildcards (see `fnmatch`).
+            If None, all files are restored.
+        force (bool): Overwrite existing files.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        num_files (int): The number of restored files.
+    """
+    msg(':: Restoring DICOM folder...')
+    msg('Input:  {}'.format(in_filepath))
+    msg('Output: {}'.format(out_dirpath))
+    if in_filepath.endswith('.' + ARCHIVE_EXT['itgz']):
+        return _restore_indexed(
+            in_filepath, out_dirpath, pattern, force, verbose)
+    with open(in_filepath, 'r') as manifest_file:
+        manifest = json.load(manifest_file)
+    store_dirpath = os.path.join(
+        os.path.dirname(os.path.abspath(in_filepath)), manifest['store'])
+    num_files = 0
+    for arcname, entry in sorted(manifest['files'].items()):
+        if pattern and not fnmatch.fnmatch(arcname, pattern):
+            continue
+        out_filepath = os.path.join(out_dirpath, arcname)
+        if os.path.exists(out_filepath) and not force:
+            msg('I: Skipping existing `{}`.'.format(out_filepath),
+                verbose, VERB_LVL['medium'])
+            continue
+        if not os.path.isdir(os.path.dirname(out_filepath)):
+            os.makedirs(os.path.dirname(out_filepath))
+        try:
+            with open(out_filepath, 'wb') as out_file:
+                for chunk_id in entry['chunks']:
+                    chunk_filepath = _chunk_filepath(store_dirpath, chunk_id)
+                    with open(chunk_filepath, 'rb') as chunk_file:
+                        data = zlib.decompress(chunk_file.read(), 31)
+                    if hashlib.sha256(data).hexdigest() != chunk_id:
+                        raise IOError(
+                            'Corrupted chunk `{}`.'.format(chunk_filepath))
+                    out_file.write(data)
+        except (IOError, OSError, zlib.error) as e:
+            print(e)
+            msg('E: failed restoring `{}`'.format(arcname))
+        else:
+            os.chmod(out_filepath, entry['mode'])
+            os.utime(out_filepath, (entry['mtime'], entry['mtime']))
+            num_files += 1
+            msg('Restore: {}'.format(arcname), verbose, VERB_LVL['highest'])
+    msg('Restored: {} files'.format(num_files))
+    return num_files
+
+
+# ======================================================================
+def _restore_indexed(
+        in_filepath,
+        out_dirpath,
+        pattern=None,
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Restore files from an indexed archive.
+
+    See `restore()` for more details.
+    """
+    num_files = 0
+    with open(in_filepath, 'rb') as in_file:
+        index = read_index(in_file)
+        files = {
+            arcname: entry for arcname, entry in index['files'].items()
+            if not pattern or fnmatch.fnmatch(arcname, pattern)}
+        block_ids = sorted(set(entry['block'] for entry in files.values()))
+        msg('Blocks: {} / {}'.format(len(block_ids), len(index['blocks'])),
+            verbose, VERB_LVL['medium'])
+        for block_id in block_ids:
+            block = index['blocks'][block_id]
+            reader = _GzipMembersReader(
+                in_file, block['offset'], block['size'])
+            with tarfile.open(fileobj=reader, mode='r|') as tar:
+                for tarinfo in tar:
+                    if tarinfo.name not in files or not tarinfo.isreg():
+                        continue
+                    out_filepath = os.path.join(out_dirpath, tarinfo.name)
+                    if os.path.exists(out_filepath) and not force:
+                        msg('I: Skipping existing `{}`.'.format(out_filepath),
+                            verbose, VERB_LVL['medium'])
+                        continue
+                    if not os.path.isdir(os.path.dirname(out_filepath)):
+                        os.makedirs(os.path.dirname(out_filepath))
+                    # : extract to a temporary name, renamed once verified
+                    tmp_filepath = out_filepath + '.part'
+                    crc_reader = _CrcReader(tar.extractfile(tarinfo))
+                    with open(tmp_filepath, 'wb') as out_file:
+                        shutil.copyfileobj(crc_reader, out_file)
+                    if '{:08x}'.format(crc_reader.crc) != \
+                            files[tarinfo.name]['crc32']:
+                        os.remove(tmp_filepath)
+                        msg('E: failed restoring `{}`'.format(tarinfo.name))
+                        continue
+                    os.replace(tmp_filepath, out_filepath)
+                    os.chmod(out_filepath, tarinfo.mode)
+                    os.utime(out_filepath, (tarinfo.mtime, tarinfo.mtime))
+                    num_files += 1
+                    msg('Restore: {}'.format(tarinfo.name),
+                        verbose, VERB_LVL['highest'])
+    msg('Restored: {} files'.format(num_files))
+    return num_files
+
 
 # ======================================================================
 def do_backup(
         in_dirpath,
         out_dirpath=None,
         basename='{name}_{date}_{time}_{sys}',
-        method='tlz',
+        method='ptxz',
         keep=False,
         force=False,
-        verbose=D_VERB_LVL):
+        verbose=D_VERB_LVL,
+        num_threads=None):
     """
     Safely do_backup DICOM files and test the produced archive.
 
@@ -94,18 +798,38 @@ def do_backup(
             see `utl.fill_from_dicom()`.
         method (str): The Compression method.
             Accepted values:
+             - 'tlz', 'tgz', 'tbz2', 'txz': Use `tar` and an external
+               compressor, then test the archive.
+             - 'ptgz', 'ptbz2', 'ptxz': Use the in-process parallel
+               archiver (verified while writing, with a CRC manifest).
              - '7z': Use 7z compression format.
+             - 'zip': Use zip compression format.
+             - 'dedup': Use the deduplicated store (incremental).
+               Files are stored by content in `CHUNK_STORE` (in the output
+               directory) and the backup is a JSON manifest.
+               See `restore()` to get the files back.
+             - 'itgz': Use the in-process parallel archiver with an index
+               (gzip blocks aligned to the series), for fast restores of
+               single series or files with `restore()`.
         keep (bool): Do NOT remove DICOM sources afterward.
         force (bool): Force new processing.
         verbose (int): Set level of verbosity.
+        num_threads (int|None): The number of compressing threads.
+            Only used by the in-process parallel methods.
+            If None, uses the number of available CPUs.
 
     Returns:
         None.
+
+    Raises:
+        IOError: If the backup failed (e.g. the archiver not available).
+        ValueError: If the method is unknown.
     """
 
     def _success(ret_code, p_stdout, p_stderr):
         # and p_stdout.find('Everything is Ok') > 0
-        return not ret_code
+        # : `ret_code` is None if the command could not be run
+        return ret_code == 0
 
     msg(':: Backing up DICOM folder...')
     msg('Input:  {}'.format(in_dirpath))
@@ -118,7 +842,7 @@ def do_backup(
         out_filepath += '.' + ARCHIVE_EXT[method]
     msg('Output: {}'.format(out_filepath))
     success = False
-    if not os.path.exists(out_filepath) or force:
+    if not os.path.exists(out_filepath) or method == 'dedup' or force:
         if method == 'tlz':
             cmd_token_list = [
                 'tar', '--lzip', '-cf', out_filepath, in_dirpath]
@@ -203,9 +927,33 @@ def do_backup(
             success = _success(ret_code, p_stdout, p_stderr)
             msg(':: Test was' + (' ' if success else ' NOT ') + 'successful.')
 
+        elif method in PARALLEL_METHODS:
+            success = archive_dir(
+                in_dirpath, out_filepath, method,
+                num_threads=num_threads, verbose=verbose)
+            # : the archive is tested while writing
+            msg(':: Backup' + (' ' if success else ' NOT ') + 'successful.')
+
+        elif method == 'itgz':
+            success = archive_dir(
+                in_dirpath, out_filepath, 'ptgz',
+                num_threads=num_threads, index=True, verbose=verbose)
+            msg(':: Backup' + (' ' if success else ' NOT ') + 'successful.')
+
+        elif method == 'dedup':
+            success = dedup_dir(
+                in_dirpath, out_filepath,
+                num_threads=num_threads, verbose=verbose)
+            msg(':: Backup' + (' ' if success else ' NOT ') + 'successful.')
+
         else:
-            msg('W: Unknown method `{}`.'.format(method))
-        if success and not keep and os.path.exists(in_dirpath):
+            raise ValueError('Unknown method `{}`.'.format(method))
+        if not success:
+            if method != 'dedup' and os.path.isfile(out_filepath):
+                # : remove partial outputs (would be considered up-to-date)
+                os.remove(out_filepath)
+            raise IOError('Backup of `{}` failed.'.format(in_dirpath))
+        if not keep and os.path.exists(in_dirpath):
             msg('Remove: {}'.format(in_dirpath))
             shutil.rmtree(in_dirpath, ignore_errors=True)
     else:
@@ -255,9 +1003,21 @@ def handle_arg():
         default='{name}_{date}_{time}_{sys}',
         help='set output directory [%(default)s]')
     arg_parser.add_argument(
-        '-m', '--method', metavar='tlz|tgz|tbz2|7z|zip|txz',
-        default='tlz',
+        '-m', '--method',
+        metavar='tlz|tgz|tbz2|7z|zip|txz|ptgz|ptbz2|ptxz|itgz|dedup',
+        default='ptxz',
         help='set compression method [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--num_threads', metavar='NUM',
+        type=int, default=None,
+        help='set number of compressing threads (pt*|itgz|dedup) '
+             '[%(default)s]')
+    arg_parser.add_argument(
+        '-r', '--restore', metavar='PATTERN',
+        nargs='?', const='*', default=None,
+        help='restore the (matching) files from the dedup manifest or '
+             'indexed archive given as input to the output directory '
+             '[%(default)s]')
     arg_parser.add_argument(
         '-k', '--keep',
         action='store_true',
@@ -285,12 +1045,25 @@ def main():
 
     kws = vars(args)
     kws.pop('quiet')
-    do_backup(**kws)
+    kws['basename'] = kws.pop('name')
+    pattern = kws.pop('restore')
+    exit_code = 0
+    try:
+        if pattern:
+            restore(
+                args.in_dirpath, args.out_dirpath, pattern,
+                args.force, args.verbose)
+        else:
+            do_backup(**kws)
+    except (IOError, OSError, ValueError) as e:
+        msg('E: {}'.format(e))
+        exit_code = 1
 
     exec_time = datetime.datetime.now() - begin_time
     msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return exit_code
 
 
 # ======================================================================
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -30,20 +30,24 @@ from __future__ import unicode_literals
 # ======================================================================
 # :: Python Standard Library Imports
 import os  # Miscellaneous operating system interfaces
+import sys  # System-specific parameters and functions
 # import shutil  # High-level file operations
 # import math  # Mathematical functions
 import time  # Time access and conversions
 import datetime  # Basic date and time types
-# import re  # Regular expression operations
+import re  # Regular expression operations
 # import operator  # Standard operators as functions
 # import collections  # High-performance container datatypes
 import argparse  # Parser for command-line options, arguments and sub-commands
 # import itertools  # Functions creating iterators for efficient looping
-# import functools  # Higher-order functions and operations on callable objects
+import functools  # Higher-order functions and operations on callable objects
 # import subprocess  # Subprocess management
-# import multiprocessing  # Process-based parallelism
+import multiprocessing  # Process-based parallelism
+import multiprocessing.pool  # Process-based parallelism: pools
 # import csv  # CSV File Reading and Writing [CSV: Comma-Separated Values]
 import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import glob  # Unix style pathname pattern expansion
+import hashlib  # Secure hashes and message digests
 
 # :: External Imports
 # import numpy as np  # NumPy (multidimensional numerical arrays library)
@@ -67,10 +71,281 @@ import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 
 # :: Local Imports
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import previews as prv
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 
+# ======================================================================
+# report tags have the form: [TAG-NAME]
+TAG_PATTERN = re.compile(r'(\[[A-Z0-9-]+\])')
+
+# suffix of the file caching the rendered report fragments
+CACHE_EXT = 'cache.json'
+
+# report templates (within the `report_templates` directory)
+TEMPLATES = {
+    'report': 'report_template.html',
+    'acq': 'acquisition_template.html',
+    'acq_param': 'acquisition_parameter_template.html',
+}
+
+# compiled templates cache: filepath -> (mtime, digest, tokens)
+_COMPILED_TEMPLATES = {}
+
+# options for the HTML to PDF conversion with `wkhtmltopdf`
+PDF_OPTS = (
+    '--page-size', 'A4',
+    '--margin-bottom', '15mm',
+    '--margin-left', '15mm',
+    '--margin-right', '15mm',
+    '--margin-top', '15mm',
+    # '--no-pdf-compression',  # n/a in Ubuntu 14.04
+)
+
+
+# ======================================================================
+def compile_template(text):
+    """
+    Compile a template into a sequence of tokens.
+
+    Args:
+        text (str): The template text, containing tags like: `[TAG-NAME]`.
+
+    Returns:
+        tokens (tuple[str]): The template tokens.
+            Even positions contain the literal text, odd positions the tags.
+
+    Examples:
+        >>> compile_template('<b>[NAME]</b>: [VAL]')
+        ('<b>', '[NAME]', '</b>: ', '[VAL]', '')
+    """
+    return tuple(TAG_PATTERN.split(text))
+
+
+# ======================================================================
+def render_template(tokens, tags):
+    """
+    Render a compiled template, replacing all tags in a single pass.
+
+    Args:
+        tokens (tuple[str]): The compiled template.
+        tags (dict): The tag replacements.
+            Values can be either strings or iterables of strings.
+            Tags not present in the template are ignored.
+            Tags of the template not present here are left untouched.
+
+    Yields:
+        chunk (str): The rendered chunks, to be joined or written as is.
+
+    Examples:
+        >>> tokens = compile_template('<b>[NAME]</b>: [VAL]')
+        >>> ''.join(render_template(tokens, {'[NAME]': 'x', '[VAL]': '1'}))
+        '<b>x</b>: 1'
+        >>> ''.join(render_template(tokens, {'[VAL]': ['1', '2']}))
+        '<b>[NAME]</b>: 12'
+    """
+    for i, token in enumerate(tokens):
+        if i % 2:
+            val = tags.get(token, token)
+            if isinstance(val, str):
+                yield val
+            else:
+                for chunk in val:
+                    yield chunk
+        elif token:
+            yield token
+
+
+# ======================================================================
+def load_templates(
+        dirpath=os.path.join(os.path.dirname(__file__), 'report_templates'),
+        templates=TEMPLATES):
+    """
+    Load the compiled report templates.
+
+    Compiled templates are cached and only re-compiled when modified.
+
+    Args:
+        dirpath (str): Path to the templates directory.
+        templates (dict): The template names and filenames.
+
+    Returns:
+        result (tuple[dict]): The tuple
+            (compiled, digests) where:
+             - compiled (dict): template name -> template tokens.
+             - digests (dict): template name -> template digest.
+    """
+    compiled, digests = {}, {}
+    for key, filename in templates.items():
+        tpl_filepath = os.path.join(dirpath, filename)
+        mtime = os.path.getmtime(tpl_filepath)
+        cached = _COMPILED_TEMPLATES.get(tpl_filepath)
+        if not cached or cached[0] != mtime:
+            with open(tpl_filepath, 'r') as tpl_file:
+                text = tpl_file.read()
+            cached = mtime, _digest(text), compile_template(text)
+            _COMPILED_TEMPLATES[tpl_filepath] = cached
+        digests[key], compiled[key] = cached[1:]
+    return compiled, digests
+
+
+# ======================================================================
+def _digest(*texts):
+    """
+    Compute a digest of the specified texts.
+
+    Args:
+        *texts (str): The input texts.
+
+    Returns:
+        digest (str): The hexadecimal SHA-1 digest.
+    """
+    digest = hashlib.sha1()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+# ======================================================================
+def load_cache(cache_filepath):
+    """
+    Load the cache of the rendered report fragments.
+
+    Args:
+        cache_filepath (str): Path to the cache file.
+
+    Returns:
+        cache (dict): The cached report information, containing:
+         - 'acq' (dict): acquisition ID -> (digest, rendered HTML fragment)
+         - 'report' (str|None): the digest of the whole report.
+         - 'preview' (dict): series ID -> (fingerprint, data URI)
+    """
+    cache = {'acq': {}, 'report': None, 'preview': {}}
+    if os.path.isfile(cache_filepath):
+        try:
+            with open(cache_filepath, 'r') as cache_file:
+                cache.update(json.load(cache_file))
+        except ValueError:
+            msg('W: Ignoring invalid cache `{}`.'.format(cache_filepath))
+    return cache
+
+
+# ======================================================================
+def render_acquisition(n_acq, acq, template, previews=None):
+    """
+    Render the HTML fragment of a single acquisition.
+
+    Args:
+        n_acq (str): The acquisition identifier.
+        acq (dict): The acquisition information (from `get_info`).
+        template (dict): The compiled report templates.
+            Must contain the 'acq' and 'acq_param' templates.
+            See `load_templates()` for more details.
+        previews (dict|None): The series ID -> (fingerprint, data URI).
+            See `dcmpi.previews.get_previews()` for more details.
+
+    Returns:
+        html (str): The rendered acquisition.
+    """
+    previews = previews or {}
+    acq_param_html = [
+        chunk
+        for key, val in sorted(get_param(acq).items(), key=sort_param)
+        for chunk in render_template(
+            template['acq_param'],
+            {'[ACQ-PARAM-KEY]': key, '[ACQ-PARAM-VAL]': val})]
+    tags = {
+        '[ACQ-ID]': n_acq,
+        '[ACQ-TIME]': acq['AcquisitionTime'],
+        '[ACQ-PROTOCOL]': acq['ProtocolName'],
+        '[ACQ-SERIES]':
+            ', '.join([series[:series.find(utl.INFO_SEP)]
+                       for series in acq['_series']]),
+        '[ACQUISITION-PARAMETER-TEMPLATE]': acq_param_html,
+        '[ACQ-PREVIEWS]': [
+            '<img src="{}" alt="{}" title="{}" />'.format(
+                previews[series][1], series, series)
+            for series in acq['_series']
+            if series in previews and previews[series][1]],
+    }
+    return ''.join(render_template(template['acq'], tags))
+
+
+# ======================================================================
+def html_to_pdf(
+        filepaths,
+        verbose=D_VERB_LVL):
+    """
+    Convert HTML files to PDF using a single `wkhtmltopdf` process.
+
+    The conversions are passed to `wkhtmltopdf` through `stdin` (one
+    invocation per line), so that the renderer starts only once.
+    Since the conversions are performed sequentially, the time of each
+    conversion is obtained from the modification time of the outputs.
+    Failed conversions are retried with one invocation per file.
+
+    Args:
+        filepaths (Iterable[tuple[str]]): The (HTML, PDF) filepath pairs.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        timings (list[dict]): The conversion information, containing:
+         - 'html' (str): the input HTML filepath.
+         - 'pdf' (str): the output PDF filepath.
+         - 'success' (bool): True if the PDF was created, False otherwise.
+         - 'batched' (bool): True if converted in the batch, False otherwise.
+         - 'time' (float): the conversion time in seconds.
+    """
+    def quote(text):
+        return '"{}"'.format(text.replace('\\', '\\\\').replace('"', '\\"'))
+
+    def is_done(filepath, begin_time):
+        return os.path.isfile(filepath) \
+            and os.path.getmtime(filepath) >= int(begin_time)
+
+    filepaths = list(filepaths)
+    timings = []
+    if len(filepaths) > 1:
+        in_pipe = ''.join(
+            ' '.join(quote(arg) for arg in PDF_OPTS + pair) + '\n'
+            for pair in filepaths)
+        begin_time = time.time()
+        utl.execute(
+            ['wkhtmltopdf', '--read-args-from-stdin'], in_pipe=in_pipe,
+            verbose=verbose)
+        last_time = begin_time
+        for html_filepath, pdf_filepath in filepaths:
+            success = is_done(pdf_filepath, begin_time)
+            if success:
+                end_time = max(os.path.getmtime(pdf_filepath), last_time)
+                timings.append({
+                    'html': html_filepath, 'pdf': pdf_filepath,
+                    'success': True, 'batched': True,
+                    'time': end_time - last_time})
+                last_time = end_time
+        done = set(timing['pdf'] for timing in timings)
+        filepaths = [pair for pair in filepaths if pair[1] not in done]
+        if filepaths:
+            msg('W: Batch conversion incomplete, converting {} files.'.format(
+                len(filepaths)), verbose, VERB_LVL['medium'])
+    for html_filepath, pdf_filepath in filepaths:
+        begin_time = time.time()
+        ret_val, p_stdout, p_stderr = utl.execute(
+            ['wkhtmltopdf'] + list(PDF_OPTS) + [html_filepath, pdf_filepath],
+            verbose=verbose)
+        success = not ret_val and is_done(pdf_filepath, begin_time)
+        timings.append({
+            'html': html_filepath, 'pdf': pdf_filepath,
+            'success': success, 'batched': False,
+            'time': time.time() - begin_time})
+    for timing in timings:
+        if not timing['success'] and os.path.isfile(timing['pdf']):
+            # : remove partial outputs (would be considered up-to-date)
+            os.remove(timing['pdf'])
+    return timings
+
 
 # ======================================================================
 def get_session(dirpath, summary):
@@ -205,6 +480,9 @@ def do_report(
         basename='{name}_{date}_{time}_{sys}',
         method='pydicom',
         file_format='pdf',
+        incremental=True,
+        render_pdf=True,
+        previews=True,
         force=False,
         verbose=D_VERB_LVL):
     """
@@ -221,7 +499,21 @@ def do_report(
         * pydicom: Use PyDICOM Python module.
     file_format : str (optional)
         | Output format. HTML will always be present. Accepted values:
-        * pydicom: Use PyDICOM Python module.
+        * html: Only produce the HTML report.
+        * pdf: Convert the HTML report to PDF using `wkhtmltopdf`.
+    incremental : boolean (optional)
+        | Update an existing report, re-rendering only what has changed.
+        | Rendered acquisitions are cached (keyed by the digest of their
+        | information) and the PDF conversion is skipped if the report
+        | content did not change.
+    render_pdf : boolean (optional)
+        | Convert the HTML report to PDF (if `file_format` is `pdf`).
+        | If False, the conversion is left to the caller (e.g. to convert
+        | many reports at once, see `do_report_batch()`).
+    previews : boolean (optional)
+        | Embed a preview of the central slice of each series.
+        | Previews are cached (keyed by the fingerprint of the series files).
+        | See `dcmpi.previews` for more details.
     force : boolean (optional)
         Force new processing.
     verbose : int (optional)
@@ -229,10 +521,18 @@ def do_report(
 
     Returns
     =======
-    None.
+    pdf_job : tuple[str]|None
+        The (HTML, PDF) filepaths of the pending PDF conversion, if any.
+
+    Raises
+    ======
+    IOError
+        If the PDF conversion failed (e.g. `wkhtmltopdf` not available).
 
     """
     msg(':: Creating HTML and PDF report...')
+    pdf_job = None
+    pdf_error = None
     msg('Input:  {}'.format(in_dirpath))
     msg('Output: {}'.format(out_dirpath))
 
@@ -241,9 +541,12 @@ def do_report(
     html_basename = out_basename + '.htm'
     msg('HTML: {}'.format(html_basename))
     out_filepath = os.path.join(out_dirpath, html_basename)
+    pdf_filepath = os.path.join(out_dirpath, out_basename + '.pdf')
+    cache_filepath = os.path.join(
+        out_dirpath, '.' + out_basename + '.' + CACHE_EXT)
 
     # proceed only if output is not likely to be there
-    if not os.path.exists(out_filepath) or force:
+    if not os.path.exists(out_filepath) or incremental or force:
         # :: create output directory if not exists and extract images
         if not os.path.exists(out_dirpath):
             os.makedirs(out_dirpath)
@@ -261,14 +564,15 @@ def do_report(
             for name in sorted(os.listdir(info_dirpath)):
                 target = os.path.join(info_dirpath, name)
                 with open(target, 'r') as target_file:
-                    if name.startswith('summary.info'):
-                        summary = json.load(target_file)
-                    elif name.startswith('extra.info'):
-                        extra = json.load(target_file)
-                    elif name.startswith('a'):
-                        acquisitions.append((
-                            name[:name.find(utl.INFO_SEP)],
-                            json.load(target_file)))
+                    text = target_file.read()
+                if name.startswith('summary.info'):
+                    summary = json.loads(text)
+                elif name.startswith('extra.info'):
+                    extra = json.loads(text)
+                elif name.startswith('a'):
+                    acquisitions.append((
+                        name[:name.find(utl.INFO_SEP)],
+                        json.loads(text), _digest(text)))
 
         else:
             msg('W: Unknown method `{}`.'.format(method))
@@ -279,40 +583,36 @@ def do_report(
 
         if summary and acquisitions and os.path.isdir(tpl_dirpath):
             # :: always create HTML report
-            # import templates
-            template = {
-                'report': 'report_template.html',
-                'acq': 'acquisition_template.html',
-                'acq_param': 'acquisition_parameter_template.html',
-            }
-            for key, filename in template.items():
-                tpl_filepath = os.path.join(tpl_dirpath, filename)
-                with open(tpl_filepath, 'r') as tpl_file:
-                    template[key] = tpl_file.read()
-            # replace tags
-            acq_html = ''
-            for n_acq, acq in acquisitions:
-                acq_param_html = ''
-                for key, val in sorted(get_param(acq).items(), key=sort_param):
-                    acq_param_html += template['acq_param'].replace(
-                        '[ACQ-PARAM-KEY]', key).replace(
-                        '[ACQ-PARAM-VAL]', val)
-                tags = {
-                    '[ACQ-ID]': n_acq,
-                    '[ACQ-TIME]': acq['AcquisitionTime'],
-                    '[ACQ-PROTOCOL]': acq['ProtocolName'],
-                    '[ACQ-SERIES]':
-                        ', '.join([series[:series.find(utl.INFO_SEP)]
-                                   for series in acq['_series']]),
-                    '[ACQUISITION-PARAMETER-TEMPLATE]': acq_param_html,
-                }
-                tmp_acq_html = template['acq']
-                for tag, val in tags.items():
-                    tmp_acq_html = tmp_acq_html.replace(tag, val)
-                acq_html += tmp_acq_html
-            report_html = template['report']
+            # import (compiled) templates
+            template, tpl_digests = load_templates(tpl_dirpath)
+            cache = load_cache(cache_filepath) \
+                if incremental and not force else load_cache('')
+            series_previews = prv.get_previews(
+                in_dirpath, cache=cache['preview'], verbose=verbose) \
+                if previews else {}
+            # replace tags (re-using cached acquisitions when unchanged)
+            tpl_digest = _digest(tpl_digests['acq'], tpl_digests['acq_param'])
+            acq_cache = {}
+            num_rendered = 0
+            for n_acq, acq, acq_digest in acquisitions:
+                acq_digest = _digest(*(
+                    [tpl_digest, acq_digest] +
+                    [series_previews[series][0]
+                     for series in acq['_series']
+                     if series in series_previews]))
+                cached = cache['acq'].get(n_acq)
+                if cached and cached[0] == acq_digest:
+                    acq_cache[n_acq] = cached
+                else:
+                    acq_cache[n_acq] = (
+                        acq_digest, render_acquisition(
+                            n_acq, acq, template, series_previews))
+                    num_rendered += 1
+            msg('Rendered: {} / {} acquisitions'.format(
+                num_rendered, len(acquisitions)), verbose, VERB_LVL['medium'])
+            acq_html = [
+                acq_cache[n_acq][1] for n_acq, acq, acq_digest in acquisitions]
             tags = {
-                '[TIMESTAMP]': time.strftime('%c UTC', time.gmtime()),
                 '[SESSION-INFO]': get_session(info_dirpath, summary),
                 '[CUSTOM-PIL]':
                     extra['pil'] if 'pil' in extra else \
@@ -360,36 +660,169 @@ def do_report(
                 '[OPERATOR]': summary['Operator'],
                 '[ACQUISITION-TEMPLATE]': acq_html
             }
-            for tag, val in tags.items():
-                if val == 'N/A':
-                    val = ''
-                report_html = report_html.replace(tag, val)
-            # todo: improve filename (e.g. from upper folder or recalculate)
-
-            with open(out_filepath, 'w') as html_file:
-                html_file.write(report_html)
-
-            if file_format == 'pdf':
-                pdf_filename = out_basename + '.pdf'
-                msg('Report: {}'.format(pdf_filename))
-                pdf_filepath = os.path.join(out_dirpath, pdf_filename)
-                opts = (
-                    ' --page-size {}'.format('A4'),
-                    ' --margin-bottom {}'.format('15mm'),
-                    ' --margin-left {}'.format('15mm'),
-                    ' --margin-right {}'.format('15mm'),
-                    ' --margin-top {}'.format('15mm'),
-                    # ' --no-pdf-compression',  # n/a in Ubuntu 14.04
-                )
-                cmd = 'wkhtmltopdf {} {} {}'.format(
-                    ' '.join(opts), out_filepath, pdf_filepath)
-                ret_val, p_stdout, p_stderr = utl.execute(cmd, verbose=verbose)
-
+            tags = {
+                tag: ('' if val == 'N/A' else val)
+                for tag, val in tags.items()}
+            # : the timestamp is excluded from the report digest
+            # : acquisitions are included through their digests
+            report_digest = _digest(*(
+                [tpl_digests['report']] +
+                [tag + (val if isinstance(val, str) else '')
+                 for tag, val in sorted(tags.items())] +
+                [acq_cache[n_acq][0] for n_acq, acq, acq_digest
+                 in acquisitions]))
+            is_unchanged = \
+                report_digest == cache['report'] \
+                and os.path.isfile(out_filepath) \
+                and (file_format != 'pdf' or os.path.isfile(pdf_filepath))
+            if is_unchanged:
+                msg('I: Report unchanged. Use `force` to override.')
             else:
-                msg('W: Unknown format `{}`.'.format(file_format))
+                tags['[TIMESTAMP]'] = time.strftime('%c UTC', time.gmtime())
+                # todo: improve filename (e.g. from upper folder or recalculate)
+
+                # : stream the rendered chunks directly to disk
+                with open(out_filepath, 'w') as html_file:
+                    html_file.writelines(
+                        render_template(template['report'], tags))
+
+                if file_format == 'pdf':
+                    msg('Report: {}'.format(os.path.basename(pdf_filepath)))
+                    if render_pdf:
+                        timings = html_to_pdf(
+                            [(out_filepath, pdf_filepath)], verbose)
+                        if not timings[0]['success']:
+                            # : do not cache failed conversions
+                            report_digest = None
+                            pdf_error = 'Could not convert `{}` to PDF.' \
+                                .format(os.path.basename(out_filepath))
+                    else:
+                        pdf_job = out_filepath, pdf_filepath
+
+                elif file_format != 'html':
+                    msg('W: Unknown format `{}`.'.format(file_format))
+
+                if incremental:
+                    with open(cache_filepath, 'w') as cache_file:
+                        json.dump(
+                            {'acq': acq_cache, 'report': report_digest,
+                             'preview': series_previews},
+                            cache_file)
+                if pdf_error:
+                    raise IOError(pdf_error)
 
         else:
             msg('W: Acquisition information not found.')
+    else:
+        msg('I: Skipping existing output path. Use `force` to override.')
+    return pdf_job
+
+
+# ======================================================================
+def _do_report_args(args):
+    """Call `do_report()` with the positional arguments (for pools)."""
+    return do_report(*args)
+
+
+# ======================================================================
+def do_report_batch(
+        in_dirpaths,
+        out_dirpath,
+        basename='{name}_{date}_{time}_{sys}',
+        method='pydicom',
+        file_format='pdf',
+        incremental=True,
+        num_processes=None,
+        chunk_size=None,
+        timings_filepath=None,
+        previews=True,
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Create the reports of many sessions, converting them to PDF in batches.
+
+    The HTML reports are created first (in parallel), then the PDF
+    conversions are distributed over a bounded number of renderer workers,
+    each converting many reports with a single `wkhtmltopdf` process.
+
+    Args:
+        in_dirpaths (Iterable[str]): Paths to the input directories.
+            Glob patterns are expanded.
+        out_dirpath (str): Path to output directory.
+            If relative, it is interpreted as relative to the parent of
+            each input directory.
+        basename (str): The template for the report filename.
+        method (str): The extraction method (see `do_report()`).
+        file_format (str): The output format (see `do_report()`).
+        incremental (bool): Update existing reports (see `do_report()`).
+        num_processes (int|None): The number of parallel workers.
+            If None, uses the number of available CPUs.
+        chunk_size (int|None): The number of reports per renderer process.
+            If None, the reports are split evenly among the workers.
+        timings_filepath (str|None): Path to the JSON file of the timings.
+            If None, the timings are not saved.
+        previews (bool): Embed the series previews (see `do_report()`).
+        force (bool): Force new processing.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        timings (list[dict]): The PDF conversion information.
+            See `html_to_pdf()` for more details.
+    """
+    msg(':: Creating HTML and PDF reports (batch)...')
+    in_dirpaths = sorted(set(
+        os.path.realpath(dirpath)
+        for pattern in in_dirpaths for dirpath in glob.glob(pattern)
+        if os.path.isdir(dirpath)))
+    msg('Input:  {} sessions'.format(len(in_dirpaths)))
+    if num_processes is None:
+        num_processes = multiprocessing.cpu_count()
+
+    # :: create the HTML reports
+    args_list = [
+        (in_dirpath,
+         os.path.join(os.path.dirname(in_dirpath), out_dirpath),
+         basename, method, file_format, incremental, False, previews, force,
+         verbose)
+        for in_dirpath in in_dirpaths]
+    if num_processes > 1 and len(args_list) > 1:
+        pool = multiprocessing.Pool(processes=num_processes)
+        pdf_jobs = pool.map(_do_report_args, args_list)
+        pool.close()
+        pool.join()
+    else:
+        pdf_jobs = [_do_report_args(args) for args in args_list]
+    pdf_jobs = [pdf_job for pdf_job in pdf_jobs if pdf_job]
+
+    # :: convert the HTML reports to PDF
+    timings = []
+    if pdf_jobs:
+        if not chunk_size:
+            chunk_size = -(-len(pdf_jobs) // num_processes)
+        chunks = [
+            pdf_jobs[i:i + chunk_size]
+            for i in range(0, len(pdf_jobs), chunk_size)]
+        msg('PDF: {} reports in {} batches'.format(
+            len(pdf_jobs), len(chunks)))
+        pool = multiprocessing.pool.ThreadPool(
+            processes=min(num_processes, len(chunks)))
+        for chunk_timings in pool.imap(
+                functools.partial(html_to_pdf, verbose=verbose), chunks):
+            timings.extend(chunk_timings)
+        pool.close()
+        pool.join()
+    for timing in timings:
+        msg('{}: {} ({:.3f} s{})'.format(
+            'Report' if timing['success'] else 'E: Failed',
+            os.path.basename(timing['pdf']), timing['time'],
+            '' if timing['batched'] else ', single'),
+            verbose, VERB_LVL['medium'])
+    msg('PDF: {} / {} reports converted'.format(
+        sum(timing['success'] for timing in timings), len(pdf_jobs)))
+    if timings_filepath:
+        with open(timings_filepath, 'w') as timings_file:
+            json.dump(timings, timings_file, sort_keys=True, indent=4)
+    return timings
 
 
 # ======================================================================
@@ -419,9 +852,9 @@ def handle_arg():
         action='store_true',
         help='force new processing [%(default)s]')
     arg_parser.add_argument(
-        '-i', '--in_dirpath', metavar='DIR',
-        default='.',
-        help='set input directory [%(default)s]')
+        '-i', '--in_dirpaths', metavar='DIR',
+        nargs='+', default=['.'],
+        help='set input directories (many enable batch mode) [%(default)s]')
     arg_parser.add_argument(
         '-o', '--out_dirpath', metavar='DIR',
         default='.',
@@ -438,6 +871,26 @@ def handle_arg():
         '-a', '--file_format', metavar='METHOD',
         default='pdf',
         help='set output format [%(default)s]')
+    arg_parser.add_argument(
+        '-u', '--full_update',
+        action='store_true',
+        help='re-render all instead of updating incrementally [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--num_processes', metavar='NUM',
+        type=int, default=None,
+        help='set number of parallel workers (batch mode) [%(default)s]')
+    arg_parser.add_argument(
+        '-c', '--chunk_size', metavar='NUM',
+        type=int, default=None,
+        help='set number of reports per renderer (batch mode) [%(default)s]')
+    arg_parser.add_argument(
+        '-t', '--timings_filepath', metavar='FILE',
+        default=None,
+        help='save the PDF timings as JSON (batch mode) [%(default)s]')
+    arg_parser.add_argument(
+        '-w', '--no_previews',
+        action='store_true',
+        help='do not embed the series previews [%(default)s]')
     return arg_parser
 
 
@@ -456,16 +909,31 @@ def main():
     msg(__doc__.strip())
     begin_time = datetime.datetime.now()
 
-    do_report(
-        args.in_dirpath, args.out_dirpath,
-        args.basename,
-        args.method, args.file_format,
-        args.force, args.verbose)
+    exit_code = 0
+    try:
+        if len(args.in_dirpaths) == 1 \
+                and not glob.has_magic(args.in_dirpaths[0]):
+            do_report(
+                args.in_dirpaths[0], args.out_dirpath,
+                args.basename,
+                args.method, args.file_format, not args.full_update, True,
+                not args.no_previews, args.force, args.verbose)
+        else:
+            do_report_batch(
+                args.in_dirpaths, args.out_dirpath,
+                args.basename,
+                args.method, args.file_format, not args.full_update,
+                args.num_processes, args.chunk_size, args.timings_filepath,
+                not args.no_previews, args.force, args.verbose)
+    except (IOError, OSError) as e:
+        msg('E: {}'.format(e))
+        exit_code = 1
 
     exec_time = datetime.datetime.now() - begin_time
     msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return exit_code
 
 
 # ======================================================================
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -60,7 +60,7 @@ import argparse  # Parser for command-line options, arguments and sub-commands
 # import nibabel as nib  # NiBabel (NeuroImaging I/O Library)
 # import nipy  # NiPy (NeuroImaging in Python)
 # import nipype  # NiPype (NiPy Pipelines and Interfaces)
-import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+# import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 
 # :: External Imports Submodules
 # import matplotlib.pyplot as plt  # Matplotlib's pyplot: MATLAB-like syntax
@@ -76,9 +76,14 @@ import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 # import mri_tools.modules.nifti as mrn
 # from mri_tools.modules.sequences import mp2rage
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import catalogue as ctg
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+pydcm = lazy_import('pydicom')  # PyDicom (Read, modify and write DICOM files.)
 
 
 # ======================================================================
@@ -86,7 +91,8 @@ def sorting(
         dirpath,
         summary=utl.D_SUMMARY + '.' + utl.EXT['json'],
         force=False,
-        verbose=D_VERB_LVL):
+        verbose=D_VERB_LVL,
+        catalogue_filepath=None):
     """
     Sort DICOM files for series and acquisition.
 
@@ -97,6 +103,10 @@ def sorting(
         summary (str): File name or path where to save grouping summary.
         force (bool): Force new processing.
         verbose (int): Set level of verbosity.
+        catalogue_filepath (str|None): Path to the catalogue.
+            The location of the moved files is updated.
+            If None, the catalogue is not used.
+            See `dcmpi.catalogue.Catalogue` for more details.
 
     Returns:
         summary (dict): Summary of acquisitions .
@@ -121,14 +131,12 @@ def sorting(
             msg('W: failed processing `{}`'.format(in_filepath),
                 verbose, VERB_LVL['debug'])
         else:
-            src_id = utl.INFO_SEP.join(
-                (utl.PREFIX_ID['series'] +
-                 '{:0{size}d}'.format(dcm.SeriesNumber, size=utl.D_NUM_DIGITS),
-                 dcm.SeriesDescription))
+            src_id = utl.get_series_id(dcm)
             if src_id not in sorted_sources:
                 sorted_sources[src_id] = []
             sorted_sources[src_id].append(in_filepath)
     # :: move dicom files to serie number folder
+    moved = {}
     for src_id, sources in sorted(sorted_sources.items()):
         out_subdirpath = os.path.join(dirpath, src_id)
         if not os.path.exists(out_subdirpath) or force:
@@ -138,17 +146,49 @@ def sorting(
                 out_filepath = os.path.join(
                     out_subdirpath, os.path.basename(in_filepath))
                 shutil.move(in_filepath, out_filepath)
+                moved[in_filepath] = out_filepath
+    if catalogue_filepath and moved:
+        catalogue = ctg.Catalogue(catalogue_filepath)
+        catalogue.move(moved)
+        catalogue.close()
     if summary:
-        summary_dirpath = os.path.dirname(summary)
-        if summary_dirpath:
-            if not os.path.exists(summary_dirpath):
-                os.makedirs(os.path.dirname(summary))
-        else:
-            summary = os.path.join(dirpath, summary)
-        summary = utl.group_series(dirpath, summary, force, verbose)
+        summary = grouping(dirpath, summary, force, verbose)
     return summary
 
 
+# ======================================================================
+def grouping(
+        dirpath,
+        summary=utl.D_SUMMARY + '.' + utl.EXT['json'],
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Group sorted DICOM series for acquisition.
+
+    Results are saved to a summary file.
+
+    Args:
+        dirpath (str): Path containing sorted DICOM files.
+        summary (str): File name or path where to save grouping summary.
+        force (bool): Force new processing.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        summary (dict): Summary of acquisitions .
+
+    See Also:
+        dcmpi.common.group_series, dcmpi.do_sorting.sorting
+    """
+    dirpath = os.path.realpath(dirpath)
+    summary_dirpath = os.path.dirname(summary)
+    if summary_dirpath:
+        if not os.path.exists(summary_dirpath):
+            os.makedirs(os.path.dirname(summary))
+    else:
+        summary = os.path.join(dirpath, summary)
+    return utl.group_series(dirpath, summary, force, verbose)
+
+
 # ======================================================================
 def handle_arg():
     """
@@ -41,7 +41,7 @@ import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 # import nibabel as nib  # NiBabel (NeuroImaging I/O Library)
 # import nipy  # NiPy (NeuroImaging in Python)
 # import nipype  # NiPype (NiPy Pipelines and Interfaces)
-import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+# import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 
 # :: External Imports Submodules
 # import matplotlib.pyplot as plt  # Matplotlib's pyplot: MATLAB-like syntax
@@ -59,9 +59,138 @@ import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 # from mri_tools.modules.sequences import mp2rage
 import dcmpi.util as utl
 import dcmpi.custom_info as custom_info
-from dcmpi import INFO, PATH
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+pydcm = lazy_import('pydicom')  # PyDicom (Read, modify and write DICOM files.)
+
+
+# ======================================================================
+def _add_duration(info, verbose=D_VERB_LVL):
+    """
+    Add the `Duration` field computed from the begin/end date and time.
+
+    Args:
+        info (dict): The information extracted from the DICOM.
+            Must contain `BeginDate`, `BeginTime`, `EndDate`, `EndTime`.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        info (dict): The updated information.
+    """
+    field_id = 'Duration'
+    try:
+        begin_time = time.mktime(time.strptime(
+            info['BeginDate'] + '_' + info['BeginTime'],
+            '%Y-%m-%d_%H:%M:%S'))
+        end_time = time.mktime(time.strptime(
+            info['EndDate'] + '_' + info['EndTime'],
+            '%Y-%m-%d_%H:%M:%S'))
+        field_val = str(datetime.timedelta(0, end_time - begin_time))
+    except Exception as e:
+        print(e)
+        field_val = 'N/A'
+        msg('W: Cannot process `{}`.'.format(field_id),
+            verbose, VERB_LVL['medium'])
+    finally:
+        info[field_id] = field_val
+    return info
+
+
+# ======================================================================
+def get_session_info(
+        sources,
+        groups,
+        verbose=D_VERB_LVL):
+    """
+    Extract the session information from sorted DICOM sources.
+
+    The information is read from the last original image of the session.
+
+    Args:
+        sources (dict): The DICOM sources as obtained from `utl.dcm_sources()`.
+        groups (dict): The series grouping as obtained from
+            `utl.group_series()`.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        info (dict): The session information.
+    """
+    info = {'_measurements': groups}
+    # info['_sources'] = sources  # DEBUG
+    try:
+        read_next_dicom = True
+        idx = -1
+        while read_next_dicom:
+            # get last dicom
+            in_filepath = sorted(sources.items())[idx][1][-1]
+            dcm = pydcm.read_file(in_filepath)
+            stop = 'PixelData' in dcm and \
+                   'ImageType' in dcm and 'ORIGINAL' in dcm.ImageType
+            if stop:
+                read_next_dicom = False
+            else:
+                idx -= 1
+
+    except Exception as e:
+        print(sources)
+        msg('E: failed during get_info (exception: {})'.format(e))
+    else:
+        # DICOM's-ready information
+        info.update(utl.postprocess_info(
+            dcm, custom_info.SESSION,
+            lambda x, p: str(x.value), verbose))
+        # additional information: duration
+        _add_duration(info, verbose)
+    return info
+
+
+# ======================================================================
+def get_acquisition_info(
+        sources,
+        group,
+        verbose=D_VERB_LVL):
+    """
+    Extract the acquisition information from sorted DICOM sources.
+
+    The information is read from the last DICOM of the first series of the
+    acquisition, and it includes the information from the protocol.
+
+    Args:
+        sources (dict): The DICOM sources as obtained from `utl.dcm_sources()`.
+        group (list[str]): The series of the acquisition.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        info (dict): The acquisition information.
+    """
+    info = {'_series': group}
+    in_filepath = sorted(sources[group[0]])[-1]
+    try:
+        dcm = pydcm.read_file(in_filepath)
+    except Exception as e:
+        print(e)
+        msg('E: failed processing \'{}\''.format(in_filepath))
+    else:
+        info.update(utl.postprocess_info(
+            dcm, custom_info.ACQUISITION,
+            lambda x, p: str(x.value), verbose))
+        # information from protocol
+        if utl.DCM_ID['hdr_nfo'] in dcm:
+            prot_src = dcm[utl.DCM_ID['hdr_nfo']].value
+            prot = utl.parse_protocol(
+                utl.get_protocol(prot_src))
+        else:
+            prot = {}
+        info.update(utl.postprocess_info(
+            prot, custom_info.get_sequence_info(info, prot),
+            None, verbose))
+        # additional information: duration
+        _add_duration(info, verbose)
+    return info
 
 
 # ======================================================================
@@ -112,48 +241,7 @@ def get_info(
             out_filepath = os.path.join(
                 out_dirpath, utl.D_SUMMARY + '.' + utl.ID['info'])
             out_filepath += ('.' + utl.EXT['json']) if type_ext else ''
-            info = {'_measurements': groups}
-            # info['_sources'] = sources  # DEBUG
-            try:
-                read_next_dicom = True
-                idx = -1
-                while read_next_dicom:
-                    # get last dicom
-                    in_filepath = sorted(sources.items())[idx][1][-1]
-                    dcm = pydcm.read_file(in_filepath)
-                    stop = 'PixelData' in dcm and \
-                           'ImageType' in dcm and 'ORIGINAL' in dcm.ImageType
-                    if stop:
-                        read_next_dicom = False
-                    else:
-                        idx -= 1
-
-            except Exception as e:
-                print(sources)
-                msg('E: failed during get_info (exception: {})'.format(e))
-            else:
-                # DICOM's-ready information
-                info.update(utl.postprocess_info(
-                    dcm, custom_info.SESSION,
-                    lambda x, p: str(x.value), verbose))
-                # additional information: duration
-                field_id = 'Duration'
-                try:
-                    begin_time = time.mktime(time.strptime(
-                        info['BeginDate'] + '_' + info['BeginTime'],
-                        '%Y-%m-%d_%H:%M:%S'))
-                    end_time = time.mktime(time.strptime(
-                        info['EndDate'] + '_' + info['EndTime'],
-                        '%Y-%m-%d_%H:%M:%S'))
-                    field_val = str(
-                        datetime.timedelta(0, end_time - begin_time))
-                except Exception as e:
-                    print(e)
-                    field_val = 'N/A'
-                    msg('W: Cannot process `{}`.'.format(field_id),
-                        verbose, VERB_LVL['medium'])
-                finally:
-                    info[field_id] = field_val
+            info = get_session_info(sources, groups, verbose)
             msg('Info: {}'.format(out_filepath[len(out_dirpath):]))
             with open(out_filepath, 'w') as info_file:
                 json.dump(info, info_file, sort_keys=True, indent=4)
@@ -163,48 +251,7 @@ def get_info(
                 out_filepath = os.path.join(
                     out_dirpath, group_id + '.' + utl.ID['info'])
                 out_filepath += ('.' + utl.EXT['json']) if type_ext else ''
-                info = {'_series': group}
-                in_filepath = sorted(
-                    sources[groups[group_id][0]])[-1]
-                try:
-                    dcm = pydcm.read_file(in_filepath)
-                except Exception as e:
-                    print(e)
-                    msg('E: failed processing \'{}\''.format(in_filepath))
-                else:
-                    info.update(utl.postprocess_info(
-                        dcm, custom_info.ACQUISITION,
-                        lambda x, p: str(x.value), verbose))
-                    # information from protocol
-                    if utl.DCM_ID['hdr_nfo'] in dcm:
-                        prot_src = dcm[utl.DCM_ID['hdr_nfo']].value
-                        prot = utl.parse_protocol(
-                            utl.get_protocol(prot_src))
-                    else:
-                        prot = {}
-                    info.update(utl.postprocess_info(
-                        prot, custom_info.get_sequence_info(info, prot),
-                        None, verbose))
-                    # additional information: duration
-                    field_id = 'Duration'
-                    try:
-                        begin_time = time.mktime(time.strptime(
-                            info['BeginDate'] + '_' +
-                            info['BeginTime'],
-                            '%Y-%m-%d_%H:%M:%S'))
-                        end_time = time.mktime(time.strptime(
-                            info['EndDate'] + '_' +
-                            info['EndTime'],
-                            '%Y-%m-%d_%H:%M:%S'))
-                        field_val = str(
-                            datetime.timedelta(0, end_time - begin_time))
-                    except Exception as e:
-                        print(e)
-                        field_val = 'N/A'
-                        msg('W: Cannot process `{}`.'.format(field_id),
-                            verbose, VERB_LVL['medium'])
-                    finally:
-                        info[field_id] = field_val
+                info = get_acquisition_info(sources, group, verbose)
                 msg('Info: {}'.format(out_filepath[len(out_dirpath):]))
                 with open(out_filepath, 'w') as info_file:
                     json.dump(info, info_file, sort_keys=True, indent=4)
@@ -215,6 +262,7 @@ def get_info(
                     out_dirpath, src_id + '.' + utl.ID['info'])
                 out_filepath += ('.' + utl.EXT['json']) if type_ext else ''
                 info = {}
+                in_filepath = in_filepath_list[-1]
                 for acq, series in groups.items():
                     if src_id in series:
                         info['_acquisition'] = acq
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Extract information from many DICOM sessions and store it as a single table.
+
+Note: specifically extract the session and acquisition information (as in
+`get_info`) from sorted DICOM directories, producing one row per acquisition
+in a consolidated columnar file (SQLite or Parquet).
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import datetime  # Basic date and time types
+import argparse  # Parser for command-line options, arguments and sub-commands
+import functools  # Higher-order functions and operations on callable objects
+import multiprocessing  # Process-based parallelism
+import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import glob  # Unix style pathname pattern expansion
+import sqlite3  # DB-API 2.0 interface for SQLite databases
+import contextlib  # Utilities for with-statement contexts
+
+# :: External Imports
+
+# :: External Imports Submodules
+
+# :: Local Imports
+import dcmpi.util as utl
+from dcmpi.get_info import get_session_info, get_acquisition_info
+from dcmpi import INFO
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+
+# ======================================================================
+TABLE_EXT = {
+    'sqlite': 'sqlite',
+    'parquet': 'parquet',
+}
+
+TABLE_NAME = 'acquisitions'
+
+# session information to be included in each acquisition row
+SESSION_PREFIX = 'Session'
+SESSION_ID = '_session'
+ACQUISITION_ID = '_acquisition'
+INDEXED_COLUMNS = (
+    SESSION_ID,
+    SESSION_PREFIX + 'PatientID',
+    SESSION_PREFIX + 'BeginDate',
+    SESSION_PREFIX + 'StationName',
+    SESSION_PREFIX + 'StudyDescription',
+)
+
+
+# ======================================================================
+def _to_cell(val):
+    """
+    Convert a value to a type that can be stored in a table cell.
+
+    Args:
+        val: The input value.
+
+    Returns:
+        val (str|int|float|None): The cell value.
+            Containers are JSON-encoded, 'N/A' is converted to None.
+    """
+    if val is None or val == 'N/A':
+        val = None
+    elif isinstance(val, bool):
+        val = int(val)
+    elif not isinstance(val, (str, int, float)):
+        val = json.dumps(val, sort_keys=True)
+    return val
+
+
+# ======================================================================
+def get_session_rows(
+        in_dirpath,
+        verbose=D_VERB_LVL):
+    """
+    Extract one row per acquisition from a sorted DICOM directory.
+
+    Args:
+        in_dirpath (str): Path to the sorted DICOM directory.
+            If a grouping summary is present, it is used instead of
+            re-computing the grouping.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        rows (list[dict]): The acquisition rows.
+            Each row contains the acquisition information, the session
+            information (with keys prefixed by `SESSION_PREFIX`), and the
+            session and acquisition identifiers.
+    """
+    summary = utl.D_SUMMARY + '.' + utl.EXT['json']
+    if not os.path.isfile(os.path.join(in_dirpath, summary)):
+        summary = None
+    rows = []
+    try:
+        sources = utl.dcm_sources(in_dirpath)
+        groups = utl.group_series(in_dirpath, summary, verbose=verbose)
+        session = get_session_info(sources, groups, verbose)
+        session.pop('_measurements', None)
+        session = {
+            SESSION_PREFIX + key: _to_cell(val)
+            for key, val in session.items()}
+        for group_id, group in sorted(groups.items()):
+            if not group_id.startswith(utl.PREFIX_ID['acq']):
+                continue
+            row = {
+                key: _to_cell(val)
+                for key, val in
+                get_acquisition_info(sources, group, verbose).items()}
+            row.update(session)
+            row[SESSION_ID] = in_dirpath
+            row[ACQUISITION_ID] = group_id
+            rows.append(row)
+    except Exception as e:
+        print(e)
+        msg('E: failed processing `{}`'.format(in_dirpath))
+    return rows
+
+
+# ======================================================================
+def _save_sqlite(rows, out_filepath, in_dirpaths):
+    """
+    Save (or update) the acquisition rows to a SQLite database.
+
+    Rows from previously stored sessions found in `in_dirpaths` are replaced.
+    Missing columns are added to the existing table.
+
+    Args:
+        rows (Iterable[dict]): The acquisition rows.
+        out_filepath (str): Path to the SQLite database.
+        in_dirpaths (Iterable[str]): The sessions being (re-)processed.
+
+    Returns:
+        None.
+    """
+    def quote(name):
+        return '"{}"'.format(name.replace('"', '""'))
+
+    rows = list(rows)
+    columns = sorted(set(key for row in rows for key in row))
+    # : the connection context only commits (or rolls back), not closes
+    with contextlib.closing(sqlite3.connect(out_filepath)) as conn, conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS {} ({})'.format(
+            quote(TABLE_NAME), ', '.join(
+                quote(column) for column in (SESSION_ID, ACQUISITION_ID))))
+        old_columns = set(
+            item[1] for item in
+            conn.execute('PRAGMA table_info({})'.format(quote(TABLE_NAME))))
+        for column in columns:
+            if column not in old_columns:
+                conn.execute('ALTER TABLE {} ADD COLUMN {}'.format(
+                    quote(TABLE_NAME), quote(column)))
+        for column in INDEXED_COLUMNS:
+            if column in columns or column in old_columns:
+                conn.execute('CREATE INDEX IF NOT EXISTS {} ON {} ({})'.format(
+                    quote('idx_' + column), quote(TABLE_NAME), quote(column)))
+        conn.executemany(
+            'DELETE FROM {} WHERE {} = ?'.format(
+                quote(TABLE_NAME), quote(SESSION_ID)),
+            [(in_dirpath,) for in_dirpath in in_dirpaths])
+        if columns:
+            conn.executemany(
+                'INSERT INTO {} ({}) VALUES ({})'.format(
+                    quote(TABLE_NAME),
+                    ', '.join(quote(column) for column in columns),
+                    ', '.join('?' for column in columns)),
+                [[row.get(column) for column in columns] for row in rows])
+
+
+# ======================================================================
+def _save_parquet(rows, out_filepath):
+    """
+    Save the acquisition rows to a Parquet file.
+
+    Requires the optional `pyarrow` package.
+
+    Args:
+        rows (Iterable[dict]): The acquisition rows.
+        out_filepath (str): Path to the Parquet file.
+
+    Returns:
+        None.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = list(rows)
+    columns = sorted(set(key for row in rows for key in row))
+    # : mixed types in the same column are stored as strings
+    table = pa.Table.from_pydict({
+        column: [
+            None if row.get(column) is None else str(row.get(column))
+            for row in rows]
+        for column in columns})
+    pq.write_table(table, out_filepath)
+
+
+# ======================================================================
+def get_info_table(
+        in_dirpaths,
+        out_filepath,
+        method='sqlite',
+        num_processes=None,
+        force=False,
+        verbose=D_VERB_LVL):
+    """
+    Extract acquisition information from many sessions into a single table.
+
+    Args:
+        in_dirpaths (Iterable[str]): Paths to sorted DICOM directories.
+            Glob patterns are expanded.
+        out_filepath (str): Path to the output table file.
+        method (str): The table format.
+            Accepted values:
+             - 'sqlite': Use a SQLite database (sessions can be appended).
+             - 'parquet': Use Apache Parquet (requires `pyarrow`).
+        num_processes (int|None): The number of parallel processes.
+            If None, uses the number of available CPUs.
+            If 1, no process pool is used.
+        force (bool): Force new processing.
+            If False, for SQLite only the sessions not already stored are
+            processed, for Parquet nothing is done if the output exists.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        num_rows (int): The number of acquisition rows written.
+
+    See Also:
+        dcmpi.get_info.get_info
+    """
+    msg(':: Exporting CUSTOM information table ({})...'.format(method))
+    in_dirpaths = sorted(set(
+        os.path.realpath(dirpath)
+        for pattern in in_dirpaths for dirpath in glob.glob(pattern)
+        if os.path.isdir(dirpath)))
+    msg('Input:  {} sessions'.format(len(in_dirpaths)))
+    msg('Output: {}'.format(out_filepath))
+    num_rows = 0
+    if method not in TABLE_EXT:
+        msg('W: Unknown method `{}`.'.format(method))
+        return num_rows
+
+    out_dirpath = os.path.dirname(out_filepath)
+    if out_dirpath and not os.path.isdir(out_dirpath):
+        os.makedirs(out_dirpath)
+    if os.path.exists(out_filepath) and not force:
+        if method == 'sqlite':
+            with contextlib.closing(sqlite3.connect(out_filepath)) as conn:
+                try:
+                    done = set(item[0] for item in conn.execute(
+                        'SELECT DISTINCT "{}" FROM "{}"'.format(
+                            SESSION_ID, TABLE_NAME)))
+                except sqlite3.OperationalError:
+                    done = set()
+            num_dirpaths = len(in_dirpaths)
+            in_dirpaths = [
+                dirpath for dirpath in in_dirpaths if dirpath not in done]
+            msg('I: Skipping {} stored sessions. Use `force` to override.'
+                .format(num_dirpaths - len(in_dirpaths)),
+                verbose, VERB_LVL['medium'])
+        else:
+            msg('I: Skipping existing output path. Use `force` to override.')
+            return num_rows
+
+    if num_processes is None:
+        num_processes = multiprocessing.cpu_count()
+    worker = functools.partial(get_session_rows, verbose=verbose)
+    if num_processes > 1 and len(in_dirpaths) > 1:
+        pool = multiprocessing.Pool(processes=num_processes)
+        rows_list = pool.map(worker, in_dirpaths)
+        pool.close()
+        pool.join()
+    else:
+        rows_list = [worker(in_dirpath) for in_dirpath in in_dirpaths]
+    rows = [row for rows in rows_list for row in rows]
+    num_rows = len(rows)
+
+    if method == 'sqlite':
+        _save_sqlite(rows, out_filepath, in_dirpaths)
+    elif method == 'parquet':
+        try:
+            _save_parquet(rows, out_filepath)
+        except ImportError:
+            num_rows = 0
+            msg('E: Method `{}` requires `pyarrow`.'.format(method))
+    msg('Table: {} rows from {} sessions'.format(num_rows, len(in_dirpaths)))
+    return num_rows
+
+
+# ======================================================================
+def handle_arg():
+    """
+    Handle command-line application arguments.
+    """
+    # :: Create Argument Parser
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog=fmtm('v.{version} - {author}\n{license}', INFO),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    # :: Add POSIX standard arguments
+    arg_parser.add_argument(
+        '--ver', '--version',
+        version=fmt(
+            '%(prog)s - ver. {version}\n{}\n{copyright} {author}\n{notice}',
+            next(line for line in __doc__.splitlines() if line), **INFO),
+        action='version')
+    arg_parser.add_argument(
+        '-v', '--verbose',
+        action='count', default=D_VERB_LVL,
+        help='increase the level of verbosity [%(default)s]')
+    # :: Add additional arguments
+    arg_parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='force new processing [%(default)s]')
+    arg_parser.add_argument(
+        '-i', '--in_dirpaths', metavar='DIR',
+        nargs='+', default=['.'],
+        help='set input directories (glob patterns accepted) [%(default)s]')
+    arg_parser.add_argument(
+        '-o', '--out_filepath', metavar='FILE',
+        default='info.' + TABLE_EXT['sqlite'],
+        help='set output file [%(default)s]')
+    arg_parser.add_argument(
+        '-m', '--method', metavar='sqlite|parquet',
+        default='sqlite',
+        help='set table format [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--num_processes', metavar='NUM',
+        type=int, default=None,
+        help='set number of parallel processes [%(default)s]')
+    return arg_parser
+
+
+# ======================================================================
+def main():
+    """
+    Main entry point for the script.
+    """
+    # :: handle program parameters
+    arg_parser = handle_arg()
+    args = arg_parser.parse_args()
+    # :: print debug info
+    if args.verbose >= VERB_LVL['debug']:
+        arg_parser.print_help()
+        msg('\nARGS: ' + str(vars(args)), args.verbose, VERB_LVL['debug'])
+    msg(__doc__.strip())
+    begin_time = datetime.datetime.now()
+
+    get_info_table(
+        args.in_dirpaths, args.out_filepath,
+        args.method, args.num_processes,
+        args.force, args.verbose)
+
+    exec_time = datetime.datetime.now() - begin_time
+    msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
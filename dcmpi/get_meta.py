@@ -40,7 +40,7 @@ import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 # import nibabel as nib  # NiBabel (NeuroImaging I/O Library)
 # import nipy  # NiPy (NeuroImaging in Python)
 # import nipype  # NiPype (NiPy Pipelines and Interfaces)
-import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+# import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 
 # :: External Imports Submodules
 # import matplotlib.pyplot as plt  # Matplotlib's pyplot: MATLAB-like syntax
@@ -57,9 +57,43 @@ import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 # import mri_tools.modules.geometry as mrg
 # from mri_tools.modules.sequences import mp2rage
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+pydcm = lazy_import('pydicom')  # PyDicom (Read, modify and write DICOM files.)
+
+
+# ======================================================================
+def get_series_meta(
+        filepaths,
+        verbose=D_VERB_LVL):
+    """
+    Extract the metadata of a DICOM series (using PyDICOM).
+
+    Args:
+        filepaths (Iterable[str]): The paths to the DICOM files of a series.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        info_dict (dict): The metadata, merged from all files.
+            Files that cannot be read are skipped.
+    """
+    info_dict = {}
+    for in_filepath in filepaths:
+        try:
+            dcm = pydcm.read_file(in_filepath)
+        except Exception as e:
+            msg('E: failed processing `{}`'.format(in_filepath),
+                verbose, D_VERB_LVL)
+            msg('E: ...with exception: {}'.format(e),
+                verbose, VERB_LVL['debug'])
+        else:
+            dcm_dict = utl.dcm_dump(dcm)
+            info_dict = utl.dcm_merge_info(info_dict, dcm_dict)
+    return info_dict
 
 
 # ======================================================================
@@ -113,18 +147,7 @@ def get_meta(
                 out_filepath = os.path.join(
                     out_dirpath, src_id + '.' + utl.ID['meta'])
                 out_filepath += ('.' + utl.EXT['json']) if type_ext else ''
-                info_dict = {}
-                for in_filepath in in_filepath_list:
-                    try:
-                        dcm = pydcm.read_file(in_filepath)
-                    except Exception as e:
-                        msg('E: failed processing `{}`'.format(in_filepath),
-                            verbose, D_VERB_LVL)
-                        msg('E: ...with exception: {}'.format(e),
-                            verbose, VERB_LVL['debug'])
-                    else:
-                        dcm_dict = utl.dcm_dump(dcm)
-                        info_dict = utl.dcm_merge_info(info_dict, dcm_dict)
+                info_dict = get_series_meta(in_filepath_list, verbose)
                 msg('Meta: {}'.format(out_filepath[len(out_dirpath):]),
                     verbose, D_VERB_LVL)
                 with open(out_filepath, 'w') as info_file:
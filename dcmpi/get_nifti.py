@@ -28,6 +28,7 @@ from __future__ import (
 # ======================================================================
 # :: Python Standard Library Imports
 import os  # Miscellaneous operating system interfaces
+import sys  # System-specific parameters and functions
 # import shutil  # High-level file operations
 # import math  # Mathematical functions
 import time  # Time access and conversions
@@ -62,15 +63,161 @@ import glob  # Unix style pathname pattern expansion
 # import scipy.integrate  # SciPy: Integrations facilities
 # import scipy.constants  # SciPy: Mathematal and Physical Constants
 # import scipy.ndimage  # SciPy: ND-image Manipulation
-import dicom2nifti
+# import dicom2nifti  # DICOM to NIfTI conversion (imported on use)
 
 # :: Local Imports
 import dcmpi.util as utl
-from dcmpi import INFO, PATH
+from dcmpi import INFO
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
 
 
+# ======================================================================
+def get_series_nifti(
+        in_dirpath,
+        out_dirpath,
+        src_id,
+        method='dcm2niix',
+        compressed=True,
+        merged=True,
+        verbose=D_VERB_LVL):
+    """
+    Extract the images of a sorted DICOM series and store them as NIfTI.
+
+    Args:
+        in_dirpath (str): Input path containing sorted DICOM files.
+        out_dirpath (str): Output path where to store NIfTI images.
+            It must exist.
+        src_id (str): The series ID (i.e. the series sub-directory name).
+        method (str): DICOM to NIfTI conversion method.
+            See `get_nifti()` for the accepted values.
+        compressed (bool): Produce compressed NIfTI using GNU Zip.
+        merged (bool): Merge images in the 4th dimension.
+            Not supported by all methods.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        None.
+    """
+    d_ext = '.' + (utl.EXT['niz'] if compressed else utl.EXT['nii'])
+    in_filepath = os.path.join(in_dirpath, src_id)
+    if method == 'dicom2nifti':
+        import dicom2nifti
+
+        out_filepath = os.path.join(out_dirpath, src_id + d_ext)
+        dicom2nifti.dicom_series_to_nifti(
+            in_filepath, out_filepath, reorient_nifti=True)
+
+    elif method == 'dcm2nii':
+        # produce nifti file
+        opts = ' -f n '  # influences the filename
+        opts += ' -t n -p n -i n -d n -e y'
+        opts += ' -4 ' + ('y' if merged else 'n')
+        opts += ' -g ' + ('y' if compressed else 'n')
+        cmd = method + ' {} -o {} {}'.format(
+            opts, out_dirpath, in_filepath)
+        ret_val, p_stdout, p_stderr = utl.execute(cmd, verbose=verbose)
+        _check_available(method, ret_val)
+        term_str = 'GZip...' if compressed else 'Saving '
+        lines = p_stdout.split('\n') if p_stdout else ()
+        # parse result
+        old_names = []
+        for line in lines:
+            if term_str in line:
+                old_name = line[line.find(term_str) + len(term_str):]
+                old_names.append(old_name)
+        if old_names:
+            msg('Parsed names: ', verbose, VERB_LVL['debug'])
+            msg(''.join([': {}\n'.format(n) for n in old_names]),
+                verbose, VERB_LVL['debug'])
+        else:
+            msg('E: Could not locate filename in `dcm2nii`.')
+        _rename_outputs(out_dirpath, old_names, src_id, d_ext)
+
+    elif method == 'dcm2niix':
+        # : the temporary name is unique to allow concurrent conversions
+        tmp_name = '__img{}__'.format(os.getpid())
+        # produce nifti file
+        opts = ' -f {} '.format(tmp_name)  # set the filename
+        opts += ' -9 -t n -p y -i n -d n -b n '
+        opts += ' -z ' + ('y' if compressed else 'n')
+        cmd = method + ' {} -o {} {}'.format(
+            opts, out_dirpath, in_filepath)
+        ret_val, p_stdout, p_stderr = utl.execute(cmd, verbose=verbose)
+        _check_available(method, ret_val)
+        old_names = sorted(glob.glob(os.path.join(
+            out_dirpath, tmp_name + '*.nii' + ('.gz' if compressed else ''))))
+        _rename_outputs(out_dirpath, old_names, src_id, d_ext)
+
+    elif method == 'isis':
+        out_filepath = os.path.join(out_dirpath, src_id + d_ext)
+        cmd = 'isisconv -in {} -out {}'.format(
+            in_filepath, out_filepath)
+        ret_val, p_stdout, p_stderr = utl.execute(cmd, verbose=verbose)
+        _check_available('isisconv', ret_val)
+        if merged:
+            # TODO: implement volume merging
+            msg('W: (isisconv) merging after not implemented.',
+                verbose, VERB_LVL['medium'])
+
+    else:
+        msg('W: Unknown method `{}`.'.format(method))
+
+
+# ======================================================================
+def _check_available(tool, ret_val):
+    """
+    Check that an external tool was run.
+
+    Args:
+        tool (str): The name of the external tool.
+        ret_val (int|None): The return code of the tool.
+            None if it could not be run (e.g. not in $PATH).
+
+    Returns:
+        None.
+
+    Raises:
+        OSError: If the tool could not be run.
+    """
+    if ret_val is None:
+        raise OSError('`{}` is not available.'.format(tool))
+
+
+# ======================================================================
+def _rename_outputs(
+        out_dirpath,
+        old_names,
+        src_id,
+        d_ext):
+    """
+    Rename the images produced by the external tools after the series ID.
+
+    Args:
+        out_dirpath (str): Output path where the NIfTI images are stored.
+        old_names (Iterable[str]): The names of the images produced.
+        src_id (str): The series ID.
+        d_ext (str): The NIfTI file extension (including the dot).
+
+    Returns:
+        None.
+    """
+    if len(old_names) == 1:
+        old_filepath = os.path.join(out_dirpath, old_names[0])
+        out_filepath = os.path.join(out_dirpath, src_id + d_ext)
+        msg('NIfTI: {}'.format(out_filepath[len(out_dirpath):]))
+        os.rename(old_filepath, out_filepath)
+    else:
+        for num, old_name in enumerate(old_names):
+            old_filepath = os.path.join(out_dirpath, old_name)
+            out_filepath = os.path.join(
+                out_dirpath,
+                src_id + utl.INFO_SEP + str(num + 1) + d_ext)
+            msg('NIfTI: {}'.format(
+                out_filepath[len(out_dirpath):]))
+            os.rename(old_filepath, out_filepath)
+
+
 # ======================================================================
 def get_nifti(
         in_dirpath,
@@ -112,97 +259,10 @@ def get_nifti(
         if not os.path.exists(out_dirpath):
             os.makedirs(out_dirpath)
         sources = utl.dcm_sources(in_dirpath)
-        d_ext = '.' + utl.EXT['niz'] if compressed else utl.EXT['nii']
-
-        # :: extract nifti
-        if method == 'dicom2nifti':
-            for src_id in sorted(sources.keys()):
-                in_filepath = os.path.join(in_dirpath, src_id)
-                out_filepath = os.path.join(out_dirpath, src_id + d_ext)
-                dicom2nifti.dicom_series_to_nifti(
-                    in_filepath, out_filepath, reorient_nifti=True)
-
-        elif method == 'dcm2nii':
-            for src_id in sorted(sources.keys()):
-                in_filepath = os.path.join(in_dirpath, src_id)
-                # produce nifti file
-                opts = ' -f n '  # influences the filename
-                opts += ' -t n -p n -i n -d n -e y'
-                opts += ' -4 ' + 'y' if merged else 'n'
-                opts += ' -g ' + 'y' if compressed else 'n'
-                cmd = method + ' {} -o {} {}'.format(
-                    opts, out_dirpath, in_filepath)
-                ret_val, p_stdout, p_stderr = utl.execute(cmd, verbose=verbose)
-                term_str = 'GZip...' if compressed else 'Saving '
-                lines = p_stdout.split('\n') if p_stdout else ()
-                # parse result
-                old_names = []
-                for line in lines:
-                    if term_str in line:
-                        old_name = line[line.find(term_str) + len(term_str):]
-                        old_names.append(old_name)
-                if old_names:
-                    msg('Parsed names: ', verbose, VERB_LVL['debug'])
-                    msg(''.join([': {}\n'.format(n) for n in old_names]),
-                        verbose, VERB_LVL['debug'])
-                else:
-                    msg('E: Could not locate filename in `dcm2nii`.')
-                if len(old_names) == 1:
-                    old_filepath = os.path.join(out_dirpath, old_names[0])
-                    out_filepath = os.path.join(out_dirpath, src_id + d_ext)
-                    msg('NIfTI: {}'.format(out_filepath[len(out_dirpath):]))
-                    os.rename(old_filepath, out_filepath)
-                else:
-                    for num, old_name in enumerate(old_names):
-                        old_filepath = os.path.join(out_dirpath, old_name)
-                        out_filepath = os.path.join(
-                            out_dirpath,
-                            src_id + utl.INFO_SEP + str(num + 1) + d_ext)
-                        msg('NIfTI: {}'.format(
-                            out_filepath[len(out_dirpath):]))
-                        os.rename(old_filepath, out_filepath)
-
-        elif method == 'dcm2niix':
-            for src_id in sorted(sources.keys()):
-                in_filepath = os.path.join(in_dirpath, src_id)
-                # produce nifti file
-                opts = ' -f __img__ '  # set the filename
-                opts += ' -9 -t n -p y -i n -d n -b n '
-                opts += ' -z ' + 'y' if compressed else 'n'
-                cmd = method + ' {} -o {} {}'.format(
-                    opts, out_dirpath, in_filepath)
-                utl.execute(cmd, verbose=verbose)
-                old_names = glob.glob(os.path.join(
-                    out_dirpath, '__img__*.nii' + '.gz' if compressed else ''))
-                if len(old_names) == 1:
-                    old_filepath = os.path.join(out_dirpath, old_names[0])
-                    out_filepath = os.path.join(out_dirpath, src_id + d_ext)
-                    msg('NIfTI: {}'.format(out_filepath[len(out_dirpath):]))
-                    os.rename(old_filepath, out_filepath)
-                else:
-                    for num, old_name in enumerate(old_names):
-                        old_filepath = os.path.join(out_dirpath, old_name)
-                        out_filepath = os.path.join(
-                            out_dirpath,
-                            src_id + utl.INFO_SEP + str(num + 1) + d_ext)
-                        msg('NIfTI: {}'.format(
-                            out_filepath[len(out_dirpath):]))
-                        os.rename(old_filepath, out_filepath)
-
-        elif method == 'isis':
-            for src_id in sorted(sources.keys()):
-                in_filepath = os.path.join(in_dirpath, src_id)
-                out_filepath = os.path.join(out_dirpath, src_id + d_ext)
-                cmd = 'isisconv -in {} -out {}'.format(
-                    in_filepath, out_filepath)
-                ret_val, p_stdout, p_stderr = utl.execute(cmd, verbose=verbose)
-                if merged:
-                    # TODO: implement volume merging
-                    msg('W: (isisconv) merging after not implemented.',
-                        verbose, VERB_LVL['medium'])
-
-        else:
-            msg('W: Unknown method `{}`.'.format(method))
+        for src_id in sorted(sources.keys()):
+            get_series_nifti(
+                in_dirpath, out_dirpath, src_id, method, compressed, merged,
+                verbose)
     else:
         msg('I: Skipping existing output path. Use `force` to override.')
 
@@ -271,15 +331,21 @@ def main():
     msg(__doc__.strip())
     begin_time = datetime.datetime.now()
 
-    get_nifti(
-        args.in_dirpath, args.out_dirpath,
-        args.method, not args.uncompressed, not args.separated,
-        args.force, args.verbose)
+    exit_code = 0
+    try:
+        get_nifti(
+            args.in_dirpath, args.out_dirpath,
+            args.method, not args.uncompressed, not args.separated,
+            args.force, args.verbose)
+    except (IOError, OSError) as e:
+        msg('E: {}'.format(e))
+        exit_code = 1
 
     exec_time = datetime.datetime.now() - begin_time
     msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'])
+    return exit_code
 
 
 # ======================================================================
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: create small previews of the DICOM series (e.g. for the reports).
+
+Note: only the central slice (or frame) of each series is read, through
+memory-mapping when possible (see `dcmpi.util.read_dicom_pixels()`), then
+it is downsampled and windowed with NumPy and encoded as a PNG image using
+only the standard library.
+The previews are cached by a fingerprint of the series files.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import struct  # Interpret bytes as packed binary data
+import zlib  # Compression compatible with gzip
+import base64  # Base16, Base32, Base64, Base85 Data Encodings
+import hashlib  # Secure hashes and message digests
+import multiprocessing  # Process-based parallelism
+import multiprocessing.pool  # Process-based parallelism: pools
+
+# :: External Imports
+
+# :: External Imports Submodules
+
+# :: Local Imports
+import dcmpi.util as utl
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+np = lazy_import('numpy')  # NumPy (multidimensional numerical arrays library)
+
+# ======================================================================
+# the maximum size (in px) of the previews
+D_PREVIEW_SIZE = 128
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+# ======================================================================
+def _png_chunk(tag, data):
+    """
+    Pack a PNG chunk.
+
+    Args:
+        tag (bytes): The chunk type.
+        data (bytes): The chunk data.
+
+    Returns:
+        chunk (bytes): The PNG chunk (length, type, data and CRC).
+    """
+    return struct.pack('>L', len(data)) + tag + data \
+        + struct.pack('>L', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+# ======================================================================
+def encode_png(image, level=6):
+    """
+    Encode a grayscale image as PNG.
+
+    Args:
+        image (numpy.ndarray): The 2D image, as 8-bit unsigned integers.
+        level (int): The compression level (0-9).
+
+    Returns:
+        png (bytes): The PNG image.
+
+    Examples:
+        >>> png = encode_png(np.zeros((2, 3), dtype=np.uint8))
+        >>> png.startswith(PNG_SIGNATURE)
+        True
+        >>> struct.unpack('>LL', png[16:24])
+        (3, 2)
+    """
+    height, width = image.shape
+    # : each row starts with the filter type (0: none)
+    raw = np.concatenate(
+        (np.zeros((height, 1), dtype=np.uint8), image.astype(np.uint8)),
+        axis=1).tobytes()
+    return PNG_SIGNATURE \
+        + _png_chunk(b'IHDR', struct.pack(
+            '>LLBBBBB', width, height, 8, 0, 0, 0, 0)) \
+        + _png_chunk(b'IDAT', zlib.compress(raw, level)) \
+        + _png_chunk(b'IEND', b'')
+
+
+# ======================================================================
+def downsample(image, size=D_PREVIEW_SIZE):
+    """
+    Downsample an image by an integer factor, averaging blocks of pixels.
+
+    Args:
+        image (numpy.ndarray): The 2D image.
+        size (int): The maximum size of the result.
+
+    Returns:
+        image (numpy.ndarray): The downsampled image (as floats).
+
+    Examples:
+        >>> downsample(np.arange(16).reshape((4, 4)), 2)
+        array([[ 2.5,  4.5],
+               [10.5, 12.5]])
+        >>> downsample(np.arange(6).reshape((2, 3)), 4).shape
+        (2, 3)
+    """
+    factor = max(1, -(-max(image.shape) // size))
+    rows, cols = [dim // factor * factor for dim in image.shape]
+    image = np.asarray(image[:rows, :cols], dtype=float)
+    return image.reshape(
+        rows // factor, factor, cols // factor, factor).mean(axis=(1, 3))
+
+
+# ======================================================================
+def window(image, center=None, width=None, percentiles=(1, 99)):
+    """
+    Window an image to 8-bit unsigned integers.
+
+    Args:
+        image (numpy.ndarray): The image.
+        center (float|None): The window center.
+            If None, the window is computed from the image percentiles.
+        width (float|None): The window width.
+            If None, the window is computed from the image percentiles.
+        percentiles (tuple[float]): The percentiles of the automatic window.
+
+    Returns:
+        image (numpy.ndarray): The windowed image.
+
+    Examples:
+        >>> window(np.array([0.0, 50.0, 100.0]), 50, 100)
+        array([  0, 127, 255], dtype=uint8)
+    """
+    if center is None or not width:
+        low, high = np.percentile(image, percentiles)
+    else:
+        low, high = center - width / 2, center + width / 2
+    if high <= low:
+        high = low + 1
+    return (np.clip((image - low) / (high - low), 0, 1) * 255).astype(
+        np.uint8)
+
+
+# ======================================================================
+def _first(val):
+    """Get the first value of a (possibly) multi-valued DICOM field."""
+    try:
+        if hasattr(val, '__getitem__') and not isinstance(val, str):
+            val = val[0]
+        return float(val)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+# ======================================================================
+def make_preview(
+        filepaths,
+        size=D_PREVIEW_SIZE):
+    """
+    Create the preview of a DICOM series from its central slice (or frame).
+
+    Args:
+        filepaths (Iterable[str]): The paths to the DICOM files of a series.
+        size (int): The maximum size of the preview.
+
+    Returns:
+        png (bytes): The PNG preview.
+    """
+    files = []
+    for filepath in sorted(filepaths):
+        is_dicom, compression = utl.probe_dicom(filepath)
+        if is_dicom:
+            files.append((filepath, compression))
+    if len(files) > 1:
+        # : order the slices with a header-only parse
+        def instance_number(item):
+            try:
+                with utl.open_compressed(item[0], 'rb', item[1]) as file_obj:
+                    dcm, offset = utl.read_dicom_header(
+                        file_obj, ['InstanceNumber'])
+                return int(dcm.InstanceNumber)
+            except Exception:
+                return 0
+
+        files.sort(key=instance_number)
+    filepath, compression = files[len(files) // 2]
+    pixels, dcm = utl.read_dicom_pixels(filepath, compression)
+    image = downsample(
+        pixels[pixels.shape[0] // 2] if pixels.ndim == 3
+        else pixels[pixels.shape[0] // 2].mean(axis=-1), size)
+    slope = _first(dcm.get('RescaleSlope'))
+    intercept = _first(dcm.get('RescaleIntercept'))
+    image = image * (slope if slope else 1.0) + (intercept or 0.0)
+    return encode_png(window(
+        image, _first(dcm.get('WindowCenter')),
+        _first(dcm.get('WindowWidth'))))
+
+
+# ======================================================================
+def fingerprint(
+        filepaths,
+        size=D_PREVIEW_SIZE):
+    """
+    Compute the fingerprint of a series, from the names and stats of its files.
+
+    Args:
+        filepaths (Iterable[str]): The paths to the DICOM files of a series.
+        size (int): The maximum size of the preview.
+
+    Returns:
+        digest (str): The hexadecimal SHA-1 digest.
+    """
+    digest = hashlib.sha1(str(size).encode('utf-8'))
+    for filepath in sorted(filepaths):
+        stat = os.stat(filepath)
+        digest.update('{}\0{}\0{}\0'.format(
+            os.path.basename(filepath), stat.st_size,
+            stat.st_mtime).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# ======================================================================
+def _make_data_uri(filepaths, size):
+    """Create the preview of a series as a data URI (for thread pools)."""
+    try:
+        png = make_preview(filepaths, size)
+    except Exception as e:
+        msg('W: Preview failed: {}'.format(e))
+        return ''
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+
+
+# ======================================================================
+def get_previews(
+        in_dirpath,
+        size=D_PREVIEW_SIZE,
+        cache=None,
+        num_threads=None,
+        verbose=D_VERB_LVL):
+    """
+    Create the previews of the sorted DICOM series.
+
+    Args:
+        in_dirpath (str): Input path containing sorted DICOM files.
+        size (int): The maximum size of the previews.
+        cache (dict|None): The previous previews.
+            The previews with an unchanged fingerprint are not created again.
+        num_threads (int|None): The number of threads.
+            If None, uses the number of available CPUs.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        previews (dict): The series ID -> (fingerprint, data URI).
+            The data URI is empty if the preview could not be created.
+    """
+    cache = cache or {}
+    sources = utl.dcm_sources(in_dirpath)
+    previews, pending = {}, []
+    for src_id, filepaths in sorted(sources.items()):
+        digest = fingerprint(filepaths, size)
+        cached = cache.get(src_id)
+        if cached and cached[0] == digest:
+            previews[src_id] = tuple(cached)
+        elif filepaths:
+            pending.append((src_id, digest, filepaths))
+    if pending:
+        # : NumPy, zlib and the file I/O release the GIL
+        pool = multiprocessing.pool.ThreadPool(
+            min(num_threads or multiprocessing.cpu_count(), len(pending)))
+        data_uris = pool.starmap(
+            _make_data_uri,
+            [(filepaths, size) for src_id, digest, filepaths in pending])
+        pool.close()
+        pool.join()
+        for (src_id, digest, filepaths), data_uri in zip(pending, data_uris):
+            previews[src_id] = (digest, data_uri)
+    msg('Previews: {} / {} series'.format(len(pending), len(sources)),
+        verbose, VERB_LVL['medium'])
+    return previews
+
+
+# ======================================================================
+if __name__ == '__main__':
+    import doctest  # Test interactive Python examples
+
+    msg(__doc__.strip())
+    doctest.testmod()
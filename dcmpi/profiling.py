@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: measure the resources used by the processing stages.
+
+Note: for each stage, the wall time, the CPU time, the peak memory (RSS),
+the files opened for reading, the bytes read and written, and the number of
+DICOM parses are recorded, and can be saved as JSON lines or as Chrome
+trace events (to be inspected with `chrome://tracing` or Perfetto).
+The files opened and the DICOM parses are only counted when profiling is
+explicitly enabled (e.g. with `DCMPI_PROFILE=1` in the environment), since
+this requires wrapping the built-in `open()` and pydicom.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import os  # Miscellaneous operating system interfaces
+import time  # Time access and conversions
+import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
+import threading  # Thread-based parallelism
+
+try:
+    import builtins  # Built-in objects
+except ImportError:
+    import __builtin__ as builtins  # Built-in objects
+
+try:
+    import resource  # Resource usage information
+except ImportError:
+    resource = None
+
+# :: External Imports
+# import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+
+# :: External Imports Submodules
+
+# :: Local Imports
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+pydcm = lazy_import('pydicom')  # PyDicom (Read, modify and write DICOM files.)
+
+# ======================================================================
+TRACE_FILENAME = 'dcmpi_trace.jsonl'
+
+# enable the hooks (inherited by the worker processes)
+PROFILE_ENV = 'DCMPI_PROFILE'
+
+STAGES = (
+    'acquire', 'sort', 'group', 'niz', 'meta', 'prot', 'info', 'report',
+    'backup')
+
+# the counters updated by the hooks (per process)
+_COUNTS = {'files_read': 0, 'dicom_parses': 0}
+_COUNTS_LOCK = threading.Lock()
+_HOOKS = {}
+
+
+# ======================================================================
+def hooks_enabled():
+    """
+    Check if the hooks are enabled in the environment.
+
+    Returns:
+        result (bool): True if `PROFILE_ENV` is set (and not `0`).
+    """
+    return os.getenv(PROFILE_ENV, '') not in ('', '0')
+
+
+# ======================================================================
+def _count(key):
+    """Increment a counter (from any thread)."""
+    with _COUNTS_LOCK:
+        _COUNTS[key] += 1
+
+
+# ======================================================================
+def install_hooks():
+    """
+    Install the hooks counting the files opened and the DICOM parses.
+
+    The built-in `open()` and `pydicom.filereader.read_partial()` (used by
+    all the DICOM reading functions) are wrapped with a counter.
+    The hooks are reference-counted: each call must be matched by a call
+    to `uninstall_hooks()`.
+
+    Returns:
+        None.
+    """
+    with _COUNTS_LOCK:
+        _HOOKS['count'] = _HOOKS.get('count', 0) + 1
+        if _HOOKS['count'] > 1:
+            return
+        _HOOKS['open'] = builtins.open
+        _HOOKS['read_partial'] = pydcm.filereader.read_partial
+
+    def _open(file, mode='r', *_args, **_kws):
+        if 'r' in mode or '+' in mode:
+            _count('files_read')
+        return _HOOKS['open'](file, mode, *_args, **_kws)
+
+    def _read_partial(*_args, **_kws):
+        _count('dicom_parses')
+        return _HOOKS['read_partial'](*_args, **_kws)
+
+    builtins.open = _open
+    pydcm.filereader.read_partial = _read_partial
+
+
+# ======================================================================
+def uninstall_hooks():
+    """
+    Restore the functions wrapped by `install_hooks()`.
+
+    Returns:
+        None.
+    """
+    with _COUNTS_LOCK:
+        _HOOKS['count'] = _HOOKS.get('count', 0) - 1
+        if _HOOKS['count'] == 0:
+            builtins.open = _HOOKS.pop('open')
+            pydcm.filereader.read_partial = _HOOKS.pop('read_partial')
+
+
+# ======================================================================
+def _read_proc(name, keys):
+    """
+    Read selected values from a `/proc/self` file.
+
+    Args:
+        name (str): The file name.
+        keys (Iterable[str]): The keys to read.
+
+    Returns:
+        values (dict): The key -> value (as int).
+            Only the values found are returned (none, if unsupported).
+    """
+    values = {}
+    try:
+        with _HOOKS.get('open', open)(os.path.join('/proc/self', name)) \
+                as proc_file:
+            for line in proc_file:
+                key, _, val = line.partition(':')
+                if key in keys:
+                    values[key] = int(val.split()[0])
+    except (IOError, OSError, ValueError):
+        pass
+    return values
+
+
+# ======================================================================
+def _reset_peak_rss():
+    """
+    Reset the peak memory (RSS) of the current process, if supported.
+
+    Returns:
+        result (bool): True if the peak memory was reset.
+    """
+    try:
+        with _HOOKS.get('open', open)('/proc/self/clear_refs', 'w') \
+                as proc_file:
+            proc_file.write('5')
+    except (IOError, OSError):
+        return False
+    else:
+        return True
+
+
+# ======================================================================
+def _get_peak_rss():
+    """
+    Get the peak memory (RSS) of the current process.
+
+    Returns:
+        peak_rss (int): The peak memory in bytes.
+    """
+    peak_rss = _read_proc('status', ('VmHWM',)).get('VmHWM')
+    if peak_rss is None and resource:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak_rss or 0) * 1024
+
+
+# ======================================================================
+def _snapshot():
+    """
+    Get the current resource counters of the current process.
+
+    The CPU time includes the (terminated) child processes.
+
+    Returns:
+        counters (dict): The resource name -> counter.
+    """
+    times = os.times()
+    io_counts = _read_proc('io', ('rchar', 'wchar'))
+    return {
+        'wall': time.time(),
+        'cpu': times[0] + times[1] + times[2] + times[3],
+        'bytes_read': io_counts.get('rchar', 0),
+        'bytes_written': io_counts.get('wchar', 0),
+        'files_read': _COUNTS['files_read'],
+        'dicom_parses': _COUNTS['dicom_parses'],
+    }
+
+
+# ======================================================================
+class Probe(object):
+    """
+    Measure the resources used by a code block in the current process.
+
+    The files opened and the DICOM parses are only counted if the hooks
+    are enabled (otherwise, they are 0).
+
+    Examples:
+        >>> with Probe(hooks=True) as probe:
+        ...     with open(__file__, 'rb') as f:
+        ...         data = f.read()
+        >>> probe.stats['files_read']
+        1
+        >>> sorted(probe.stats.keys())  # doctest: +NORMALIZE_WHITESPACE
+        ['begin', 'bytes_read', 'bytes_written', 'cpu', 'dicom_parses',
+         'files_read', 'peak_rss', 'pid', 'wall']
+    """
+
+    def __init__(self, hooks=None):
+        """
+        Args:
+            hooks (bool|None): Install the hooks (see `install_hooks()`).
+                If None, uses `hooks_enabled()`.
+        """
+        self.hooks = hooks_enabled() if hooks is None else hooks
+        self.begin = None
+        self.stats = {}
+
+    def __enter__(self):
+        if self.hooks:
+            install_hooks()
+        _reset_peak_rss()
+        self.begin = _snapshot()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = _snapshot()
+        if self.hooks:
+            uninstall_hooks()
+        self.stats = {
+            key: end[key] - self.begin[key] for key in self.begin}
+        self.stats['wall'] = round(self.stats['wall'], 6)
+        self.stats['cpu'] = round(self.stats['cpu'], 6)
+        self.stats['begin'] = self.begin['wall']
+        self.stats['peak_rss'] = _get_peak_rss()
+        self.stats['pid'] = os.getpid()
+        return False
+
+
+# ======================================================================
+def save_trace(
+        records,
+        trace_filepath=TRACE_FILENAME,
+        chrome_trace_filepath=None):
+    """
+    Save the stage records.
+
+    Args:
+        records (Iterable[dict]): The stage records.
+            Each record must contain `session`, `stage`, `error` and the
+            `stats` measured by `Probe`.
+        trace_filepath (str|None): Path to the JSON lines trace.
+            The records are appended, one JSON object per line.
+            If None, the JSON lines trace is not saved.
+        chrome_trace_filepath (str|None): Path to the Chrome trace file.
+            The file is overwritten. If None, it is not saved.
+
+    Returns:
+        None.
+    """
+    records = list(records)
+    if trace_filepath:
+        with open(trace_filepath, 'a') as trace_file:
+            for record in records:
+                trace_file.write(json.dumps(record, sort_keys=True) + '\n')
+    if chrome_trace_filepath:
+        events = [
+            {'name': record['stage'], 'cat': 'dcmpi', 'ph': 'X',
+             'ts': int(record['stats']['begin'] * 1e6),
+             'dur': int(record['stats']['wall'] * 1e6),
+             'pid': record['stats']['pid'], 'tid': record['stats']['pid'],
+             'args': dict(
+                 record['stats'], session=record['session'],
+                 error=record.get('error'))}
+            for record in records]
+        with open(chrome_trace_filepath, 'w') as trace_file:
+            json.dump(
+                {'traceEvents': events, 'displayTimeUnit': 'ms'},
+                trace_file)
+
+
+# ======================================================================
+def summarize(
+        records,
+        verbose=D_VERB_LVL):
+    """
+    Summarize the stage records, aggregating by stage.
+
+    Args:
+        records (Iterable[dict]): The stage records.
+        verbose (int): Set level of verbosity.
+
+    Returns:
+        summary (dict): The stage -> aggregated stats.
+            Peak memory is the maximum, all other values are summed.
+    """
+    summary = {}
+    for record in records:
+        stats = summary.setdefault(record['stage'], {})
+        for key, val in record['stats'].items():
+            if key in ('begin', 'pid'):
+                continue
+            elif key == 'peak_rss':
+                stats[key] = max(stats.get(key, 0), val)
+            else:
+                stats[key] = stats.get(key, 0) + val
+    for stage in sorted(summary, key=lambda x: (
+            STAGES.index(x) if x in STAGES else len(STAGES), x)):
+        stats = summary[stage]
+        msg('Stage: {:8s} wall={:.3f}s cpu={:.3f}s rss={:.1f}MB '
+            'files={} read={:.1f}MB written={:.1f}MB parses={}'.format(
+                stage, stats['wall'], stats['cpu'],
+                stats['peak_rss'] / 2 ** 20, stats['files_read'],
+                stats['bytes_read'] / 2 ** 20,
+                stats['bytes_written'] / 2 ** 20, stats['dicom_parses']),
+            verbose, VERB_LVL['medium'])
+    return summary
+
+
+# ======================================================================
+if __name__ == '__main__':
+    import doctest  # Test interactive Python examples
+
+    msg(__doc__.strip())
+    doctest.testmod()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DCMPI: track the completion of DICOM series while they are being imported.
+
+Note: a series is considered complete when the number of its files reaches
+the number expected from the DICOM header (a single multi-frame file, or
+`ImagesInAcquisition` times `NumberOfTemporalPositions`), or when no new file has been added to it for a
+quiet time (quiescence).
+Both are heuristics: files arriving after a series was declared complete
+are reported, so that the series can be processed again.
+"""
+
+# ======================================================================
+# :: Future Imports
+from __future__ import (
+    division, absolute_import, print_function, unicode_literals, )
+
+# ======================================================================
+# :: Python Standard Library Imports
+import time  # Time access and conversions
+import collections  # High-performance container datatypes
+
+# :: External Imports
+
+# :: External Imports Submodules
+
+# :: Local Imports
+from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
+from dcmpi import msg, dbg, fmt, fmtm
+
+# ======================================================================
+D_QUIET_TIME = 4.0  # s
+
+
+# ======================================================================
+def expected_count(dcm):
+    """
+    Get the number of files expected for the series of a DICOM header.
+
+    Args:
+        dcm (pydicom.Dataset): The DICOM header.
+
+    Returns:
+        count (int|None): The expected number of files, if known.
+            `ImagesInAcquisition` only counts the images of one acquisition,
+            therefore it is only used when the number of temporal positions
+            is known too, otherwise None is returned.
+            Siemens mosaic images are not counted reliably by
+            `ImagesInAcquisition` (which is the number of slices),
+            therefore None is returned for them.
+
+    Examples:
+        >>> class Header(dict):
+        ...     __getattr__ = dict.get
+        >>> expected_count(Header(
+        ...     ImagesInAcquisition=16, NumberOfTemporalPositions=3))
+        48
+        >>> print(expected_count(Header(ImagesInAcquisition=16)))
+        None
+        >>> expected_count(Header(ImagesInAcquisition=16, NumberOfFrames=16))
+        1
+        >>> print(expected_count(Header(
+        ...     ImagesInAcquisition=36, NumberOfTemporalPositions=1,
+        ...     ImageType=['M', 'MOSAIC'])))
+        None
+        >>> print(expected_count(Header()))
+        None
+    """
+    try:
+        num_frames = int(getattr(dcm, 'NumberOfFrames', None) or 0)
+        num_images = int(getattr(dcm, 'ImagesInAcquisition', None) or 0)
+        num_positions = int(
+            getattr(dcm, 'NumberOfTemporalPositions', None) or 0)
+    except (TypeError, ValueError):
+        return None
+    if num_frames > 1 and num_images <= num_frames:
+        return 1
+    elif 'MOSAIC' in (getattr(dcm, 'ImageType', None) or ()):
+        return None
+    else:
+        return num_images * num_positions or None
+
+
+# ======================================================================
+class SeriesTracker(object):
+    """
+    Track the completion of series from the files added to them.
+
+    Args:
+        quiet_time (float): The quiet time in s.
+            Series without new files for this time are complete.
+            If 0 or None, quiescence is not used.
+
+    Examples:
+        >>> tracker = SeriesTracker(quiet_time=1.0)
+        >>> tracker.add('s1', 2, now=0.0)
+        False
+        >>> tracker.add('s1', 2, now=0.1)
+        True
+        >>> tracker.add('s2', None, now=0.2)
+        False
+        >>> tracker.poll(now=1.0)
+        []
+        >>> tracker.poll(now=1.5)
+        ['s2']
+        >>> tracker.add('s2', None, now=2.0)
+        False
+        >>> tracker.late
+        ['s2']
+        >>> tracker.pending()
+        []
+    """
+
+    def __init__(self, quiet_time=D_QUIET_TIME):
+        self.quiet_time = quiet_time
+        # : the series -> [number of files, expected number, last time]
+        self.series = collections.OrderedDict()
+        self.complete = set()
+        self.late = []
+
+    def add(self, key, expected=None, now=None):
+        """
+        Add a file to a series.
+
+        Args:
+            key (Hashable): The series identifier.
+            expected (int|None): The expected number of files, if known.
+                See `expected_count()` for more details.
+            now (float|None): The current time in s.
+                If None, uses the current time.
+
+        Returns:
+            result (bool): True if the series has just become complete.
+        """
+        now = time.time() if now is None else now
+        info = self.series.setdefault(key, [0, None, now])
+        info[0] += 1
+        info[1] = expected or info[1]
+        info[2] = now
+        if key in self.complete:
+            if key not in self.late:
+                self.late.append(key)
+            return False
+        elif info[1] and info[0] >= info[1]:
+            self.complete.add(key)
+            return True
+        else:
+            return False
+
+    def poll(self, now=None):
+        """
+        Find the series completed by quiescence.
+
+        Args:
+            now (float|None): The current time in s.
+                If None, uses the current time.
+
+        Returns:
+            keys (list): The series that have just become complete.
+        """
+        now = time.time() if now is None else now
+        keys = []
+        if self.quiet_time:
+            for key, (num, expected, last_time) in self.series.items():
+                if key not in self.complete \
+                        and now - last_time >= self.quiet_time:
+                    keys.append(key)
+        self.complete.update(keys)
+        return keys
+
+    def pending(self):
+        """
+        Get the series not complete yet.
+
+        Returns:
+            keys (list): The incomplete series.
+        """
+        return [key for key in self.series if key not in self.complete]
+
+
+# ======================================================================
+if __name__ == '__main__':
+    import doctest  # Test interactive Python examples
+
+    msg(__doc__.strip())
+    doctest.testmod()
@@ -47,6 +47,11 @@ import json  # JSON encoder and decoder [JSON: JavaScript Object Notation]
 # import unittest  # Unit testing framework
 import doctest  # Test interactive Python examples
 import shlex  # Simple lexical analysis
+import zlib  # Compression compatible with gzip
+import bz2  # Support for bzip2 compression
+import lzma  # Compression using the LZMA algorithm
+import gzip  # Support for gzip files
+import struct  # Interpret bytes as packed binary data
 
 # :: External Imports
 # import numpy as np  # NumPy (multidimensional numerical arrays library)
@@ -58,7 +63,7 @@ import shlex  # Simple lexical analysis
 # import nibabel as nib  # NiBabel (NeuroImaging I/O Library)
 # import nipy  # NiPy (NeuroImaging in Python)
 # import nipype  # NiPype (NiPy Pipelines and Interfaces)
-import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
+# import pydicom as pydcm  # PyDicom (Read, modify and write DICOM files.)
 import flyingcircus as fc  # Everything you always wanted to have in Python*
 
 # :: External Imports Submodules
@@ -76,6 +81,11 @@ from flyingcircus.base import (
 # from dcmpi import INFO, DIRS
 from dcmpi import VERB_LVL, D_VERB_LVL, VERB_LVL_NAMES
 from dcmpi import msg, dbg, fmt, fmtm
+from dcmpi import lazy_import
+
+# :: Lazy Imports (loaded on first use)
+pydcm = lazy_import('pydicom')  # PyDicom (Read, modify and write DICOM files.)
+np = lazy_import('numpy')  # NumPy (multidimensional numerical arrays library)
 
 # ======================================================================
 # :: General-purposes constants
@@ -158,6 +168,28 @@ DICOM_BINARY = (
     (0x7fe0, 0x0010),  # PixelData
 )
 
+# :: the uncompressed transfer syntaxes -> (little endian, explicit VR)
+RAW_TRANSFER_SYNTAXES = {
+    '1.2.840.10008.1.2': (True, False),  # Implicit VR Little Endian
+    '1.2.840.10008.1.2.1': (True, True),  # Explicit VR Little Endian
+    '1.2.840.10008.1.2.2': (False, True),  # Explicit VR Big Endian
+}
+
+# :: magic bytes of the compressed files (same keys as `COMPRESSIONS`)
+MAGIC_BYTES = {
+    'gz': b'\x1f\x8b',
+    'xz': b'\xfd7zXZ\x00',
+    'lzma': b'\x5d\x00\x00',
+    'bz2': b'BZh',
+}
+
+# :: DICOM preamble size and prefix
+DICOM_PREAMBLE = 128
+DICOM_PREFIX = b'DICM'
+
+# :: first group of DICOM files without preamble (little endian)
+DICOM_FIRST_GROUPS = (b'\x02\x00', b'\x08\x00')
+
 
 # ======================================================================
 def _nominal_b0(val):
@@ -204,9 +236,9 @@ def is_dicom(
     Returns:
         (bool) True if the file is a valid DICOM, false otherwise.
     """
-    import pydicom.errors
-
-
+    # : do not `import pydicom.errors` here: with the lazy `pydcm`, it would
+    #   execute `pydicom.errors` again, and its `InvalidDicomError` would
+    #   not be the one raised by `pydcm.read_file()`
     try:
         dcm = pydcm.read_file(filepath)
         # check if it is a DICOM dir.
@@ -271,6 +303,376 @@ def is_compressed_dicom(
     return is_compressed, compression
 
 
+# ======================================================================
+def _is_dicom_header(data):
+    """
+    Check if the first bytes of a file look like a DICOM.
+
+    Args:
+        data (bytes): The first bytes of the file.
+
+    Returns:
+        result (bool): True if the bytes look like a DICOM header.
+
+    Examples:
+        >>> _is_dicom_header(b'\\0' * DICOM_PREAMBLE + DICOM_PREFIX)
+        True
+        >>> _is_dicom_header(b'\\x08\\x00\\x05\\x00CS')
+        True
+        >>> _is_dicom_header(b'<html>')
+        False
+    """
+    end = DICOM_PREAMBLE + len(DICOM_PREFIX)
+    return data[DICOM_PREAMBLE:end] == DICOM_PREFIX \
+        or data[:2] in DICOM_FIRST_GROUPS
+
+
+# ======================================================================
+def probe_dicom(
+        filepath,
+        compressions=MAGIC_BYTES):
+    """
+    Cheaply check if a file is likely to be a (possibly compressed) DICOM.
+
+    Only the first bytes of the file are read: the DICOM preamble prefix
+    (or the first DICOM group) and the magic bytes of compressed files.
+    For compressed files, only the first decompressed bytes are checked.
+    Files passing this probe still need to be parsed to be sure.
+
+    Args:
+        filepath (str): The path to the file.
+        compressions (dict): The compression magic bytes.
+
+    Returns:
+        result (tuple): The tuple
+            (is_dicom, compression) where:
+             - is_dicom (bool): True if the file is likely a DICOM.
+             - compression (str|None): The compression, if any.
+    """
+    size = DICOM_PREAMBLE + len(DICOM_PREFIX)
+    try:
+        with open(filepath, 'rb') as file_obj:
+            data = file_obj.read(size)
+            if _is_dicom_header(data):
+                return True, None
+            for compression, magic in compressions.items():
+                if data.startswith(magic):
+                    break
+            else:
+                return False, None
+            if compression == 'gz':
+                decompressor = zlib.decompressobj(31)
+            elif compression == 'bz2':
+                decompressor = bz2.BZ2Decompressor()
+            else:
+                decompressor = lzma.LZMADecompressor()
+            decompressed = b''
+            while len(decompressed) < size and data:
+                decompressed += decompressor.decompress(data)
+                data = file_obj.read(4096)
+    except (IOError, OSError, EOFError, zlib.error, lzma.LZMAError):
+        return False, None
+    return _is_dicom_header(decompressed), compression
+
+
+# ======================================================================
+def probe_dir(
+        dirpath,
+        max_probes=16,
+        max_per_dir=4,
+        allow_dir=False,
+        allow_report=False):
+    """
+    Cheaply find a file likely to be a DICOM image in a directory.
+
+    The directory tree is sampled breadth-first: only a few files per
+    directory are probed (see `probe_dicom()`), and the search stops at the
+    first candidate found.
+    Unless allowed, DICOM directories (e.g. `DICOMDIR`) and reports (e.g.
+    structured reports, without pixel data) are skipped, reading only a few
+    fields of their header (as they lack the fields of the images).
+    This is a fast alternative to `find_a_dicom()` (e.g. for readiness
+    checks), but the result is not guaranteed to be a valid DICOM.
+
+    Args:
+        dirpath (str): The path to the directory.
+        max_probes (int): The maximum number of files probed.
+        max_per_dir (int): The maximum number of files probed per directory.
+        allow_dir (bool): Accept DICOM directories.
+        allow_report (bool): Accept DICOM reports.
+
+    Returns:
+        result (tuple): The tuple
+            (filepath, compression) where:
+             - filepath (str): The candidate file (empty if not found).
+             - compression (str|None): The compression, if any.
+    """
+    dirpaths = collections.deque([dirpath])
+    num_probes = 0
+    while dirpaths and num_probes < max_probes:
+        try:
+            entries = sorted(os.scandir(dirpaths.popleft()),
+                             key=lambda entry: entry.name)
+        except OSError:
+            continue
+        num_dir_probes = 0
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                dirpaths.append(entry.path)
+            elif num_dir_probes < max_per_dir and num_probes < max_probes \
+                    and entry.is_file():
+                num_dir_probes += 1
+                num_probes += 1
+                is_dicom, compression = probe_dicom(entry.path)
+                if is_dicom and (allow_dir and allow_report or _is_image(
+                        entry.path, compression, allow_dir, allow_report)):
+                    return entry.path, compression
+    return '', None
+
+
+# ======================================================================
+def _is_image(
+        filepath,
+        compression=None,
+        allow_dir=False,
+        allow_report=False):
+    """
+    Check if a DICOM file is an image, reading only a few header fields.
+
+    Args:
+        filepath (str): The path to the (possibly compressed) DICOM file.
+        compression (str|None): The compression, if any.
+        allow_dir (bool): Accept DICOM directories.
+        allow_report (bool): Accept DICOM reports.
+
+    Returns:
+        result (bool): True if the file is an image (or it is allowed).
+    """
+    try:
+        with open_compressed(filepath, 'rb', compression) as file_obj:
+            dcm, offset = read_dicom_header(
+                file_obj, ('DirectoryRecordSequence', 'Modality'))
+            # : the header stops before the pixel data, if any
+            has_pixels = bool(file_obj.read(1))
+    except Exception:
+        return False
+    if 'DirectoryRecordSequence' in dcm and not allow_dir:
+        return False
+    elif (not has_pixels or dcm.get('Modality') == 'SR') and not allow_report:
+        return False
+    else:
+        return True
+
+
+# ======================================================================
+def dir_signature(dirpath):
+    """
+    Compute a cheap signature of the content of a directory tree.
+
+    Comparing signatures from consecutive checks is a simple completeness
+    heuristic: a directory being written changes its signature.
+
+    Args:
+        dirpath (str): The path to the directory.
+
+    Returns:
+        signature (tuple[int|float]): The number of files, their total
+            size and the last modification time.
+    """
+    num, size, mtime = 0, 0, 0.0
+    dirpaths = [dirpath]
+    while dirpaths:
+        try:
+            entries = list(os.scandir(dirpaths.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirpaths.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    num += 1
+                    size += stat.st_size
+                    mtime = max(mtime, stat.st_mtime)
+            except OSError:
+                pass
+    return num, size, mtime
+
+
+# ======================================================================
+def open_compressed(
+        filepath,
+        mode='rb',
+        compression=None):
+    """
+    Open a (possibly compressed) file in-process.
+
+    Args:
+        filepath (str): The path to the file.
+        mode (str): The opening mode (binary).
+        compression (str|None): The compression (see `COMPRESSIONS`).
+            If None, the file is not compressed.
+
+    Returns:
+        file_obj (file): The file object.
+    """
+    if not compression:
+        return open(filepath, mode)
+    elif compression == 'gz':
+        return gzip.open(filepath, mode)
+    elif compression == 'bz2':
+        return bz2.open(filepath, mode)
+    elif compression == 'xz':
+        return lzma.open(filepath, mode, format=lzma.FORMAT_XZ)
+    elif compression == 'lzma':
+        return lzma.open(filepath, mode, format=lzma.FORMAT_ALONE)
+    else:
+        raise ValueError('Unknown compression `{}`.'.format(compression))
+
+
+# ======================================================================
+def read_dicom_header(
+        file_obj,
+        specific_tags=None):
+    """
+    Read the DICOM header, stopping before the pixel data.
+
+    The pixel data is not read, but its position is returned, so that the
+    raw pixel bytes can be accessed (or copied) without decoding.
+
+    Args:
+        file_obj (file): The (binary, seekable) DICOM file object.
+        specific_tags (Iterable[str]|None): The only DICOM fields to read.
+            If None, all fields are read.
+
+    Returns:
+        result (tuple): The tuple
+            (dcm, offset) where:
+             - dcm (pydicom.Dataset): The DICOM header.
+             - offset (int): The position of the pixel data element (or of
+               the end of the file, if no pixel data is present).
+    """
+    dcm = pydcm.read_file(
+        file_obj, stop_before_pixels=True,
+        specific_tags=list(specific_tags) if specific_tags else None)
+    return dcm, file_obj.tell()
+
+
+# ======================================================================
+def _pixel_data_offset(
+        file_obj,
+        offset,
+        little_endian=True,
+        explicit_vr=True):
+    """
+    Get the position and the length of the (native) pixel data values.
+
+    Args:
+        file_obj (file): The (binary, seekable) DICOM file object.
+        offset (int): The position of the pixel data element.
+            See `read_dicom_header()` for more details.
+        little_endian (bool): The byte order of the transfer syntax.
+        explicit_vr (bool): The VR encoding of the transfer syntax.
+
+    Returns:
+        result (tuple|None): The tuple
+            (position, length) where:
+             - position (int): The position of the pixel data values.
+             - length (int): The length of the pixel data values in bytes.
+            None if the element is not native pixel data (e.g. it is
+            encapsulated, i.e. of undefined length).
+    """
+    endian = '<' if little_endian else '>'
+    file_obj.seek(offset)
+    data = file_obj.read(12 if explicit_vr else 8)
+    if len(data) < (12 if explicit_vr else 8):
+        return None
+    group, element = struct.unpack(endian + 'HH', data[:4])
+    if (group, element) != DCM_ID['pixel_data']:
+        return None
+    if explicit_vr:
+        if data[4:6] not in (b'OB', b'OW'):
+            return None
+        length, = struct.unpack(endian + 'L', data[8:12])
+        position = offset + 12
+    else:
+        length, = struct.unpack(endian + 'L', data[4:8])
+        position = offset + 8
+    if length == 0xFFFFFFFF:
+        return None
+    return position, length
+
+
+# ======================================================================
+def read_dicom_pixels(
+        filepath,
+        compression=None,
+        mmap_mode='r'):
+    """
+    Read the pixel data of a DICOM file, memory-mapping it if possible.
+
+    For uncompressed transfer syntaxes (see `RAW_TRANSFER_SYNTAXES`), only
+    the header is parsed and the pixel data is exposed as a `numpy.memmap`
+    (with the proper data type, shape and byte order), so that frames are
+    only read when accessed, with constant memory.
+    Otherwise (compressed transfer syntaxes, compressed files, unsupported
+    pixel formats), the pixel data is decoded by PyDICOM.
+
+    The stored values are returned (the rescaling, if any, is not applied).
+
+    Args:
+        filepath (str): The path to the DICOM file.
+        compression (str|None): The compression of the file.
+            See `open_compressed()` for more details.
+        mmap_mode (str): The memory-map mode.
+            See `numpy.memmap` for more details.
+
+    Returns:
+        result (tuple): The tuple
+            (pixels, dcm) where:
+             - pixels (numpy.ndarray): The pixel data, with shape:
+               (frames, rows, columns) or (frames, rows, columns, samples),
+               if there is more than one sample per pixel.
+             - dcm (pydicom.Dataset): The DICOM header.
+    """
+    with open_compressed(filepath, 'rb', compression) as file_obj:
+        dcm, offset = read_dicom_header(file_obj)
+        syntax = str(dcm.file_meta.get('TransferSyntaxUID', ''))
+        bits = dcm.get('BitsAllocated')
+        pixel_data = None
+        if not compression and syntax in RAW_TRANSFER_SYNTAXES \
+                and bits in (8, 16, 32, 64):
+            little_endian, explicit_vr = RAW_TRANSFER_SYNTAXES[syntax]
+            pixel_data = _pixel_data_offset(
+                file_obj, offset, little_endian, explicit_vr)
+    num_frames = int(dcm.get('NumberOfFrames') or 1)
+    num_samples = int(dcm.get('SamplesPerPixel') or 1)
+    shape = (num_frames, dcm.Rows, dcm.Columns)
+    if pixel_data:
+        position, length = pixel_data
+        dtype = np.dtype('{}{}{}'.format(
+            '<' if little_endian else '>',
+            'i' if dcm.get('PixelRepresentation') else 'u', bits // 8))
+        planar = num_samples > 1 and dcm.get('PlanarConfiguration')
+        mm_shape = \
+            (num_frames, num_samples, dcm.Rows, dcm.Columns) if planar \
+            else shape + ((num_samples,) if num_samples > 1 else ())
+        if int(np.prod(mm_shape)) * dtype.itemsize <= length:
+            pixels = np.memmap(
+                filepath, dtype=dtype, mode=mmap_mode, offset=position,
+                shape=mm_shape)
+            if planar:
+                pixels = pixels.transpose(0, 2, 3, 1)
+            return pixels, dcm
+    # : fall back to decoding
+    with open_compressed(filepath, 'rb', compression) as file_obj:
+        dcm = pydcm.read_file(file_obj)
+    pixels = dcm.pixel_array
+    return pixels.reshape(
+        shape + ((num_samples,) if num_samples > 1 else ())), dcm
+
+
 # ======================================================================
 def find_a_dicom(
         dirpath,
@@ -284,6 +686,9 @@ def find_a_dicom(
     for root, dirs, files in sorted(os.walk(dirpath)):
         for name in files:
             filename = os.path.join(root, name)
+            # : skip full parsing of files not looking like DICOMs
+            if not probe_dicom(filename)[0]:
+                continue
             is_a_dicom = is_dicom(
                 filename,
                 allow_dir=allow_dir,
@@ -307,6 +712,65 @@ def find_a_dicom(
     return dcm_filename, compression
 
 
+# ======================================================================
+def fill_from_dataset(
+        format_str,
+        dcm,
+        extra_fields=False):
+    """
+    Fill a format string with information from a parsed DICOM dataset.
+
+    Args:
+        format_str (str): The format string.
+            See `fill_from_dicom()` for the accepted fields and formats.
+        dcm (pydicom.Dataset): The DICOM dataset (the header is enough).
+        extra_fields (bool): Accept fields directly from the dataset.
+            No format is supported. Note: this MUST be used with care.
+
+    Returns:
+        out_str (str): The formatted string.
+    """
+    fields = {
+        'study': (
+            'StudyDescription',
+            lambda t, f:  # slice according to 2-int tuple set in 'f'
+            t[int(f.split(',')[0]):int(f.split(',')[1])] if f else t,
+            ''),
+        'date': (
+            'StudyDate',
+            lambda t, f: time.strftime(f, get_date(t)),
+            '%Y-%m-%d'),
+        'time': (
+            'StudyTime',
+            lambda t, f: time.strftime(f, get_time(t)),
+            '%H-%M'),
+        'name': (
+            'PatientName',
+            lambda t, f:
+            t[:4] if f == 'mpicbs' and (t[3] == 'T' or t[3] == 'X') else t,
+            'mpicbs'),
+        'sys': (
+            'StationName',
+            lambda t, f: STATION[t] if f == 'mpicbs' and t in STATION else t,
+            'mpicbs'),
+    }
+
+    if extra_fields:
+        for item in dir(dcm):
+            if item[0].isupper():
+                fields[item] = (item, None, None)
+    format_kws = {}
+    for field_id, field_formatter in sorted(fields.items()):
+        dcm_id, fmt_func, field_fmt = field_formatter
+        try:
+            format_kws[field_id] = \
+                fmt_func(getattr(dcm, dcm_id), field_fmt) \
+                    if fmt_func else getattr(dcm, dcm_id)
+        except TypeError:
+            format_kws[field_id] = getattr(dcm, dcm_id)
+    return fmtm(format_str, format_kws)
+
+
 # ======================================================================
 def fill_from_dicom(
         format_str,
@@ -341,31 +805,6 @@ def fill_from_dicom(
     The formatted string.
 
     """
-    fields = {
-        'study': (
-            'StudyDescription',
-            lambda t, f:  # slice according to 2-int tuple set in 'f'
-            t[int(f.split(',')[0]):int(f.split(',')[1])] if f else t,
-            ''),
-        'date': (
-            'StudyDate',
-            lambda t, f: time.strftime(f, get_date(t)),
-            '%Y-%m-%d'),
-        'time': (
-            'StudyTime',
-            lambda t, f: time.strftime(f, get_time(t)),
-            '%H-%M'),
-        'name': (
-            'PatientName',
-            lambda t, f:
-            t[:4] if f == 'mpicbs' and (t[3] == 'T' or t[3] == 'X') else t,
-            'mpicbs'),
-        'sys': (
-            'StationName',
-            lambda t, f: STATION[t] if f == 'mpicbs' and t in STATION else t,
-            'mpicbs'),
-    }
-
     filename = os.path.basename(filepath)
     temp_filepath = os.path.join(tmp_path, filename)
     shutil.copy(filepath, temp_filepath)
@@ -382,20 +821,7 @@ def fill_from_dicom(
         print('E: Could not open DICOM file: {}.'.format(dcm_filepath))
         out_str = ''
     else:
-        if extra_fields:
-            for item in dir(dcm):
-                if item[0].isupper():
-                    fields[item] = (item, None, None)
-        format_kws = {}
-        for field_id, field_formatter in sorted(fields.items()):
-            dcm_id, fmt_func, field_fmt = field_formatter
-            try:
-                format_kws[field_id] = \
-                    fmt_func(getattr(dcm, dcm_id), field_fmt) \
-                        if fmt_func else getattr(dcm, dcm_id)
-            except TypeError:
-                format_kws[field_id] = getattr(dcm, dcm_id)
-        out_str = fmtm(format_str, format_kws)
+        out_str = fill_from_dataset(format_str, dcm, extra_fields)
     finally:
         if os.path.isfile(temp_filepath):
             os.remove(temp_filepath)
@@ -545,6 +971,32 @@ def group_series(
     return groups
 
 
+# ======================================================================
+def get_series_id(dcm):
+    """
+    Get the series ID (i.e. the sorted sub-directory name) of a DICOM.
+
+    Args:
+        dcm (pydicom.Dataset): The DICOM header.
+
+    Returns:
+        src_id (str): The series ID.
+
+    Raises:
+        AttributeError: If the series number or description are missing.
+
+    Examples:
+        >>> class Header(object):
+        ...     SeriesNumber, SeriesDescription = 7, 't1_mprage'
+        >>> get_series_id(Header())
+        's007__t1_mprage'
+    """
+    return INFO_SEP.join(
+        (PREFIX_ID['series'] +
+         '{:0{size}d}'.format(dcm.SeriesNumber, size=D_NUM_DIGITS),
+         dcm.SeriesDescription))
+
+
 # ======================================================================
 def dcm_sources(dirpath):
     """
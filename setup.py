@@ -139,7 +139,7 @@ setup(
     packages=find_packages(exclude=['contrib', 'docs', 'tests']),
 
     install_requires=[
-        'appdirs', 'pydicom', 'pytk', 'blessed', 'dicom2nifti',
+        'appdirs', 'numpy', 'pydicom', 'pytk', 'dicom2nifti',
         'flyingcircus'
     ],
 
@@ -175,15 +175,20 @@ setup(
 
             'dcmpi_update=dcmpi.dcmpi_update:main',
             'dcmpi_monitor_folder=dcmpi.dcmpi_monitor_folder:main',
+            'dcmpi_daemon=dcmpi.dcmpi_daemon:main',
 
             'dcmpi__do_acquire_sources=dcmpi.do_acquire_sources:main',
             'dcmpi__do_sorting=dcmpi.do_sorting:main',
             'dcmpi__do_backup=dcmpi.do_backup:main',
             'dcmpi__get_info=dcmpi.get_info:main',
+            'dcmpi__get_info_table=dcmpi.get_info_table:main',
             'dcmpi__get_meta=dcmpi.get_meta:main',
             'dcmpi__get_nifti=dcmpi.get_nifti:main',
             'dcmpi__get_prot=dcmpi.get_prot:main',
             'dcmpi__get_report=dcmpi.do_report:main',
+
+            'dcmpi__benchmark=dcmpi.benchmark.suite:main',
+            'dcmpi__benchmark_synthetic=dcmpi.benchmark.synthetic:main',
         ],
         'gui_scripts': [
             'dcmpi_gui=dcmpi.dcmpi_run:main_gui',